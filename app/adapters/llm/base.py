@@ -2,10 +2,20 @@ from abc import ABC, abstractmethod
 from typing import AsyncIterator
 
 class LLM(ABC):
+    # `state` carries provider conversation state between calls of one chat session
+    # (Ollama: the `context` token array). Adapters without such state ignore it.
+    # A prompt written to continue from `state["context"]` lacks the instructions and
+    # history; `state["full_prompt"]` is the self-contained version for those adapters.
+    keeps_context = False
+
     @abstractmethod
-    async def generate(self, prompt: str) -> str:
+    async def generate(self, prompt: str, state: dict | None = None) -> str:
         ...
 
     # Optional streaming interface. Adapters can override for true token streaming.
-    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
-        yield await self.generate(prompt)
+    async def stream_generate(self, prompt: str, state: dict | None = None) -> AsyncIterator[str]:
+        yield await self.generate(prompt, state=state)
+
+    # Optional warm-up hook (e.g. load model weights) called in the background at startup.
+    async def preload(self) -> None:
+        return None
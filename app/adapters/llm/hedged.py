@@ -0,0 +1,172 @@
+import asyncio
+import time
+from typing import AsyncIterator
+
+from app.adapters.llm.base import LLM
+from app.core.config import settings
+
+# Time-to-first-token per backend name, shared by all requests (adapters are per request).
+_stats: dict[str, dict] = {}
+# A slow or failing backend is demoted for this long, then it is tried first again.
+_DEMOTE_SEC = 60.0
+
+
+def _record(name: str, **kw) -> dict:
+    s = _stats.setdefault(
+        name,
+        {"ttft_ms_ewma": None, "requests": 0, "wins": 0, "hedged": 0, "cancelled": 0, "errors": 0, "failing": 0},
+    )
+    for k, v in kw.items():
+        s[k] += v
+    if kw.get("errors"):
+        s["observed_at"] = time.time()
+    return s
+
+
+def _observe_ttft(name: str, ms: float, lower_bound: bool = False) -> None:
+    """EWMA of time to first token; a cancelled attempt only tells us it was at least `ms`."""
+    s = _record(name)
+    prev = s["ttft_ms_ewma"]
+    if lower_bound and prev is not None and ms <= prev:
+        return
+    s["ttft_ms_ewma"] = round(ms if prev is None else 0.8 * prev + 0.2 * ms, 1)
+    s["observed_at"] = time.time()
+
+
+def stats() -> dict:
+    return {name: dict(s) for name, s in _stats.items()}
+
+
+class HedgedLLM(LLM):
+    """Race several backends: hedge to the next one when the current one is slow to start.
+
+    Backends are tried in configured order, except that one whose time to first token is
+    above the hedge threshold, or whose last request failed, moves to the back for a minute.
+    If the running attempt has produced no token after LLM_HEDGE_AFTER_MS (or failed),
+    the next backend is started as well. The first attempt to yield a token wins and the
+    others are cancelled, which closes their HTTP requests.
+
+    A follow-up prompt that continues from Ollama's `context` only makes sense to a
+    backend that keeps that context; the others get `state["full_prompt"]` (instructions
+    and condensed history) instead, or are not tried when there is none.
+    """
+
+    def __init__(self, backends: list[tuple[str, LLM]]):
+        self.backends = backends
+
+    def _ordered(self) -> list[tuple[str, LLM]]:
+        threshold = settings.LLM_HEDGE_AFTER_MS
+
+        def demoted(name: str) -> bool:
+            s = _stats.get(name)
+            if not s or time.time() - s.get("observed_at", 0.0) > _DEMOTE_SEC:
+                return False
+            slow = threshold > 0 and s["ttft_ms_ewma"] is not None and s["ttft_ms_ewma"] > threshold
+            return slow or s["failing"] > 0
+
+        return sorted(self.backends, key=lambda b: demoted(b[0]))  # stable: keeps configured order
+
+    async def generate(self, prompt: str, state: dict | None = None) -> str:
+        return "".join([delta async for delta in self.stream_generate(prompt, state=state)])
+
+    async def stream_generate(self, prompt: str, state: dict | None = None) -> AsyncIterator[str]:
+        backends = self._ordered()
+        continuing = state is not None and bool(state.get("context"))
+        full_prompt = state.get("full_prompt") if continuing else None
+        if continuing and not full_prompt:
+            backends = [b for b in backends if b[1].keeps_context] or backends
+        events: asyncio.Queue = asyncio.Queue()
+        tasks: list[asyncio.Task] = []
+        # Each attempt gets its own copy of the conversation state; the winner's is kept.
+        states: list[dict | None] = []
+        started: list[float] = []
+
+        async def attempt(i: int, llm: LLM) -> None:
+            own_prompt = full_prompt if continuing and not llm.keeps_context else prompt
+            try:
+                async for delta in llm.stream_generate(own_prompt, state=states[i]):
+                    if delta:
+                        events.put_nowait((i, "token", delta))
+                events.put_nowait((i, "end", None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                events.put_nowait((i, "error", e))
+
+        def launch() -> None:
+            i = len(tasks)
+            name = backends[i][0]
+            _record(name, requests=1, hedged=1 if i else 0)
+            states.append(dict(state) if state is not None else None)
+            started.append(time.perf_counter())
+            tasks.append(asyncio.create_task(attempt(i, backends[i][1])))
+
+        def elapsed_ms(i: int) -> float:
+            return (time.perf_counter() - started[i]) * 1000
+
+        hedge_sec = settings.LLM_HEDGE_AFTER_MS / 1000.0
+        failed: set[int] = set()
+        winner = None
+        first = None
+        error: Exception | None = None
+        try:
+            launch()
+            deadline = time.perf_counter() + hedge_sec
+            while winner is None:
+                can_hedge = hedge_sec > 0 and len(tasks) < len(backends)
+                timeout = max(0.0, deadline - time.perf_counter()) if can_hedge else None
+                try:
+                    i, kind, payload = await asyncio.wait_for(events.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    launch()
+                    deadline = time.perf_counter() + hedge_sec
+                    continue
+                name = backends[i][0]
+                if kind == "error":
+                    _record(name, errors=1, failing=1)
+                    failed.add(i)
+                    error = payload
+                    if len(failed) == len(tasks):
+                        if len(tasks) == len(backends):
+                            raise error
+                        launch()  # fall back at once instead of waiting for the hedge delay
+                        deadline = time.perf_counter() + hedge_sec
+                    continue
+                winner, first = i, payload
+                _observe_ttft(name, elapsed_ms(i))
+                _record(name, wins=1)
+                _stats[name]["failing"] = 0
+
+            for j, task in enumerate(tasks):
+                if j != winner and j not in failed and not task.done():
+                    task.cancel()
+                    _record(backends[j][0], cancelled=1)
+                    _observe_ttft(backends[j][0], elapsed_ms(j), lower_bound=True)
+
+            if first is not None:
+                yield first
+            while first is not None:
+                i, kind, payload = await events.get()
+                if i != winner:
+                    continue  # leftovers of cancelled or failed attempts
+                if kind == "token":
+                    yield payload
+                elif kind == "error":
+                    raise payload
+                else:
+                    break
+            if state is not None:
+                won = states[winner]
+                # A backend without conversation state left the previous turn's context in its
+                # copy; that context no longer matches the conversation, so drop it.
+                if won.get("context") is state.get("context"):
+                    won["context"] = None
+                state.clear()
+                state.update(won)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def preload(self) -> None:
+        await asyncio.gather(*(llm.preload() for _, llm in self.backends), return_exceptions=True)
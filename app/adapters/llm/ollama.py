@@ -7,26 +7,44 @@ from app.core.config import settings
 from app.adapters.llm.base import LLM
 
 class OllamaLLM(LLM):
-    async def generate(self, prompt: str) -> str:
+    keeps_context = True
+
+    def __init__(self, base_url: str | None = None):
+        self.base_url = (base_url or settings.OLLAMA_BASE_URL).rstrip("/")
+
+    async def generate(self, prompt: str, state: dict | None = None) -> str:
+        payload = {
+            "model": settings.OLLAMA_MODEL,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": settings.OLLAMA_KEEP_ALIVE,
+            "options": {
+                "num_predict": settings.OLLAMA_NUM_PREDICT,
+                "temperature": settings.OLLAMA_TEMPERATURE,
+                "top_p": settings.OLLAMA_TOP_P,
+            },
+        }
+        if state and state.get("context"):
+            payload["context"] = state["context"]
         async with httpx.AsyncClient(timeout=180) as client:
+            r = await client.post(f"{self.base_url}/api/generate", json=payload)
+            r.raise_for_status()
+            obj = r.json()
+            if state is not None:
+                state["context"] = obj.get("context")
+            return obj.get("response", "")
+
+    async def preload(self) -> None:
+        # An empty prompt makes Ollama load the model and keep it for `keep_alive`,
+        # so the first real question doesn't pay the cold-load cost.
+        async with httpx.AsyncClient(timeout=300) as client:
             r = await client.post(
-                f"{settings.OLLAMA_BASE_URL}/api/generate",
-                json={
-                    "model": settings.OLLAMA_MODEL,
-                    "prompt": prompt,
-                    "stream": False,
-                    "keep_alive": settings.OLLAMA_KEEP_ALIVE,
-                    "options": {
-                        "num_predict": settings.OLLAMA_NUM_PREDICT,
-                        "temperature": settings.OLLAMA_TEMPERATURE,
-                        "top_p": settings.OLLAMA_TOP_P,
-                    },
-                },
+                f"{self.base_url}/api/generate",
+                json={"model": settings.OLLAMA_MODEL, "keep_alive": settings.OLLAMA_KEEP_ALIVE},
             )
             r.raise_for_status()
-            return r.json().get("response", "")
 
-    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
+    async def stream_generate(self, prompt: str, state: dict | None = None) -> AsyncIterator[str]:
         # Ollama streams newline-delimited JSON objects when stream=true.
         payload = {
             "model": settings.OLLAMA_MODEL,
@@ -39,10 +57,13 @@ class OllamaLLM(LLM):
                 "top_p": settings.OLLAMA_TOP_P,
             },
         }
+        # Continuing from the previous turn's context reuses its KV cache (prompt prefix).
+        if state and state.get("context"):
+            payload["context"] = state["context"]
         async with httpx.AsyncClient(timeout=None) as client:
             async with client.stream(
                 "POST",
-                f"{settings.OLLAMA_BASE_URL}/api/generate",
+                f"{self.base_url}/api/generate",
                 json=payload,
             ) as r:
                 r.raise_for_status()
@@ -54,6 +75,8 @@ class OllamaLLM(LLM):
                     except Exception:
                         continue
                     if obj.get("done") is True:
+                        if state is not None:
+                            state["context"] = obj.get("context")
                         break
                     delta = obj.get("response") or ""
                     if delta:
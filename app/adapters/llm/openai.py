@@ -4,7 +4,7 @@ from app.core.config import settings
 from app.adapters.llm.base import LLM
 
 class OpenAILLM(LLM):
-    async def generate(self, prompt: str) -> str:
+    async def generate(self, prompt: str, state: dict | None = None) -> str:
         from openai import AsyncOpenAI
         client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         resp = await client.chat.completions.create(
@@ -17,7 +17,7 @@ class OpenAILLM(LLM):
         )
         return resp.choices[0].message.content or ""
 
-    async def stream_generate(self, prompt: str) -> AsyncIterator[str]:
+    async def stream_generate(self, prompt: str, state: dict | None = None) -> AsyncIterator[str]:
         from openai import AsyncOpenAI
         client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         stream = await client.chat.completions.create(
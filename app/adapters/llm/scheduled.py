@@ -0,0 +1,27 @@
+from typing import AsyncIterator, Callable
+
+from app.adapters.llm.base import LLM
+from app.services.scheduler_service import BATCH, get_scheduler
+
+
+class ScheduledLLM(LLM):
+    """Run another adapter's generations through the shared admission scheduler."""
+
+    def __init__(self, inner: LLM, priority: int = BATCH):
+        self.inner = inner
+        self.priority = priority
+
+    async def generate(self, prompt: str, state: dict | None = None) -> str:
+        async with get_scheduler().slot(self.priority):
+            return await self.inner.generate(prompt, state=state)
+
+    async def stream_generate(
+        self, prompt: str, state: dict | None = None, on_queue: Callable[[int], None] | None = None
+    ) -> AsyncIterator[str]:
+        # The slot is held until the last token, since that is when the backend is free again.
+        async with get_scheduler().slot(self.priority, on_position=on_queue):
+            async for delta in self.inner.stream_generate(prompt, state=state):
+                yield delta
+
+    async def preload(self) -> None:
+        await self.inner.preload()
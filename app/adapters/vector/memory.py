@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.adapters.vector.base import VectorStore
+
+
+class InMemoryVectorStore(VectorStore):
+    """Brute-force cosine search kept in process memory.
+
+    Stand-in for Qdrant in benchmarks, evaluation runs and tests (VECTOR_BACKEND=memory).
+    Nothing is persisted; restart = empty index.
+    """
+
+    def __init__(self):
+        self.dim: int | None = None
+        self._ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self._payloads: list[dict] = []
+        self._mat = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def ensure_collection(self, dim: int):
+        with self._lock:
+            if self.dim == dim:
+                return
+            # Same behaviour as VECTOR_RECREATE_ON_DIM_MISMATCH=true: start over.
+            self.dim = dim
+            self._ids, self._pos, self._payloads = [], {}, []
+            self._mat = np.zeros((0, dim), dtype=np.float32)
+            self._size = 0
+
+    def _grow(self, need: int):
+        cap = self._mat.shape[0]
+        if need <= cap:
+            return
+        new = np.zeros((max(need, cap * 2, 1024), self.dim), dtype=np.float32)
+        new[: self._size] = self._mat[: self._size]
+        self._mat = new
+
+    def upsert(self, ids: List[str], vectors: List[List[float]], payloads: List[Dict[str, Any]]):
+        if not ids:
+            return
+        arr = np.asarray(vectors, dtype=np.float32)
+        if self.dim is None:
+            self.ensure_collection(arr.shape[1])
+        norms = np.linalg.norm(arr, axis=1, keepdims=True)
+        arr = arr / np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            self._grow(self._size + len(ids))
+            for cid, v, p in zip(ids, arr, payloads):
+                cid = str(cid)
+                i = self._pos.get(cid)
+                if i is None:
+                    i = self._size
+                    self._size += 1
+                    self._pos[cid] = i
+                    self._ids.append(cid)
+                    self._payloads.append(p)
+                else:
+                    self._payloads[i] = p
+                self._mat[i] = v
+
+    def search(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]] = None):
+        with self._lock:
+            if not self._size:
+                return []
+            q = np.asarray(vector, dtype=np.float32)
+            n = float(np.linalg.norm(q)) or 1.0
+            scores = self._mat[: self._size] @ (q / n)
+            if filter:
+                mask = np.array(
+                    [all(p.get(k) == v for k, v in filter.items() if v is not None) for p in self._payloads],
+                    dtype=bool,
+                )
+                scores = np.where(mask, scores, -np.inf)
+            k = min(top_k, self._size)
+            idx = np.argpartition(-scores, k - 1)[:k]
+            idx = idx[np.argsort(-scores[idx])]
+            return [
+                {
+                    "chunk_id": self._ids[i],
+                    "id": self._ids[i],
+                    "score": float(scores[i]),
+                    "payload": self._payloads[i],
+                }
+                for i in idx
+                if np.isfinite(scores[i])
+            ]
+
+    def _remove(self, keep: np.ndarray):
+        idx = np.nonzero(keep[: self._size])[0]
+        self._mat[: len(idx)] = self._mat[idx]
+        self._ids = [self._ids[i] for i in idx]
+        self._payloads = [self._payloads[i] for i in idx]
+        self._pos = {cid: i for i, cid in enumerate(self._ids)}
+        self._size = len(idx)
+
+    def delete_by_doc_id(self, doc_id: str) -> None:
+        with self._lock:
+            keep = np.array([p.get("doc_id") != doc_id for p in self._payloads], dtype=bool)
+            if keep.size:
+                self._remove(keep)
+
+    def delete_ids(self, ids: List[str]) -> None:
+        with self._lock:
+            drop = set(ids)
+            keep = np.array([cid not in drop for cid in self._ids], dtype=bool)
+            if keep.size and not keep.all():
+                self._remove(keep)
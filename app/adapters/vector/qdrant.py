@@ -4,14 +4,6 @@ from typing import Any, Dict, List, Optional
 
 import httpx
 
-# qdrant-client is optional; REST works across versions and avoids SDK breakages.
-try:
-    from qdrant_client import QdrantClient  # type: ignore
-    from qdrant_client.http import models as qm  # type: ignore
-except Exception:  # pragma: no cover
-    QdrantClient = None  # type: ignore
-    qm = None  # type: ignore
-
 from app.core.config import settings
 from app.adapters.vector.base import VectorStore
 
@@ -29,12 +21,26 @@ def _meta_filter_to_qdrant_filter(meta_filter: Dict[str, Any]) -> Optional[Dict[
     return {"must": must} if must else None
 
 
+def _load_sdk():
+    """Import qdrant-client on first use (it is slow to import and optional).
+
+    REST works across versions and avoids SDK breakages, so a missing SDK is fine.
+    """
+    try:
+        from qdrant_client import QdrantClient  # type: ignore
+        from qdrant_client.http import models as qm  # type: ignore
+    except Exception:  # pragma: no cover
+        return None, None
+    return QdrantClient, qm
+
+
 class QdrantVectorStore(VectorStore):
     def __init__(self):
         self.collection = settings.VECTOR_COLLECTION
         self.url = settings.VECTOR_DB_URL.rstrip("/")
         # Keep the SDK client when available (useful for create_collection etc.),
         # but don't depend on its search API (it changes between versions).
+        QdrantClient, self.qm = _load_sdk()
         self.client = None
         if QdrantClient is not None:
             try:
@@ -149,9 +155,9 @@ class QdrantVectorStore(VectorStore):
                 )
 
         # Create collection if missing (SDK is stable here; fallback to REST if needed)
-        if self.client is not None and hasattr(self.client, "create_collection") and qm is not None:
+        if self.client is not None and hasattr(self.client, "create_collection") and self.qm is not None:
             try:
-                vectors_config = qm.VectorsConfigParams(size=dim, distance=qm.Distance.COSINE)
+                vectors_config = self.qm.VectorsConfigParams(size=dim, distance=self.qm.Distance.COSINE)
                 self.client.create_collection(collection_name=self.collection, vectors_config=vectors_config)
                 return
             except Exception:
@@ -181,12 +187,12 @@ class QdrantVectorStore(VectorStore):
 
     def search(self, vector: List[float], top_k: int, filter: Optional[Dict[str, Any]] = None):
         # Newer SDKs: client.search(...)
-        if hasattr(self.client, "search") and qm is not None:
+        if hasattr(self.client, "search") and self.qm is not None:
             try:
                 qfilter = None
                 if filter:
-                    qfilter = qm.Filter(
-                        must=[qm.FieldCondition(key=k, match=qm.MatchValue(value=v)) for k, v in filter.items()]
+                    qfilter = self.qm.Filter(
+                        must=[self.qm.FieldCondition(key=k, match=self.qm.MatchValue(value=v)) for k, v in filter.items()]
                     )
                 res = self.client.search(
                     collection_name=self.collection,
@@ -208,3 +214,11 @@ class QdrantVectorStore(VectorStore):
         with httpx.Client(timeout=10.0) as c:
             r = c.post(f"{self.url}/collections/{self.collection}/points/delete?wait=true", json=body)
             r.raise_for_status()
+
+    def delete_ids(self, ids: List[str]) -> None:
+        """Delete points by id (chunks that vanished on re-ingestion)."""
+        if not ids:
+            return
+        with httpx.Client(timeout=10.0) as c:
+            r = c.post(f"{self.url}/collections/{self.collection}/points/delete?wait=true", json={"points": list(ids)})
+            r.raise_for_status()
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException, Request
+
+from app.adapters.llm import hedged
+from app.core.config import settings
+from app.services import answer_cache_service, blob_service, rerank_service, scheduler_service
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+def _check_access(request: Request, destructive: bool = False) -> None:
+    """Without ADMIN_TOKEN the read-only endpoints stay open; destructive ones are refused."""
+    token = settings.ADMIN_TOKEN
+    if not token:
+        if destructive:
+            raise HTTPException(status_code=403, detail="Set ADMIN_TOKEN to enable this endpoint")
+        return
+    if request.headers.get(settings.ADMIN_TOKEN_HEADER) != token:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/blobs")
+async def blob_stats(request: Request):
+    _check_access(request)
+    return blob_service.stats()
+
+
+@router.post("/gc")
+async def run_gc(request: Request, dry_run: bool = False, retention_sec: float | None = None):
+    import asyncio
+
+    _check_access(request, destructive=True)
+    return await asyncio.to_thread(blob_service.gc, retention_sec, dry_run)
+
+
+@router.get("/answer-cache")
+async def answer_cache_stats(request: Request):
+    _check_access(request)
+    return answer_cache_service.stats()
+
+
+@router.delete("/answer-cache")
+async def clear_answer_cache(request: Request):
+    _check_access(request)
+    answer_cache_service.clear()
+    return {"ok": True}
+
+
+@router.get("/llm")
+async def llm_stats(request: Request):
+    _check_access(request)
+    return {**scheduler_service.get_scheduler().stats(), "backends": hedged.stats()}
+
+
+@router.get("/rerank")
+async def rerank_stats(request: Request):
+    _check_access(request)
+    return rerank_service.stats()
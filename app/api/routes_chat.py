@@ -1,14 +1,19 @@
 import json
 import asyncio
-from fastapi import APIRouter, HTTPException
+import time
+from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from app.services.retrieve_service import hybrid_search
 from app.services.rerank_service import rerank
-from app.services.citation_service import build_context, format_citations
-from app.services.rag_service import build_prompt
-from app.services.llm_factory import get_llm
+from app.services.citation_service import build_context, format_citations, pack_context, preview_hits
+from app.services.rag_service import build_followup_prompt, build_prompt
+from app.services.llm_factory import get_llm, llm_model_id
+from app.adapters.llm.scheduled import ScheduledLLM
+from app.services.embed_service import embed_query
+from app.services import answer_cache_service, session_service, singleflight_service
+from app.services.scheduler_service import BATCH, INTERACTIVE, Overloaded, get_scheduler
 from app.core.config import settings
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -19,23 +24,129 @@ class ChatRequest(BaseModel):
     mode: str | None = None
     jurisdiction: str | None = None
     status: str | None = None
+    # Optional multi-turn session from POST /chat/sessions.
+    session_id: str | None = None
+
+def _answer_cache_key(question: str, top: list[dict]) -> tuple[list[float] | None, tuple]:
+    """Question vector (already cached by retrieval) + evidence key for the answer cache."""
+    try:
+        qvec = embed_query(question)
+    except Exception:
+        qvec = None
+    return qvec, answer_cache_service.evidence_key(top, llm_model_id())
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(
+        status_code=e.status,
+        detail={"error": str(e), "hint": "The LLM is busy; retry after the given delay."},
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _prepare(question: str, session_id: str | None = None, progress=None) -> dict:
+    """Retrieval, rerank and answer-cache lookup; builds the prompt on a cache miss.
+
+    `progress(stage, previews)` receives the intermediate retrieval results.
+    """
+    session = session_service.get_session(session_id, turns=max(1, settings.CHAT_HISTORY_TURNS)) if session_id else None
+    turns = session["turns"] if session else []
+    query = session_service.retrieval_query(question, turns)
+    on_stage = (lambda stage, hits: progress(stage, preview_hits(hits))) if progress else None
+    hits = hybrid_search(query, meta_filter=None, on_stage=on_stage)
+    top = rerank(query, hits, settings.TOPK_RERANK)
+    if turns:
+        # Follow-up answers depend on the conversation: never served from the answer cache.
+        prep = {"qvec": None, "key": None, "hit": None}
+    else:
+        qvec, key = _answer_cache_key(question, top)
+        prep = {"qvec": qvec, "key": key, "hit": answer_cache_service.lookup(qvec, key)}
+    prep["session_id"] = session_id
+    prep["state"] = None
+    if not prep["hit"]:
+        # Citations are numbered per packed block, exactly as the [n] markers in the prompt.
+        blocks = pack_context(top)
+        ctx = build_context(blocks)
+        llm_context = session_service.reusable_context(session, llm_model_id())
+        full_prompt = build_prompt(question, ctx, mode="auto", history=session_service.condense_history(turns))
+        prep["prompt"] = build_followup_prompt(question, ctx) if llm_context else full_prompt
+        prep["citations"] = format_citations(blocks)
+        if session_id:
+            # Hedged backends that cannot continue from `context` get the full prompt.
+            prep["state"] = {"context": llm_context, "full_prompt": full_prompt if llm_context else None}
+    return prep
+
+
+async def _prepare_shared(question: str, session_id: str | None = None, progress=None) -> dict:
+    # Runs off the event loop so identical requests arriving meanwhile can join it
+    # (only the request that started it gets the `progress` callbacks).
+    return await singleflight_service.run(
+        ("prepare", session_id, singleflight_service.normalize(question)),
+        lambda: asyncio.to_thread(_prepare, question, session_id, progress),
+    )
+
+
+def _finish(question: str, prep: dict, answer: str, citations: list[dict]) -> None:
+    """Remember a generated answer (answer cache) and append it to the session."""
+    if prep["key"] is not None and not prep["hit"]:
+        answer_cache_service.store(prep["qvec"], prep["key"], question, answer, citations)
+    if prep["session_id"]:
+        state = prep["state"] or {}
+        session_service.add_turn(prep["session_id"], question, answer, citations, llm_model_id(), state.get("context"))
+
+
+def _check_session(session_id: str | None) -> None:
+    if session_id and not session_service.get_session(session_id, turns=0):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+
+
+async def _answer(question: str, session_id: str | None = None) -> dict:
+    prep = await _prepare_shared(question, session_id)
+    out = {"session_id": session_id} if session_id else {}
+    if prep["hit"]:
+        _finish(question, prep, prep["hit"]["answer"], prep["hit"]["citations"])
+        return {"answer": prep["hit"]["answer"], "citations": prep["hit"]["citations"], "cached": True, **out}
+    answer = await get_llm(priority=BATCH).generate(prep["prompt"], state=prep["state"])
+    _finish(question, prep, answer, prep["citations"])
+    return {"answer": answer, "citations": prep["citations"], **out}
+
+
+@router.post("/sessions")
+async def create_session():
+    session_id = session_service.create_session()
+    return {"session_id": session_id, "ttl_sec": settings.CHAT_SESSION_TTL_SEC}
+
+
+@router.get("/sessions/{session_id}")
+async def get_session(session_id: str):
+    session = session_service.get_session(session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired")
+    session.pop("llm_context", None)
+    return session
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not session_service.delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"ok": True}
+
 
 @router.post("")
 async def chat(req: ChatRequest):
     if not (req.question or "").strip():
         raise HTTPException(status_code=400, detail="question is required")
+    _check_session(req.session_id)
 
     try:
-        hits = hybrid_search(req.question, meta_filter=None)
-        top = rerank(req.question, hits, settings.TOPK_RERANK)
-
-        ctx = build_context(top)
-        prompt = build_prompt(req.question, ctx, mode="auto")
-
-        llm = get_llm()
-        answer = await llm.generate(prompt)
-        cites = format_citations(top)
-        return {"answer": answer, "citations": cites}
+        # Concurrent identical questions share one retrieval and one generation.
+        return await singleflight_service.run(
+            ("chat", req.session_id, singleflight_service.normalize(req.question)),
+            lambda: _answer(req.question, req.session_id),
+        )
+    except Overloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         msg = str(e)
         hint = (
@@ -47,93 +158,186 @@ async def chat(req: ChatRequest):
         raise HTTPException(status_code=503, detail={"error": msg, "hint": hint})
 
 
+_SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # For some reverse proxies; harmless locally.
+    "X-Accel-Buffering": "no",
+}
+
+
+def _sse(event: str, data, event_id: str | None = None) -> str:
+    head = f"id: {event_id}\n" if event_id else ""
+    payload = data if isinstance(data, str) else json.dumps(data, ensure_ascii=False)
+    return f"{head}event: {event}\ndata: {payload}\n\n"
+
+
+def _parse_last_event_id(value: str | None) -> tuple[str, int] | None:
+    """Event ids are `<stream_id>:<cursor>`."""
+    stream_id, _, cursor = (value or "").strip().partition(":")
+    if not stream_id or not cursor.isdigit():
+        return None
+    return stream_id, int(cursor)
+
+
+async def _follow(stream: singleflight_service.Broadcast, start: int = 0):
+    """SSE events of a (shared, resumable) generation from token cursor `start`."""
+    if start == 0:
+        # Send citations up-front so UI can show sources immediately.
+        yield _sse("meta", {**stream.meta, "stream_id": stream.id}, f"{stream.id}:0")
+
+    # Keep-alive + non-cancelled producer.
+    #
+    # Why this exists:
+    # - Ollama can take a long time before it emits the first token (slow CPU / large prompt).
+    # - Next.js' fetch (undici) has a default body timeout (~5 minutes) and will abort the
+    #   proxy request if no body bytes are received for too long.
+    #
+    # Solution:
+    # - Read Ollama's stream in a background task (a Broadcast shared by every identical
+    #   in-flight question; late joiners first replay the tokens already emitted). It keeps
+    #   generating for STREAM_GRACE_SEC after a disconnect so the client can resume.
+    # - While no token arrives, emit periodic SSE ping events.
+    gap = False
+    async for item in stream.subscribe(start=start, ping_sec=15.0):
+        if item[0] == "ping":
+            # Keep connection alive (UI can ignore this).
+            yield "event: ping\ndata: {}\n\n"
+        elif item[0] == "queue":
+            yield _sse("queue", {"position": item[1]})
+        elif item[0] == "token":
+            yield _sse("token", {"delta": item[1]}, f"{stream.id}:{item[2]}")
+        else:
+            gap = True
+            yield _sse("error", {"error": "This stream can no longer be resumed from that position; ask again."})
+            break
+
+    if stream.error and not gap:
+        error = {"error": str(stream.error)}
+        if isinstance(stream.error, Overloaded):
+            error["retry_after"] = stream.error.retry_after
+        yield _sse("error", error)
+
+    yield _sse("done", "[DONE]", f"{stream.id}:{stream.cursor}")
+
+
+def _resume(last_event_id: str | None, stream_id: str | None = None) -> StreamingResponse | None:
+    parsed = _parse_last_event_id(last_event_id)
+    stream = singleflight_service.resumable(stream_id or (parsed[0] if parsed else ""))
+    if stream is None:
+        return None
+    start = parsed[1] if parsed and parsed[0] == stream.id else 0
+    return StreamingResponse(_follow(stream, start), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
 @router.post("/stream")
-async def chat_stream(req: ChatRequest):
+async def chat_stream(req: ChatRequest, request: Request):
     """Server-Sent Events (SSE) token streaming endpoint.
 
-    Emits events:
-      - meta: { citations, prompt_info }
-      - token: { delta }
+    The response starts immediately and reports progress while retrieval runs:
+      - retrieval_started: {}
+      - lexical: { hits, ms }  (BM25 matches, before the embedding call)
+      - fused: { hits, ms }  (BM25 + vector after RRF, before rerank)
+      - meta: { citations, stream_id, cached? }  (reranked citations; the LLM has been
+        asked at this point; cached answers are replayed as token events)
+      - queue: { position }  (while waiting for an LLM slot; 0 = generation started)
+      - token: { delta }  (one or more coalesced deltas; id `<stream_id>:<cursor>`)
       - done: [DONE]
       - error: { error, hint }
 
+    A client whose connection dropped resumes with `GET /chat/stream/{stream_id}` (or by
+    repeating this request) with the `Last-Event-ID` header set to the last id it got.
+
     Frontends can read this via fetch() + ReadableStream.
     """
+    resumed = _resume(request.headers.get("last-event-id"))
+    if resumed is not None:
+        return resumed
     if not (req.question or "").strip():
         raise HTTPException(status_code=400, detail="question is required")
-
+    _check_session(req.session_id)
     try:
-        hits = hybrid_search(req.question, meta_filter=None)
-        top = rerank(req.question, hits, settings.TOPK_RERANK)
-        ctx = build_context(top)
-        prompt = build_prompt(req.question, ctx, mode="auto")
-        cites = format_citations(top)
-        llm = get_llm()
-    except Exception as e:
-        msg = str(e)
-        hint = (
-            "Dependency error. If running via Docker, ensure containers are up and models are pulled:\n"
-            "- docker compose up -d\n"
-            "- docker compose exec ollama ollama pull $OLLAMA_MODEL\n"
-            "- docker compose exec ollama ollama pull $OLLAMA_EMBED_MODEL"
-        )
-        raise HTTPException(status_code=503, detail={"error": msg, "hint": hint})
+        # Fail fast with 429 instead of opening a stream we cannot serve.
+        get_scheduler().check()
+    except Overloaded as e:
+        raise _overloaded(e)
 
     async def event_gen():
-        # Send citations up-front so UI can show sources immediately.
-        meta = {"citations": cites}
-        yield f"event: meta\ndata: {json.dumps(meta, ensure_ascii=False)}\n\n"
-
-        # Keep-alive + non-cancelled producer.
-        #
-        # Why this exists:
-        # - Ollama can take a long time before it emits the first token (slow CPU / large prompt).
-        # - Next.js' fetch (undici) has a default body timeout (~5 minutes) and will abort the
-        #   proxy request if no body bytes are received for too long.
-        #
-        # Solution:
-        # - Read Ollama's stream in a background task into a queue.
-        # - While the queue is empty, emit periodic SSE ping events.
-        q: asyncio.Queue[str] = asyncio.Queue()
-        done = asyncio.Event()
-        err: dict[str, str] = {}
-
-        async def producer():
-            try:
-                async for delta in llm.stream_generate(prompt):
-                    if delta:
-                        await q.put(delta)
-            except Exception as e:
-                err["error"] = str(e)
-            finally:
-                done.set()
-
-        task = asyncio.create_task(producer())
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        stages: asyncio.Queue = asyncio.Queue()
+
+        def progress(stage: str, hits: list[dict]) -> None:  # called from the retrieval thread
+            ms = round((time.perf_counter() - t0) * 1000, 1)
+            loop.call_soon_threadsafe(stages.put_nowait, (stage, {"hits": hits, "ms": ms}))
 
+        yield _sse("retrieval_started", {})
+        task = asyncio.ensure_future(_prepare_shared(req.question, req.session_id, progress))
+        task.add_done_callback(lambda t: stages.put_nowait(("prepared", t)))
         try:
             while True:
                 try:
-                    delta = await asyncio.wait_for(q.get(), timeout=15.0)
-                    yield f"event: token\ndata: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+                    stage, data = await asyncio.wait_for(stages.get(), timeout=15.0)
                 except asyncio.TimeoutError:
-                    # Keep connection alive (UI can ignore this).
                     yield "event: ping\ndata: {}\n\n"
+                    continue
+                if stage == "prepared":
+                    break
+                yield _sse(stage, data)
+            prep = data.result()
+            hit = prep["hit"]
+            llm = None if hit else get_llm(priority=INTERACTIVE)
+        except Exception as e:
+            hint = (
+                "Dependency error. If running via Docker, ensure containers are up and models are pulled:\n"
+                "- docker compose up -d\n"
+                "- docker compose exec ollama ollama pull $OLLAMA_MODEL\n"
+                "- docker compose exec ollama ollama pull $OLLAMA_EMBED_MODEL"
+            )
+            yield _sse("error", {"error": str(e), "hint": hint})
+            yield _sse("done", "[DONE]")
+            return
+        finally:
+            if not task.done():
+                task.cancel()  # the shared retrieval itself is shielded and still completes
 
-                    if done.is_set() and q.empty():
-                        break
+        meta = {"citations": hit["citations"] if hit else prep["citations"]}
+        if req.session_id:
+            meta["session_id"] = req.session_id
 
-            if "error" in err:
-                yield f"event: error\ndata: {json.dumps({'error': err['error']}, ensure_ascii=False)}\n\n"
+        if hit:
+            # Cached answer: same event shape as a live stream, without touching the LLM.
+            if req.session_id:
+                _finish(req.question, prep, hit["answer"], hit["citations"])
+            yield _sse("meta", {**meta, "cached": True})
+            for delta in answer_cache_service.replay_chunks(hit["answer"], size=settings.STREAM_FRAME_MAX_CHARS):
+                yield _sse("token", {"delta": delta})
+            yield _sse("done", "[DONE]")
+            return
 
-            yield "event: done\ndata: [DONE]\n\n"
-        finally:
-            if not task.done():
-                task.cancel()
-
-    headers = {
-        "Cache-Control": "no-cache",
-        "Connection": "keep-alive",
-        # For some reverse proxies; harmless locally.
-        "X-Accel-Buffering": "no",
-    }
-    return StreamingResponse(event_gen(), media_type="text/event-stream", headers=headers)
+        def remember(answer: str) -> None:
+            _finish(req.question, prep, answer, prep["citations"])
+
+        def produce(b):
+            if isinstance(llm, ScheduledLLM):  # report queue positions to every subscriber
+                return llm.stream_generate(prep["prompt"], state=prep["state"], on_queue=b.set_queue_position)
+            return llm.stream_generate(prep["prompt"], state=prep["state"])
+
+        # The prompt goes to the LLM right here, before the citations event is even sent.
+        stream_key = ("stream", req.session_id, singleflight_service.normalize(req.question), prep["key"])
+        stream, leader = singleflight_service.stream(stream_key, produce, on_complete=remember)
+        if leader:
+            stream.meta = meta
+        async for chunk in _follow(stream):
+            yield chunk
+
+    return StreamingResponse(event_gen(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.get("/stream/{stream_id}")
+async def resume_stream(stream_id: str, request: Request, last_event_id: str | None = None):
+    """Resume a /chat/stream generation after `Last-Event-ID` (header or query)."""
+    resumed = _resume(request.headers.get("last-event-id") or last_event_id, stream_id)
+    if resumed is None:
+        raise HTTPException(status_code=404, detail="Stream not found or expired")
+    return resumed
@@ -1,28 +1,60 @@
-from fastapi import APIRouter, HTTPException
-from app.services.store_service import get_document, get_chunk, list_documents, delete_document
+from fastapi import APIRouter, HTTPException, Response
+
+from app.core.config import settings
+from app.services.pipeline_service import page_range
+from app.services.store_service import (
+    delete_document,
+    get_chunk,
+    get_document,
+    get_document_text,
+    get_page_spans,
+    list_documents_page,
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
 @router.get("/")
-async def list_docs():
-    docs = list_documents()
-    # Provide an `id` field for frontend convenience (legacy UI expects it).
-    out = []
+async def list_docs(response: Response, limit: int | None = None, cursor: str | None = None):
+    """Newest-first document metadata.
+
+    Pass `limit` to page through large collections; the cursor of the next page comes
+    back in the `X-Next-Cursor` header (absent on the last page). Without `limit` the
+    full list is returned, as legacy clients expect.
+    """
+    if limit is not None:
+        limit = max(1, min(limit, settings.DOCUMENTS_PAGE_MAX))
+    try:
+        docs, next_cursor = list_documents_page(limit=limit, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     for d in docs:
-        payload = d.model_dump()
-        payload["id"] = payload.get("doc_id")
-        # raw_text can be large; UI doesn't need it for listing.
-        payload.pop("raw_text", None)
-        out.append(payload)
-    return out
+        # Provide an `id` field for frontend convenience (legacy UI expects it).
+        d["id"] = d["doc_id"]
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return docs
 
 @router.get("/{doc_id}")
-async def get_doc(doc_id: str):
+async def get_doc(doc_id: str, offset: int = 0, limit: int | None = None, include_text: bool = True):
+    """Document metadata plus `raw_text[offset:offset+limit]` (whole text when no limit)."""
     doc = get_document(doc_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found")
-    return doc.model_dump()
+    payload = doc.model_dump()
+    if include_text:
+        text = get_document_text(doc_id) or ""
+        start = max(0, offset)
+        end = len(text) if limit is None else min(len(text), start + max(0, limit))
+        payload["raw_text"] = text[start:end]
+        payload["text_length"] = len(text)
+        payload["offset"] = start
+        payload["next_offset"] = end if end < len(text) else None
+        spans = get_page_spans(doc_id) if start < end else []
+        if spans:
+            # PDF pages the returned range spans (page offsets are loaded only here).
+            payload["page_start"], payload["page_end"] = page_range(spans, start, end)
+    return payload
 
 
 @router.delete("/{doc_id}")
@@ -1,15 +1,11 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
-from app.services.ingest_service import (
-    ingest_txt_path,
-    ingest_docx_path,
-    ingest_pdf_path,
-    ingest_html_url,
-    ingest_youtube,
-    ingest_url_auto,
-)
-from app.services.pipeline_service import ingest_document
+from app.core.config import settings
+from app.services.job_service import execute, get_job, list_jobs, submit_job
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
@@ -17,77 +13,238 @@ router = APIRouter(prefix="/ingest", tags=["ingest"])
 class IngestPathRequest(BaseModel):
     path: str
     mode: str = "auto"  # auto|general|legal
+    update: bool = False  # re-ingest in place if this path was ingested before
+    background: bool | None = None  # None => settings.INGEST_BACKGROUND
 
 
 class IngestURLRequest(BaseModel):
     url: str
     mode: str = "auto"
     source: str = "auto"  # auto|html|youtube
+    update: bool = False
+    background: bool | None = None
+
+
+class IngestURLsRequest(BaseModel):
+    urls: list[str]
+    mode: str = "auto"
+    background: bool | None = None
+
+
+class IngestBulkRequest(BaseModel):
+    path: str  # directory or .zip archive on the server
+    mode: str = "auto"
+    workers: int | None = None  # None => BULK_WORKERS
+    background: bool | None = None
+
+
+def _background(flag: bool | None) -> bool:
+    return settings.INGEST_BACKGROUND if flag is None else bool(flag)
+
+
+def _accepted(job: dict, **extra) -> JSONResponse:
+    return JSONResponse(
+        {
+            "ok": True,
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "status_url": f"/ingest/jobs/{job['job_id']}",
+            **extra,
+        },
+        status_code=202,
+    )
 
 
 @router.post("/path")
 async def ingest_path(req: IngestPathRequest):
-    path = (req.path or "").lower()
-    if path.endswith(".pdf"):
-        doc = ingest_pdf_path(req.path)
-    elif path.endswith(".docx"):
-        doc = ingest_docx_path(req.path)
-    else:
-        doc = ingest_txt_path(req.path)
-    return ingest_document(doc, mode=req.mode or "auto")
+    payload = {"path": req.path, "mode": req.mode or "auto", "update": req.update}
+    if _background(req.background):
+        return _accepted(submit_job("path", payload))
+    # Off the event loop: job workers, sync scans and open chat streams share it.
+    return await asyncio.to_thread(execute, "path", payload)
 
 
 @router.post("/url")
 async def ingest_url(req: IngestURLRequest):
-    from app.core.config import settings
+    payload = {"url": req.url, "mode": req.mode or "auto", "source": req.source or "auto", "update": req.update}
+    if _background(req.background):
+        return _accepted(submit_job("url", payload))
+    try:
+        return await asyncio.to_thread(execute, "url", payload)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/urls")
+async def ingest_urls_api(req: IngestURLsRequest):
+    from app.services.fetch_service import ingest_urls
+
+    if not req.urls:
+        raise HTTPException(status_code=400, detail="No URLs given")
+    if _background(req.background):
+        return _accepted(submit_job("urls", {"urls": req.urls, "mode": req.mode or "auto"}))
+    return await ingest_urls(req.urls, mode=req.mode or "auto")
+
 
+@router.post("/bulk")
+async def ingest_bulk(req: IngestBulkRequest):
+    payload = {"path": req.path, "mode": req.mode or "auto", "workers": req.workers}
+    if _background(req.background):
+        return _accepted(submit_job("bulk", payload))
     try:
-        if (req.source or "auto") == "youtube":
-            doc = ingest_youtube(req.url)
-        elif (req.source or "auto") == "html":
-            doc = ingest_html_url(req.url)
-        else:
-            doc = ingest_url_auto(req.url, data_dir=settings.DATA_DIR)
-        return ingest_document(doc, mode=req.mode or "auto")
+        # Runs for a while: keep the event loop free for other requests.
+        return await asyncio.to_thread(execute, "bulk", payload)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/upload")
-async def ingest_upload(mode: str = "auto", file: UploadFile = File(...)):
+_UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+
+async def _receive_upload(request: Request) -> tuple[str, str, str]:
+    """Write the multipart `file` field to DATA_DIR while hashing it; returns (path, name, sha256).
+
+    The body is parsed as it arrives from the socket, so there is a single copy on disk
+    (no framework spool file first) and MAX_UPLOAD_MB stops the transfer once exceeded.
+    A Content-Length that is already over the limit is rejected before reading anything.
+    """
+    import hashlib
     import os
     import uuid
     from pathlib import Path
 
-    from app.core.config import settings
+    try:
+        from python_multipart.multipart import MultipartParser, parse_options_header
+    except ImportError:  # python-multipart < 0.0.13
+        from multipart.multipart import MultipartParser, parse_options_header
+
+    limit = settings.MAX_UPLOAD_MB * 1024 * 1024
+    too_large = HTTPException(status_code=413, detail=f"Upload exceeds MAX_UPLOAD_MB={settings.MAX_UPLOAD_MB}")
+    length = request.headers.get("content-length", "")
+    if limit and length.isdigit() and int(length) > limit + 64 * 1024:  # allow for multipart framing
+        raise too_large
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data with a `file` field")
 
     os.makedirs(settings.DATA_DIR, exist_ok=True)
+    sha = hashlib.sha256()
+    st: dict = {"field": b"", "value": b"", "headers": {}, "out": None, "path": None, "name": None, "size": 0, "done": False}
+
+    def on_part_begin():
+        st["headers"] = {}
 
-    # Use the original filename for display, but keep a safe tmp name on disk.
-    original_name = Path(file.filename or "upload").name
-    suffix = (original_name.split(".")[-1].lower() if "." in original_name else "txt")
+    def on_header_field(data, start, end):
+        st["field"] += data[start:end]
 
-    tmp = os.path.join(settings.DATA_DIR, f"upload_{uuid.uuid4()}.{suffix}")
-    content = await file.read()
-    with open(tmp, "wb") as f:
-        f.write(content)
+    def on_header_value(data, start, end):
+        st["value"] += data[start:end]
+
+    def on_header_end():
+        st["headers"][st["field"].lower()] = st["value"]
+        st["field"], st["value"] = b"", b""
+
+    def on_headers_finished():
+        _, disp = parse_options_header(st["headers"].get(b"content-disposition", b""))
+        if disp.get(b"name") != b"file" or st["path"] or b"filename" not in disp:
+            return
+        # Use the original filename for display, but keep a safe tmp name on disk.
+        st["name"] = Path(disp[b"filename"].decode("utf-8", "replace") or "upload").name
+        suffix = st["name"].split(".")[-1].lower() if "." in st["name"] else "txt"
+        st["path"] = os.path.join(settings.DATA_DIR, f"upload_{uuid.uuid4()}.{suffix}")
+        st["out"] = open(st["path"], "wb")
+
+    def on_part_data(data, start, end):
+        if st["out"] is None or st["done"]:
+            return
+        st["size"] += end - start
+        if limit and st["size"] > limit:
+            raise too_large
+        buf = data[start:end]
+        sha.update(buf)
+        st["out"].write(buf)
+
+    def on_part_end():
+        if st["out"] is not None and not st["done"]:
+            st["out"].close()
+            st["done"] = True
+
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        },
+    )
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+        if not st["done"]:
+            raise HTTPException(status_code=400, detail="Missing `file` field")
+    except BaseException:
+        if st["out"] is not None:
+            st["out"].close()
+        if st["path"] and os.path.exists(st["path"]):
+            os.remove(st["path"])
+        raise
+    return st["path"], st["name"], sha.hexdigest()
+
+
+@router.post("/upload", openapi_extra=_UPLOAD_FORM)
+async def ingest_upload(request: Request, mode: str = "auto", background: bool | None = None):
+    import os
+
+    from app.services.blob_service import put_file
+    from app.services.job_service import find_pending_upload
+    from app.services.store_service import find_document_by_hash
+
+    tmp, original_name, content_hash = await _receive_upload(request)
+    existing = find_document_by_hash(content_hash)
+    if existing:
+        # Same bytes already ingested: no parsing, no embedding.
+        os.remove(tmp)
+        return {"ok": True, **existing, "duplicate": True, "content_hash": content_hash, "warnings": []}
+    pending = find_pending_upload(content_hash)
+    if pending:
+        # Same bytes still waiting in the job queue: point at that job instead of a second one.
+        os.remove(tmp)
+        return _accepted(pending, duplicate=True, content_hash=content_hash)
+
+    # Identical bytes are stored once; GC removes the file after its documents are gone.
+    blob_hash, path = put_file(tmp, content_hash)
+    payload = {
+        "path": path,
+        "original_name": original_name,
+        "content_hash": content_hash,
+        "blob_hash": blob_hash,
+        "mode": mode or "auto",
+    }
+    if _background(background):
+        return _accepted(submit_job("upload", payload))
 
     try:
-        if tmp.endswith(".pdf"):
-            doc = ingest_pdf_path(tmp, title_override=original_name, meta_extra={"original_name": original_name})
-        elif tmp.endswith(".docx"):
-            doc = ingest_docx_path(tmp, title_override=original_name, meta_extra={"original_name": original_name})
-        else:
-            doc = ingest_txt_path(tmp, title_override=original_name, meta_extra={"original_name": original_name})
-
-        # Keep temp path for debugging.
-        try:
-            doc.meta = dict(doc.meta or {})
-            doc.meta["tmp_path"] = tmp
-        except Exception:
-            pass
-
-        return ingest_document(doc, mode=mode or "auto")
+        return await asyncio.to_thread(execute, "upload", payload)
     except Exception as e:
         msg = str(e)
         hint = (
@@ -99,3 +256,36 @@ async def ingest_upload(mode: str = "auto", file: UploadFile = File(...)):
             "- Set VECTOR_RECREATE_ON_DIM_MISMATCH=true (default) or delete qdrant volume."
         )
         raise HTTPException(status_code=503, detail={"error": msg, "hint": hint})
+
+
+class IngestSyncRequest(BaseModel):
+    dirs: list[str] | None = None  # None => SYNC_DIRS
+    mode: str | None = None
+
+
+@router.post("/sync")
+async def ingest_sync(req: IngestSyncRequest | None = None):
+    from app.services.sync_service import sync_all
+
+    req = req or IngestSyncRequest()
+    return await asyncio.to_thread(sync_all, req.dirs, req.mode)
+
+
+@router.get("/sync")
+async def ingest_sync_status():
+    from app.services.sync_service import status
+
+    return status()
+
+
+@router.get("/jobs")
+async def list_jobs_api(status: str | None = None, limit: int = 50):
+    return {"jobs": list_jobs(status=status, limit=max(1, min(limit, 500)))}
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_api(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
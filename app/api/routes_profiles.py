@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from app.core.config import settings
+from app.services.profile_service import list_profiles, resolve_profile
+
+router = APIRouter(prefix="/profiles", tags=["profiles"])
+
+
+def _check_access(request: Request) -> None:
+    if not settings.PROFILE_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    token = settings.PROFILE_TOKEN
+    if token and request.headers.get(settings.PROFILE_TOKEN_HEADER) != token:
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+
+@router.get("")
+async def list_profiles_api(request: Request):
+    _check_access(request)
+    return {"profiles": list_profiles()}
+
+
+@router.get("/{name}")
+async def download_profile(name: str, request: Request):
+    _check_access(request)
+    p = resolve_profile(name)
+    if not p:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(p, media_type="text/plain", filename=p.name)
@@ -1,7 +1,10 @@
+import asyncio
+
 from fastapi import APIRouter
 from pydantic import BaseModel
 from app.services.retrieve_service import hybrid_search
 from app.services.rerank_service import rerank
+from app.services import singleflight_service
 from app.core.config import settings
 
 router = APIRouter(prefix="/search", tags=["search"])
@@ -21,6 +24,12 @@ async def search(req: SearchRequest):
             meta_filter["jurisdiction"] = req.jurisdiction
         if req.status:
             meta_filter["status"] = req.status
-    hits = hybrid_search(req.query, meta_filter=meta_filter if meta_filter else None)
-    top = rerank(req.query, hits, settings.TOPK_RERANK)
+    # Identical concurrent searches share one retrieval, run off the event loop.
+    key = ("search", singleflight_service.normalize(req.query), tuple(sorted(meta_filter.items())))
+    return await singleflight_service.run(key, lambda: asyncio.to_thread(_search, req.query, meta_filter or None))
+
+
+def _search(query: str, meta_filter: dict | None) -> dict:
+    hits = hybrid_search(query, meta_filter=meta_filter)
+    top = rerank(query, hits, settings.TOPK_RERANK)
     return {"results": top}
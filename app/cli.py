@@ -0,0 +1,97 @@
+"""Command-line entry points for maintenance tasks.
+
+  python -m app.cli bulk-ingest /srv/share/hr --mode auto --workers 8
+  python -m app.cli bulk-ingest onboarding.zip --json
+  python -m app.cli sync /srv/share/kb
+  python -m app.cli gc --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+
+def _bulk_ingest(args) -> int:
+    from app.services.bulk_service import bulk_ingest
+
+    res = bulk_ingest(args.path, mode=args.mode, workers=args.workers)
+    if args.json:
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+    else:
+        print(
+            f"ingested {res['ingested']}/{res['files']} files, {res['chunks']} chunks "
+            f"in {res['seconds']}s ({res['files_per_s']} files/s, {res['chunks_per_s']} chunks/s)"
+        )
+        print("stage seconds: " + ", ".join(f"{k}={v}" for k, v in res["stage_seconds"].items()))
+        if res["skipped"]:
+            print(f"skipped {len(res['skipped'])} unsupported file(s)")
+        for w in res["warnings"]:
+            print(f"warning: {w}")
+        for f in res["failed"]:
+            print(f"FAILED {f['path']}: {f['error']}", file=sys.stderr)
+    return 0 if res["ok"] else 1
+
+
+def _sync(args) -> int:
+    from app.services.sync_service import sync_all
+
+    res = sync_all(args.dirs or None, mode=args.mode)
+    if args.json:
+        print(json.dumps(res, indent=2, ensure_ascii=False))
+    else:
+        for r in res["roots"]:
+            print(
+                f"{r['root']}: +{len(r['added'])} ~{len(r['modified'])} -{len(r['deleted'])} "
+                f"({r['unchanged']} unchanged, {r['touched']} touched)"
+            )
+            for f in r["failed"]:
+                print(f"FAILED {f['path']}: {f['error']}", file=sys.stderr)
+        for w in res["warnings"]:
+            print(f"warning: {w}", file=sys.stderr)
+    return 0 if res["ok"] else 1
+
+
+def _gc(args) -> int:
+    from app.services.blob_service import gc
+
+    res = gc(retention_sec=args.retention_sec, dry_run=args.dry_run)
+    verb = "would remove" if res["dry_run"] else "removed"
+    print(f"{verb} {res['removed']} file(s), {res['bytes']} bytes, {res['pdf_page_caches']} orphaned PDF page cache(s)")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.core.logging import setup_logging
+    from app.services.store_service import init_db
+
+    ap = argparse.ArgumentParser(prog="python -m app.cli", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("bulk-ingest", help="ingest a directory or zip archive")
+    p.add_argument("path")
+    p.add_argument("--mode", default="auto", choices=["auto", "general", "legal"])
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--json", action="store_true", help="print the full JSON report")
+    p.set_defaults(func=_bulk_ingest)
+
+    p = sub.add_parser("sync", help="sync watched folders once (default: SYNC_DIRS)")
+    p.add_argument("dirs", nargs="*")
+    p.add_argument("--mode", default=None, choices=["auto", "general", "legal"])
+    p.add_argument("--json", action="store_true", help="print the full JSON report")
+    p.set_defaults(func=_sync)
+
+    p = sub.add_parser("gc", help="delete unreferenced uploads/downloads past BLOB_RETENTION_SEC")
+    p.add_argument("--retention-sec", type=float, default=None)
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=_gc)
+
+    args = ap.parse_args(argv)
+    setup_logging()
+    init_db()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
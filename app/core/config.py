@@ -8,6 +8,7 @@ class Settings(BaseSettings):
     DATA_DIR: str = "./data"
     DB_PATH: str = "./data/eka.sqlite3"
 
+    VECTOR_BACKEND: str = "qdrant"  # qdrant|memory (memory = in-process stand-in for benchmarks/tests)
     VECTOR_DB_URL: str = "http://localhost:6333"
     VECTOR_COLLECTION: str = "eka_chunks"
     VECTOR_RECREATE_ON_DIM_MISMATCH: bool = True
@@ -19,14 +20,112 @@ class Settings(BaseSettings):
     OLLAMA_EMBED_MODEL: str = "nomic-embed-text"
     OPENAI_EMBED_MODEL: str = "text-embedding-3-small"
 
+    # zlib level for document text stored in SQLite (1 = fastest, 9 = smallest).
+    TEXT_COMPRESS_LEVEL: int = 6
+
+    # In-process LRU of document title/source used by citation formatting.
+    DOC_META_CACHE_SIZE: int = 10000
+
+    # Upper bound for `limit` on GET /documents/.
+    DOCUMENTS_PAGE_MAX: int = 1000
+
+    # LRU of query embeddings (retrieval + answer cache).
+    QUERY_EMBED_CACHE_SIZE: int = 1024
+
+    # Semantic answer cache for /chat: same evidence chunks + question cosine >= MIN_SIM.
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MIN_SIM: float = 0.95
+    ANSWER_CACHE_TTL_SEC: int = 3600
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+
+    # Identical concurrent /search and /chat requests share one retrieval and generation.
+    COALESCE_ENABLED: bool = True
+
+    # /chat/stream: token frames are coalesced for up to STREAM_FRAME_MS / STREAM_FRAME_MAX_CHARS.
+    # A dropped client can resume (Last-Event-ID) while generation continues for STREAM_GRACE_SEC
+    # without listeners; finished streams stay resumable for STREAM_RESUME_TTL_SEC.
+    STREAM_FRAME_MS: int = 50
+    STREAM_FRAME_MAX_CHARS: int = 512
+    STREAM_GRACE_SEC: float = 30.0
+    STREAM_RESUME_TTL_SEC: float = 120.0
+    STREAM_BUFFER_MAX_CHARS: int = 256 * 1024
+
+    # LLM admission control: concurrent generations (0 = unlimited), wait queue bound and timeout.
+    LLM_MAX_CONCURRENCY: int = 2
+    LLM_QUEUE_MAX: int = 32
+    LLM_QUEUE_TIMEOUT_SEC: float = 120.0
+
+    # Hedged generation: comma-separated extra backends ("openai", "ollama" or another Ollama
+    # base URL such as http://gpu-box:11434). A backend with no token after LLM_HEDGE_AFTER_MS
+    # gets a second request to the next one (0 = only fall back on errors); the first to stream wins.
+    LLM_HEDGE_BACKENDS: str = ""
+    LLM_HEDGE_AFTER_MS: int = 2500
+
+    # Multi-turn chat sessions: expiry after the last turn, condensed history size, and the
+    # largest Ollama context (tokens) a follow-up continues from before starting afresh.
+    CHAT_SESSION_TTL_SEC: int = 86400
+    CHAT_HISTORY_TURNS: int = 4
+    CHAT_HISTORY_MAX_CHARS: int = 2000
+    CHAT_KV_MAX_TOKENS: int = 6000
+
+    # Uploads are parsed from the request stream straight to disk; 0 disables the size limit.
+    MAX_UPLOAD_MB: int = 200
+
+    # Content-addressed store for uploads/downloads (DATA_DIR/blobs). Unreferenced blobs are
+    # deleted by GC after BLOB_RETENTION_SEC; GC runs every BLOB_GC_INTERVAL_SEC (0 = manual only).
+    BLOB_RETENTION_SEC: float = 86400.0
+    BLOB_GC_INTERVAL_SEC: float = 3600.0
+
+    # /admin endpoints; when ADMIN_TOKEN is set, callers must send it in ADMIN_TOKEN_HEADER.
+    # Without it, destructive endpoints (POST /admin/gc) are refused.
+    ADMIN_TOKEN: str | None = None
+    ADMIN_TOKEN_HEADER: str = "X-EKA-Admin-Token"
+
+    # Batch URL ingestion (POST /ingest/urls): pooled async client, per-host limit, streamed downloads.
+    FETCH_CONCURRENCY: int = 16
+    FETCH_PER_HOST: int = 4
+    FETCH_TIMEOUT_SEC: float = 60.0
+    FETCH_MAX_MB: int = 200
+
+    # PDF text extraction: pages are extracted in a process pool (PDF_WORKERS, 0 = CPU count)
+    # once a file has PDF_PARALLEL_MIN_PAGES uncached pages, and cached per (file hash, page).
+    PDF_WORKERS: int = 0
+    PDF_PARALLEL_MIN_PAGES: int = 64
+    PDF_PAGE_CACHE: bool = True
+
+    # Streaming ingest pipeline: chunks per embed/upsert batch and batches buffered per stage.
+    PIPELINE_BATCH: int = 64
+    PIPELINE_QUEUE_DEPTH: int = 2
+
+    # Background ingest jobs (see app/services/job_service.py).
+    INGEST_BACKGROUND: bool = False  # default for the `background` flag on /ingest/* routes
+    INGEST_WORKERS: int = 1
+    INGEST_POLL_SEC: float = 2.0
+    INGEST_JOB_MAX_ATTEMPTS: int = 3
+
+    # Bulk directory/zip ingestion (see app/services/bulk_service.py).
+    BULK_WORKERS: int = 0  # parser processes; 0 => os.cpu_count()
+    BULK_EMBED_BATCH: int = 256  # chunks per embedding request, shared across documents
+    BULK_COMMIT_BATCHES: int = 4  # embed batches buffered per SQLite transaction
+
     EMBED_DIM: int = 768
     TOPK_VECTOR: int = 8
     TOPK_BM25: int = 6
     TOPK_RERANK: int = 6
     RRF_K: int = 60
+    # Prompt context budget (≈ chars/4 tokens) after merging overlapping chunks; 0 = unlimited.
+    CONTEXT_TOKEN_BUDGET: int = 2000
 
     RERANK_BACKEND: str = "none"  # none|st
     RERANK_MODEL: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    # Cross-encoder: score only the RERANK_MAX_CANDIDATES best lexical matches (0 = all), with
+    # passages cut to RERANK_MAX_CHARS; cache RERANK_CACHE_SIZE (query, chunk) scores; batch the
+    # pairs of concurrent requests (up to RERANK_BATCH_MAX_PAIRS, waiting RERANK_BATCH_WAIT_MS).
+    RERANK_MAX_CANDIDATES: int = 12
+    RERANK_MAX_CHARS: int = 1500
+    RERANK_CACHE_SIZE: int = 20000
+    RERANK_BATCH_MAX_PAIRS: int = 64
+    RERANK_BATCH_WAIT_MS: int = 0
 
     LLM_PROVIDER: str = "ollama"  # ollama|openai
     OLLAMA_MODEL: str = "llama3.1"
@@ -35,9 +134,27 @@ class Settings(BaseSettings):
     OLLAMA_TEMPERATURE: float = 0.2
     OLLAMA_TOP_P: float = 0.9
 
+    # Load Ollama models (LLM + embeddings) in the background at startup, using keep_alive.
+    WARMUP_PRELOAD_MODELS: bool = True
+
     OPENAI_API_KEY: str | None = None
     OPENAI_MODEL: str = "gpt-4o-mini"
 
+    # Watched-folder sync (app/services/sync_service.py). Comma-separated directories;
+    # the background scan runs every SYNC_INTERVAL_SEC (0 = only on POST /ingest/sync or the CLI).
+    SYNC_DIRS: str = ""
+    SYNC_INTERVAL_SEC: float = 300.0
+    SYNC_MODE: str = "auto"
+
+    # On-demand request profiling (see app/services/profile_service.py).
+    PROFILE_ENABLED: bool = False
+    PROFILE_HEADER: str = "X-EKA-Profile"
+    PROFILE_TOKEN: str | None = None  # when set, callers must also send it
+    PROFILE_TOKEN_HEADER: str = "X-EKA-Profile-Token"
+    PROFILE_PATHS: str = "/search,/chat"
+    PROFILE_INTERVAL_MS: float = 5.0
+    PROFILE_MAX_FILES: int = 50
+
     CORS_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000,http://localhost:8501,http://127.0.0.1:8501"
 
 
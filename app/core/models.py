@@ -5,7 +5,9 @@ class Document(BaseModel):
     doc_id: str
     source: Literal["pdf","docx","html","youtube","txt","other"]
     title: str | None = None
-    raw_text: str
+    # Full extracted text. Stored compressed in `document_text` and only loaded on request,
+    # so documents read back from the store have "" here unless text was asked for.
+    raw_text: str = ""
     # Optional semantic mode label. Kept for backward/forward compatibility with earlier builds.
     mode: str | None = None
     meta: dict[str, Any] = Field(default_factory=dict)
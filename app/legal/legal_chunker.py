@@ -1,4 +1,5 @@
-import re, uuid
+import re
+from typing import Iterator
 from app.core.models import Document, Chunk
 
 # Identify common legal headings: I., II., A., 1., (a), (1)
@@ -23,13 +24,19 @@ def _level(token: str) -> int:
     return 9
 
 def chunk_legal(doc: Document, max_chars=1400, overlap=200) -> list[Chunk]:
+    return list(iter_chunks_legal(doc, max_chars=max_chars, overlap=overlap))
+
+def iter_chunks_legal(doc: Document, max_chars=1400, overlap=200) -> Iterator[Chunk]:
     text = doc.raw_text
     matches = list(LEGAL_HEAD_RE.finditer(text))
     if not matches:
-        from app.services.chunk_service import chunk_general
-        return chunk_general(doc)
+        from app.services.chunk_service import iter_chunks_general
+        yield from iter_chunks_general(doc)
+        return
+
+    from app.services.chunk_service import stable_chunk_id
 
-    chunks: list[Chunk] = []
+    seen: dict[str, int] = {}
     stack: list[tuple[int,str]] = []  # (level, heading)
     for i, m in enumerate(matches):
         start = m.start()
@@ -53,15 +60,14 @@ def chunk_legal(doc: Document, max_chars=1400, overlap=200) -> list[Chunk]:
             k = min(j + max_chars, len(body))
             part = body[j:k].strip()
             if part:
-                chunks.append(Chunk(
-                    chunk_id=str(uuid.uuid4()),
+                yield Chunk(
+                    chunk_id=stable_chunk_id(doc.doc_id, part, seen),
                     doc_id=doc.doc_id,
                     text=part,
                     start_char=start + j,
                     end_char=start + k,
                     heading_path=heading_path,
                     meta={"legal_mode": True, "source": doc.source, **doc.meta},
-                ))
+                )
             if k == len(body): break
             j = max(0, k - overlap)
-    return chunks
@@ -1,28 +1,43 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from app.core.config import settings
 from app.core.logging import setup_logging
-from app.services.store_service import init_db
-from app.services.retrieve_service import rebuild_bm25
-from app.services.retrieve_service import get_vector
 
-from app.api.routes_ingest import router as ingest_router
-from app.api.routes_search import router as search_router
-from app.api.routes_chat import router as chat_router
-from app.api.routes_documents import router as docs_router
 
-def create_app():
-    setup_logging()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.services.store_service import init_db
+    from app.services import blob_service, job_service, session_service, sync_service, warmup_service
+
+    # SQLite schema setup is fast and everything else depends on it: keep it inline.
     init_db()
-    # Ensure vector collection exists early (may auto-recreate on dim mismatch)
+    warmup_service.mark_ok("db")
+
+    # Index loading, collection checks and model preloading run in the background so
+    # uvicorn starts accepting connections immediately. /ready reports progress.
+    warmup = asyncio.create_task(warmup_service.warmup())
+    app.state.background_tasks = [
+        warmup,
+        *job_service.start_workers(),
+        *sync_service.start(),
+        *blob_service.start(),
+        *session_service.start(),
+    ]
     try:
-        get_vector().ensure_collection(dim=settings.EMBED_DIM)
-    except Exception:
-        # Don't block startup; /health will expose dependency state.
-        pass
-    # build bm25 from sqlite on startup (fast for MVP)
-    rebuild_bm25()
+        yield
+    finally:
+        for task in app.state.background_tasks:
+            if not task.done():
+                task.cancel()
 
-    app = FastAPI(title=settings.APP_NAME)
+
+def create_app():
+    setup_logging()
+
+    app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
 
     # Allow browser-based UIs (Next.js/Streamlit) to call the API from localhost
     from fastapi.middleware.cors import CORSMiddleware
@@ -34,12 +49,28 @@ def create_app():
             allow_credentials=True,
             allow_methods=["*"],
             allow_headers=["*"],
+            # Paged GET /documents/ returns the next cursor in this header.
+            expose_headers=["X-Next-Cursor"],
         )
 
+    from app.api.routes_ingest import router as ingest_router
+    from app.api.routes_search import router as search_router
+    from app.api.routes_chat import router as chat_router
+    from app.api.routes_documents import router as docs_router
+    from app.api.routes_profiles import router as profiles_router
+    from app.api.routes_admin import router as admin_router
+
     app.include_router(ingest_router)
     app.include_router(search_router)
     app.include_router(chat_router)
     app.include_router(docs_router)
+    app.include_router(profiles_router)
+    app.include_router(admin_router)
+
+    # Opt-in per-request profiler. Not installed at all when disabled (zero overhead).
+    if settings.PROFILE_ENABLED:
+        from app.services.profile_service import install_profiling
+        install_profiling(app)
 
     @app.get("/health")
     async def health():
@@ -63,6 +94,14 @@ def create_app():
         ok = all(checks.values())
         return {"ok": ok, "app": settings.APP_NAME, "env": settings.ENV, "deps": checks}
 
+    @app.get("/ready")
+    async def ready():
+        """Readiness of this instance (warm-up finished), as opposed to /health (deps reachable)."""
+        from app.services.warmup_service import readiness
+
+        state = readiness()
+        return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
     return app
 
 app = create_app()
@@ -0,0 +1,140 @@
+"""Semantic answer cache for /chat and /chat/stream.
+
+Why this exists:
+- LLM generation dominates chat latency and cost, and many questions are paraphrases
+  of ones already answered over the same evidence.
+
+An entry maps (model, PROMPT_VERSION, sorted evidence chunk ids) plus the question
+embedding to the answer and its citations. A lookup hits only when the evidence set
+is identical (retrieval + rerank picked exactly the same chunks) AND the cosine
+similarity of the question embeddings is at least ANSWER_CACHE_MIN_SIM. Identical
+evidence keeps a paraphrase from being answered with text grounded in other sources.
+
+Entries expire after ANSWER_CACHE_TTL_SEC, the cache holds at most
+ANSWER_CACHE_MAX_ENTRIES (LRU), and entries citing a chunk or document are dropped
+when that chunk/document is deleted or its document is re-saved.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+# entry id -> entry; evidence key -> entry ids; chunk/doc id -> entry ids
+_entries: "OrderedDict[int, dict]" = OrderedDict()
+_by_evidence: dict[tuple, set[int]] = {}
+_by_ref: dict[str, set[int]] = {}
+_next_id = 0
+_stats = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0}
+
+
+def evidence_key(chunks: list[dict], model: str) -> tuple:
+    from app.services.rag_service import PROMPT_VERSION
+
+    return (model, PROMPT_VERSION, tuple(sorted(str(c.get("chunk_id")) for c in chunks)))
+
+
+def _normalize(vec: list[float]) -> list[float]:
+    n = math.sqrt(sum(x * x for x in vec)) or 1.0
+    return [x / n for x in vec]
+
+
+def _drop(entry_id: int) -> None:
+    e = _entries.pop(entry_id, None)
+    if not e:
+        return
+    ids = _by_evidence.get(e["key"])
+    if ids is not None:
+        ids.discard(entry_id)
+        if not ids:
+            _by_evidence.pop(e["key"], None)
+    for ref in e["refs"]:
+        ids = _by_ref.get(ref)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                _by_ref.pop(ref, None)
+
+
+def lookup(qvec: list[float] | None, key: tuple) -> dict | None:
+    """Return {answer, citations, question, similarity} for a cached answer, else None."""
+    if not settings.ANSWER_CACHE_ENABLED or qvec is None:
+        return None
+    q = _normalize(qvec)
+    now = time.time()
+    best, best_sim = None, -1.0
+    with _lock:
+        for entry_id in list(_by_evidence.get(key, ())):
+            e = _entries[entry_id]
+            if now - e["at"] > settings.ANSWER_CACHE_TTL_SEC:
+                _drop(entry_id)
+                continue
+            sim = sum(a * b for a, b in zip(q, e["qvec"]))
+            if sim > best_sim:
+                best, best_sim = entry_id, sim
+        if best is None or best_sim < settings.ANSWER_CACHE_MIN_SIM:
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(best)
+        _stats["hits"] += 1
+        e = _entries[best]
+        return {"answer": e["answer"], "citations": e["citations"], "question": e["question"], "similarity": best_sim}
+
+
+def store(qvec: list[float] | None, key: tuple, question: str, answer: str, citations: list[dict]) -> None:
+    global _next_id
+    if not settings.ANSWER_CACHE_ENABLED or qvec is None or not (answer or "").strip():
+        return
+    refs = {cid for c in citations for cid in (c.get("chunk_ids") or [c.get("chunk_id")]) if cid}
+    refs |= {c["doc_id"] for c in citations if c.get("doc_id")}
+    with _lock:
+        _next_id += 1
+        _entries[_next_id] = {
+            "key": key,
+            "qvec": _normalize(qvec),
+            "question": question,
+            "answer": answer,
+            "citations": citations,
+            "refs": refs,
+            "at": time.time(),
+        }
+        _by_evidence.setdefault(key, set()).add(_next_id)
+        for ref in refs:
+            _by_ref.setdefault(ref, set()).add(_next_id)
+        _stats["stores"] += 1
+        while len(_entries) > max(0, settings.ANSWER_CACHE_MAX_ENTRIES):
+            _drop(next(iter(_entries)))
+
+
+def invalidate(ids) -> int:
+    """Drop every entry whose evidence includes any of these chunk or doc ids."""
+    n = 0
+    with _lock:
+        for ref in ids:
+            for entry_id in list(_by_ref.get(ref, ())):
+                _drop(entry_id)
+                n += 1
+        _stats["invalidated"] += n
+    return n
+
+
+def clear() -> None:
+    with _lock:
+        _entries.clear()
+        _by_evidence.clear()
+        _by_ref.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        return {"entries": len(_entries), **_stats}
+
+
+def replay_chunks(answer: str, size: int = 24) -> list[str]:
+    """Split a cached answer into small deltas so /chat/stream clients render it as usual."""
+    return [answer[i : i + size] for i in range(0, len(answer), size)]
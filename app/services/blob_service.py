@@ -0,0 +1,199 @@
+"""Content-addressed store for uploaded and downloaded source files.
+
+Why this exists:
+- Every upload and URL download used to leave an `upload_<uuid>.*` / `download_<hex>.*`
+  file in DATA_DIR forever, even after the document was deleted.
+
+Files are stored once per sha256 under DATA_DIR/blobs/<h[:2]>/<h[2:4]>/<h><ext>
+(identical uploads share one file). `blob_refs` links blobs to the documents built
+from them; `delete_document` drops the refs, and `gc()` removes blobs that have had
+no references for BLOB_RETENTION_SEC (and that no queued job still needs), plus
+legacy upload/download files from older builds and cached PDF page texts of files
+that never became a document.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _root() -> Path:
+    return Path(settings.DATA_DIR) / "blobs"
+
+
+def put_file(src: str, content_hash: str | None = None) -> tuple[str, str]:
+    """Move `src` into the store and return (hash, stored path).
+
+    If the same bytes are already stored, `src` is deleted and the existing copy is used.
+    """
+    if not content_hash:
+        from app.services.ingest_service import file_sha256
+
+        content_hash = file_sha256(src)
+    suffix = Path(src).suffix.lower()
+    now = time.time()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT path FROM blobs WHERE hash=?", (content_hash,)).fetchone()
+        if row and os.path.exists(row[0]):
+            os.remove(src)
+            conn.execute("UPDATE blobs SET last_ref_at=? WHERE hash=?", (now, content_hash))
+            conn.commit()
+            return content_hash, row[0]
+        dest = _root() / content_hash[:2] / content_hash[2:4] / f"{content_hash}{suffix}"
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, dest)
+        conn.execute(
+            "INSERT OR REPLACE INTO blobs(hash, path, size, created_at, last_ref_at) VALUES(?,?,?,?,?)",
+            (content_hash, str(dest), dest.stat().st_size, now, now),
+        )
+        conn.commit()
+        return content_hash, str(dest)
+    finally:
+        conn.close()
+
+
+def set_doc_blob(doc_id: str, content_hash: str) -> None:
+    """Record that `doc_id` was built from this blob (replacing an older version's blob)."""
+    now = time.time()
+    conn = _connect()
+    old = [r[0] for r in conn.execute("SELECT hash FROM blob_refs WHERE doc_id=? AND hash<>?", (doc_id, content_hash))]
+    conn.execute("DELETE FROM blob_refs WHERE doc_id=? AND hash<>?", (doc_id, content_hash))
+    conn.execute("INSERT OR IGNORE INTO blob_refs(hash, doc_id) VALUES(?,?)", (content_hash, doc_id))
+    conn.executemany("UPDATE blobs SET last_ref_at=? WHERE hash=?", [(now, h) for h in (content_hash, *old)])
+    conn.commit()
+    conn.close()
+
+
+def drop_refs(doc_id: str) -> None:
+    conn = _connect()
+    hashes = [r[0] for r in conn.execute("SELECT hash FROM blob_refs WHERE doc_id=?", (doc_id,)).fetchall()]
+    conn.execute("DELETE FROM blob_refs WHERE doc_id=?", (doc_id,))
+    # Retention counts from the moment a blob lost its last reference.
+    conn.executemany("UPDATE blobs SET last_ref_at=? WHERE hash=?", [(time.time(), h) for h in hashes])
+    conn.commit()
+    conn.close()
+
+
+def _pending_job_payloads(conn) -> str:
+    rows = conn.execute("SELECT payload_json FROM ingest_jobs WHERE status IN ('queued','running')").fetchall()
+    return "\n".join(r[0] or "" for r in rows)
+
+
+def _legacy_files() -> list[Path]:
+    data = Path(settings.DATA_DIR)
+    out = [p for p in data.glob("upload_*") if p.is_file()]
+    out += [p for p in (data / "downloads").glob("download_*") if p.is_file()]
+    out += [p for p in data.glob("download_*") if p.is_file()]
+    return out
+
+
+def gc(retention_sec: float | None = None, dry_run: bool = False) -> dict:
+    """Delete unreferenced blobs (and legacy temp files) older than the retention window."""
+    retention = settings.BLOB_RETENTION_SEC if retention_sec is None else retention_sec
+    cutoff = time.time() - retention
+    removed: list[str] = []
+    freed = 0
+    conn = _connect()
+    try:
+        pending = _pending_job_payloads(conn)
+        rows = conn.execute(
+            "SELECT hash, path, size FROM blobs b WHERE last_ref_at < ? "
+            "AND NOT EXISTS (SELECT 1 FROM blob_refs r WHERE r.hash = b.hash)",
+            (cutoff,),
+        ).fetchall()
+        for h, path, size in rows:
+            if h in pending:
+                continue
+            removed.append(path)
+            freed += size or 0
+            if not dry_run:
+                Path(path).unlink(missing_ok=True)
+                conn.execute("DELETE FROM blobs WHERE hash=?", (h,))
+                for d in (Path(path).parent, Path(path).parent.parent):
+                    try:
+                        d.rmdir()  # only succeeds once the shard directory is empty
+                    except OSError:
+                        break
+
+        # Files written by builds before the blob store: keep those a document still points to.
+        for p in _legacy_files():
+            st = p.stat()
+            if st.st_mtime >= cutoff or p.name in pending:
+                continue
+            if conn.execute("SELECT 1 FROM documents WHERE meta_json LIKE ? LIMIT 1", (f"%{p.name}%",)).fetchone():
+                continue
+            removed.append(str(p))
+            freed += st.st_size
+            if not dry_run:
+                p.unlink(missing_ok=True)
+
+        # Cached PDF page texts of files that never became a document (ingest failed before
+        # save_document); delete_document only cleans up after documents that existed.
+        orphan_pages = [
+            h
+            for (h,) in conn.execute(
+                "SELECT DISTINCT file_hash FROM pdf_pages p WHERE COALESCE(cached_at, 0) < ? "
+                "AND NOT EXISTS (SELECT 1 FROM documents d WHERE d.content_hash = p.file_hash)",
+                (cutoff,),
+            ).fetchall()
+            if h not in pending
+        ]
+        if not dry_run:
+            conn.executemany("DELETE FROM pdf_pages WHERE file_hash=?", [(h,) for h in orphan_pages])
+        conn.commit()
+    finally:
+        conn.close()
+    return {
+        "removed": len(removed),
+        "bytes": freed,
+        "paths": removed[:100],
+        "pdf_page_caches": len(orphan_pages),
+        "dry_run": dry_run,
+    }
+
+
+def stats() -> dict:
+    conn = _connect()
+    n, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+    orphans = conn.execute(
+        "SELECT COUNT(*) FROM blobs b WHERE NOT EXISTS (SELECT 1 FROM blob_refs r WHERE r.hash = b.hash)"
+    ).fetchone()[0]
+    conn.close()
+    return {"blobs": n, "bytes": size, "unreferenced": orphans, "retention_sec": settings.BLOB_RETENTION_SEC}
+
+
+async def _loop() -> None:
+    while True:
+        await asyncio.sleep(settings.BLOB_GC_INTERVAL_SEC)
+        try:
+            res = await asyncio.to_thread(gc)
+            if res["removed"] or res["pdf_page_caches"]:
+                log.info(
+                    "blob gc: removed %d file(s), %d bytes, %d PDF page cache(s)",
+                    res["removed"], res["bytes"], res["pdf_page_caches"],
+                )
+        except Exception as e:
+            log.warning("blob gc failed: %s", e)
+
+
+def start() -> list[asyncio.Task]:
+    if settings.BLOB_GC_INTERVAL_SEC <= 0:
+        return []
+    return [asyncio.create_task(_loop())]
+
@@ -0,0 +1,274 @@
+"""Bulk ingestion of a directory tree or a zip archive.
+
+Why this exists:
+- Onboarding a department means thousands of files. Calling /ingest/path per file
+  parses serially, embeds tiny per-document batches, commits per document and
+  rebuilds BM25 after every single file.
+
+Here:
+- parsing + chunking (CPU-bound: pypdf/python-docx) runs in a process pool,
+- embeddings are requested in shared cross-document batches (BULK_EMBED_BATCH),
+- SQLite writes and vector upserts happen once per batch, in one transaction,
+- the BM25 index is rebuilt once at the end.
+
+The result is an aggregate report with throughput, per-stage time and failures.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.models import Chunk, Document
+
+log = logging.getLogger(__name__)
+
+SUPPORTED_SUFFIXES = {".pdf", ".docx", ".txt", ".md"}
+
+
+def _extract_zip(archive: Path) -> Path:
+    """Extract into DATA_DIR/bulk/<archive hash>/, refusing members that escape the target.
+
+    The caller removes the directory once the run is over (see `bulk_ingest`).
+    """
+    from app.services.ingest_service import file_sha256
+
+    target = Path(settings.DATA_DIR) / "bulk" / file_sha256(str(archive))[:32]
+    shutil.rmtree(target, ignore_errors=True)  # leftovers of an interrupted run
+    target.mkdir(parents=True, exist_ok=True)
+    root = target.resolve()
+    with zipfile.ZipFile(archive) as zf:
+        for member in zf.infolist():
+            if member.is_dir():
+                continue
+            dest = (target / member.filename).resolve()
+            if root not in dest.parents:
+                raise ValueError(f"Unsafe path in archive: {member.filename}")
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            with zf.open(member) as src, open(dest, "wb") as out:
+                while True:
+                    buf = src.read(1 << 20)
+                    if not buf:
+                        break
+                    out.write(buf)
+    return target
+
+
+def collect_files(path: str) -> tuple[list[str], list[str]]:
+    """Return (supported files, skipped files) under a directory (or a single file)."""
+    p = Path(path)
+    if p.is_file():
+        files = [p]
+    elif p.is_dir():
+        files = sorted(f for f in p.rglob("*") if f.is_file() and not f.name.startswith("."))
+    else:
+        raise FileNotFoundError(f"No such file or directory: {path}")
+    ok = [str(f) for f in files if f.suffix.lower() in SUPPORTED_SUFFIXES]
+    skipped = [str(f) for f in files if f.suffix.lower() not in SUPPORTED_SUFFIXES]
+    return ok, skipped
+
+
+def parse_and_chunk(
+    path: str, mode: str, source_key: str | None = None, doc_id: str | None = None
+) -> tuple[Document, list[Chunk], str]:
+    """Worker entry point (runs in a child process). Returns (doc, chunks, mode).
+
+    `doc_id` is the id of an earlier version of the same source: chunk ids derive from
+    it, so the chunks can be diffed against the stored ones without chunking again.
+    """
+    from app.services.ingest_service import ingest_path_auto, source_key_for_path
+    from app.services.pipeline_service import chunk_document, prepare_document
+
+    doc = ingest_path_auto(path)
+    if doc_id:
+        doc.doc_id = doc_id
+    doc.meta["source_key"] = source_key or source_key_for_path(path)
+    effective_mode = prepare_document(doc, mode)
+    return doc, chunk_document(doc, effective_mode), effective_mode
+
+
+class _Batch:
+    def __init__(self):
+        self.docs: list[Document] = []
+        self.chunks: list[Chunk] = []
+
+    def add(self, doc: Document, chunks: list[Chunk]):
+        self.docs.append(doc)
+        self.chunks.extend(chunks)
+
+    def clear(self):
+        self.docs, self.chunks = [], []
+
+
+def bulk_ingest(path: str, mode: str = "auto", workers: int | None = None, progress=None) -> dict:
+    """Ingest every supported file under `path` (a directory, a file or a zip archive).
+
+    Files already ingested from the same source (path, or archive + member name) with the
+    same bytes are skipped, changed ones are updated in place, and a file whose bytes
+    match another document is reported as a duplicate instead of being ingested again.
+    """
+    from app.services.ingest_service import source_key_for_path
+
+    p = Path(path)
+    if not (p.is_file() and p.suffix.lower() == ".zip"):
+        return _bulk_ingest(path, path, mode, workers, progress, source_key_for_path)
+
+    root = _extract_zip(p)
+    archive_key = source_key_for_path(path)
+    try:
+        return _bulk_ingest(
+            str(root), path, mode, workers, progress,
+            lambda f: f"{archive_key}!{Path(f).relative_to(root).as_posix()}",
+        )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def _bulk_ingest(path: str, label: str, mode: str, workers: int | None, progress, source_key) -> dict:
+    from app.services.embed_service import embed_texts
+    from app.services.pipeline_service import ingest_document, upsert_vectors
+    from app.services.retrieve_service import rebuild_bm25
+    from app.services.store_service import find_document_by_hash, find_document_by_source_key, save_documents_and_chunks
+
+    report = progress or (lambda *a, **k: None)
+    t_start = time.perf_counter()
+    stage_s = {"parse": 0.0, "embed": 0.0, "store": 0.0, "upsert": 0.0, "update": 0.0, "index": 0.0}
+    warnings: list[str] = []
+    failed: list[dict] = []
+    doc_ids: list[str] = []
+    unchanged: list[str] = []
+    duplicates: list[dict] = []
+    hashes: set[str] = set()  # content ingested by this run so far
+    n_chunks = 0
+    n_updated = 0
+    vectors_ok = True
+
+    files, skipped = collect_files(path)
+    report("parse", done=0, total=len(files))
+
+    batch = _Batch()
+    embed_batch = max(1, settings.BULK_EMBED_BATCH)
+
+    def flush():
+        nonlocal n_chunks, vectors_ok
+        if not batch.docs:
+            return
+        t0 = time.perf_counter()
+        save_documents_and_chunks(batch.docs, batch.chunks)
+        stage_s["store"] += time.perf_counter() - t0
+
+        if vectors_ok and batch.chunks:
+            for i in range(0, len(batch.chunks), embed_batch):
+                part = batch.chunks[i : i + embed_batch]
+                t0 = time.perf_counter()
+                try:
+                    vectors = embed_texts([c.text for c in part])
+                except Exception as e:
+                    warnings.append(f"Embedding unavailable, indexed with BM25 only: {e}")
+                    vectors_ok = False
+                    break
+                finally:
+                    stage_s["embed"] += time.perf_counter() - t0
+                t0 = time.perf_counter()
+                try:
+                    upsert_vectors(part, vectors)
+                except Exception as e:
+                    warnings.append(f"Vector upsert unavailable, indexed with BM25 only: {e}")
+                    vectors_ok = False
+                    break
+                finally:
+                    stage_s["upsert"] += time.perf_counter() - t0
+
+        doc_ids.extend(d.doc_id for d in batch.docs)
+        n_chunks += len(batch.chunks)
+        report("embed", done=n_chunks)
+        batch.clear()
+
+    n_workers = workers or settings.BULK_WORKERS or os.cpu_count() or 1
+    # spawn: the API process has threads (uvicorn, job workers); forking those is unsafe.
+    ctx = multiprocessing.get_context("spawn")
+    t_parse = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(n_workers, len(files) or 1)), mp_context=ctx) as pool:
+        # Earlier versions of the same sources: their files are chunked under the stored doc_id.
+        previous_docs = {f: find_document_by_source_key(source_key(f)) for f in files}
+        pending = {
+            pool.submit(parse_and_chunk, f, mode, source_key(f), (previous_docs[f] or {}).get("doc_id")): f
+            for f in files
+        }
+        rank = {f: i for i, f in enumerate(files)}
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            # File order, so the first of several identical files is the one ingested.
+            for fut in sorted(finished, key=lambda fu: rank[pending[fu]]):
+                f = pending.pop(fut)
+                done += 1
+                try:
+                    doc, chunks, _ = fut.result()
+                except Exception as e:
+                    failed.append({"path": f, "error": str(e)})
+                else:
+                    content_hash = doc.meta.get("content_hash")
+                    previous = previous_docs.pop(f)
+                    if previous and previous["content_hash"] == content_hash:
+                        unchanged.append(f)
+                    elif previous:
+                        # Updated as it arrives: keeps its doc_id, only new or edited chunks
+                        # are embedded, and the worker's chunks are used as they are.
+                        t0 = time.perf_counter()
+                        try:
+                            res = ingest_document(doc, mode=doc.meta["mode"], update=True, reindex=False, chunks=chunks)
+                        except Exception as e:
+                            failed.append({"path": f, "error": str(e)})
+                        else:
+                            warnings.extend(res["warnings"])
+                            doc_ids.append(res["doc_id"])
+                            n_updated += 1
+                            n_chunks += res["chunks"]
+                        stage_s["update"] += time.perf_counter() - t0
+                    elif content_hash in hashes or find_document_by_hash(content_hash):
+                        duplicates.append({"path": f, "content_hash": content_hash})
+                    else:
+                        hashes.add(content_hash)
+                        batch.add(doc, chunks)
+            report("parse", done=done, total=len(files))
+            if len(batch.chunks) >= embed_batch * settings.BULK_COMMIT_BATCHES:
+                # Time spent flushing overlaps with workers still parsing.
+                flush()
+    stage_s["parse"] = time.perf_counter() - t_parse - sum(stage_s[k] for k in ("store", "embed", "upsert", "update"))
+    flush()
+    report("parse", done=done, total=len(files), status="done")
+
+    if doc_ids:
+        report("index")
+        t0 = time.perf_counter()
+        rebuild_bm25()
+        stage_s["index"] = time.perf_counter() - t0
+        report("index", status="done")
+
+    elapsed = time.perf_counter() - t_start
+    return {
+        "ok": not failed,
+        "path": label,
+        "files": len(files),
+        "ingested": len(doc_ids),
+        "updated": n_updated,
+        "unchanged": unchanged,
+        "duplicates": duplicates,
+        "failed": failed,
+        "skipped": skipped,
+        "chunks": n_chunks,
+        "doc_ids": doc_ids,
+        "seconds": round(elapsed, 3),
+        "files_per_s": round(len(doc_ids) / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_s": round(n_chunks / elapsed, 3) if elapsed else 0.0,
+        "stage_seconds": {k: round(max(0.0, v), 3) for k, v in stage_s.items()},
+        "warnings": warnings,
+    }
@@ -1,3 +1,4 @@
+import hashlib
 import re
 import uuid
 from typing import Iterator
@@ -15,42 +16,64 @@ def _iter_headings(text: str) -> Iterator[tuple[int, int, str]]:
         yield (m.start(), m.end(), m.group(0).strip())
 
 
+# Fixed namespace so chunk ids are reproducible across processes and restarts.
+_CHUNK_NS = uuid.uuid5(uuid.NAMESPACE_URL, "eka:chunk")
+
+
+def stable_chunk_id(doc_id: str, text: str, seen: dict[str, int]) -> str:
+    """Content-derived chunk id: the same text in the same document keeps its id.
+
+    `seen` counts repeats within one chunking pass so identical passages (boilerplate
+    clauses, repeated headers) still get distinct ids. Re-ingestion relies on this to
+    diff the new chunk set against the stored one.
+    """
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    n = seen.get(digest, 0)
+    seen[digest] = n + 1
+    return str(uuid.uuid5(_CHUNK_NS, f"{doc_id}:{digest}:{n}"))
+
+
 def chunk_general(doc: Document, max_chars: int = 1200, overlap: int = 150) -> list[Chunk]:
-    text = doc.raw_text or ""
-    headings = sorted(_iter_headings(text), key=lambda x: x[0])
-    segments: list[tuple[str, str, int, int]] = []
+    return list(iter_chunks_general(doc, max_chars=max_chars, overlap=overlap))
 
+
+def _segments(text: str) -> Iterator[tuple[str, int, int, int]]:
+    """(heading, body_start, seg_start, seg_end) offsets; bodies are never copied out of `text`."""
+    headings = sorted(_iter_headings(text), key=lambda x: x[0])
+    if not headings:
+        yield ("BODY", 0, 0, len(text))
+        return
     for i, h in enumerate(headings):
-        seg_start = h[0]
         seg_end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
-        head = h[2]
-        body = text[h[1] : seg_end]
-        segments.append((head, body, seg_start, seg_end))
+        yield (h[2], h[1], h[0], seg_end)
+
 
-    if not segments:
-        segments = [("BODY", text, 0, len(text))]
+def iter_chunks_general(doc: Document, max_chars: int = 1200, overlap: int = 150) -> Iterator[Chunk]:
+    """Lazily yield chunks so large documents never hold every Chunk in memory.
 
-    chunks: list[Chunk] = []
-    for head, body, seg_start, _ in segments:
+    Chunk texts are sliced straight from `doc.raw_text`, so beyond the document itself
+    memory only holds the heading offsets and the chunk being yielded.
+    """
+    text = doc.raw_text or ""
+    seen: dict[str, int] = {}
+
+    for head, body_start, seg_start, seg_end in _segments(text):
         heading_path = [] if head == "BODY" else [head]
+        body_len = max(0, seg_end - body_start)
         i = 0
-        while i < len(body):
-            j = min(i + max_chars, len(body))
-            chunk_text = body[i:j].strip()
+        while i < body_len:
+            j = min(i + max_chars, body_len)
+            chunk_text = text[body_start + i : body_start + j].strip()
             if chunk_text:
-                chunks.append(
-                    Chunk(
-                        chunk_id=str(uuid.uuid4()),
-                        doc_id=doc.doc_id,
-                        text=chunk_text,
-                        start_char=seg_start + i,
-                        end_char=seg_start + j,
-                        heading_path=heading_path,
-                        meta={"source": doc.source, **(doc.meta or {})},
-                    )
+                yield Chunk(
+                    chunk_id=stable_chunk_id(doc.doc_id, chunk_text, seen),
+                    doc_id=doc.doc_id,
+                    text=chunk_text,
+                    start_char=seg_start + i,
+                    end_char=seg_start + j,
+                    heading_path=heading_path,
+                    meta={"source": doc.source, **(doc.meta or {})},
                 )
-            if j == len(body):
+            if j == body_len:
                 break
             i = max(0, j - overlap)
-
-    return chunks
\ No newline at end of file
@@ -1,28 +1,29 @@
 from __future__ import annotations
 
-from app.services.store_service import get_document
+import hashlib
+import re
+
+from app.core.config import settings
+from app.services.store_service import get_documents_meta
+
+# Rough token estimate for budgeting; good enough for English/Latin text and fast.
+CHARS_PER_TOKEN = 4
 
 
 def format_citations(chunks: list[dict]) -> list[dict]:
     """Return UI-friendly citation payloads.
 
     Important: include `title` so the frontend doesn't fall back to UUIDs.
+    Titles come from the in-process doc metadata cache (one query for all misses).
     """
     cites: list[dict] = []
-    doc_cache: dict[str, tuple[str | None, str | None]] = {}
+    docs = get_documents_meta(c.get("doc_id") for c in chunks)
 
     for i, c in enumerate(chunks, 1):
         doc_id = c.get("doc_id")
-        title = None
-        source = None
-        if doc_id:
-            if doc_id in doc_cache:
-                title, source = doc_cache[doc_id]
-            else:
-                d = get_document(doc_id)
-                title = getattr(d, "title", None) if d else None
-                source = getattr(d, "source", None) if d else None
-                doc_cache[doc_id] = (title, source)
+        d = docs.get(doc_id) or {}
+        title = d.get("title")
+        source = d.get("source")
 
         cites.append(
             {
@@ -31,7 +32,10 @@ def format_citations(chunks: list[dict]) -> list[dict]:
                 "doc_id": doc_id,
                 "title": title,
                 "source": source,
+                "chunk_ids": c.get("chunk_ids") or [c.get("chunk_id")],
                 "heading_path": c.get("heading_path", []),
+                "page_start": (c.get("meta") or {}).get("page_start"),
+                "page_end": (c.get("meta") or {}).get("page_end"),
                 "score": c.get("rerank_score"),
                 "snippet": (c.get("text") or "")[:600],
             }
@@ -39,6 +43,20 @@ def format_citations(chunks: list[dict]) -> list[dict]:
     return cites
 
 
+def preview_hits(chunks: list[dict], snippet_chars: int = 200) -> list[dict]:
+    """Small payload for progress events (retrieval stages) before citations are final."""
+    docs = get_documents_meta(c.get("doc_id") for c in chunks)
+    return [
+        {
+            "chunk_id": c.get("chunk_id"),
+            "doc_id": c.get("doc_id"),
+            "title": (docs.get(c.get("doc_id")) or {}).get("title"),
+            "snippet": (c.get("text") or "")[:snippet_chars],
+        }
+        for c in chunks
+    ]
+
+
 def build_context(chunks: list[dict]) -> str:
     blocks = []
     for i, c in enumerate(chunks, 1):
@@ -48,3 +66,124 @@ def build_context(chunks: list[dict]) -> str:
         else:
             blocks.append(f"[{i}]\n{c['text']}")
     return "\n\n".join(blocks)
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _squeeze(text: str) -> tuple[str, list[int]]:
+    """`text` with whitespace runs collapsed to one space (leading ones dropped), plus the
+    index in `text` of every kept character."""
+    out: list[str] = []
+    pos: list[int] = []
+    for m in re.finditer(r"\S+|\s+", text):
+        if m.group()[0].isspace():
+            if out:
+                out.append(" ")
+                pos.append(m.start())
+        else:
+            out.append(m.group())
+            pos.extend(range(m.start(), m.end()))
+    return "".join(out), pos
+
+
+def _overlap(a: str, b: str, max_len: int = 600) -> int:
+    """How many leading characters of `b` repeat the end of `a` (the chunker's overlap).
+
+    Chunk texts are stripped, so an overlap that starts or ends on whitespace does not
+    line up character for character; whitespace runs therefore compare equal.
+    """
+    tail = _WS_RE.sub(" ", a[-2 * max_len :]).rstrip()
+    head, pos = _squeeze(b[: 2 * max_len])
+    for n in range(min(len(tail), len(head), max_len), 0, -1):
+        if head[n - 1] != " " and tail.endswith(head[:n]):
+            return pos[n - 1] + 1
+    return 0
+
+
+def _merge(run: list[dict]) -> dict:
+    text = run[0]["text"]
+    for c in run[1:]:
+        n = _overlap(text, c["text"])
+        if n == len(c["text"]) or c["text"] in text:
+            continue
+        text += c["text"][n:] if n else "\n" + c["text"]
+    metas = [c.get("meta") or {} for c in run]
+    pages_start = [m["page_start"] for m in metas if m.get("page_start") is not None]
+    pages_end = [m["page_end"] for m in metas if m.get("page_end") is not None]
+    meta = dict(metas[0])
+    if pages_start:
+        meta["page_start"], meta["page_end"] = min(pages_start), max(pages_end or pages_start)
+    scores = [c["rerank_score"] for c in run if c.get("rerank_score") is not None]
+    return {
+        "chunk_id": run[0]["chunk_id"],
+        # Exact duplicates dropped by pack_context still count as evidence (cache invalidation).
+        "chunk_ids": [c["chunk_id"] for c in run] + [d for c in run for d in c.get("_dups", ())],
+        "doc_id": run[0].get("doc_id"),
+        "text": text,
+        "heading_path": run[0].get("heading_path") or [],
+        "meta": meta,
+        "rerank_score": max(scores) if scores else None,
+        "start_char": run[0].get("start_char"),
+        "end_char": max(c.get("end_char") or 0 for c in run),
+        "_rank": min(c["_rank"] for c in run),
+    }
+
+
+def pack_context(chunks: list[dict], budget_tokens: int | None = None) -> list[dict]:
+    """Turn ranked chunks into prompt blocks that fit the token budget.
+
+    - exact duplicate passages (e.g. the same boilerplate in two documents) are kept once;
+      the dropped copies' ids stay in the block's `chunk_ids`,
+    - chunks of the same document that overlap or touch (by start_char/end_char) are merged
+      into one block and the chunker's overlap text is emitted once,
+    - blocks are taken in order of their best-ranked chunk until CONTEXT_TOKEN_BUDGET is
+      spent; a block that does not fit is skipped (the top block is truncated instead).
+
+    Returned blocks look like chunks (plus `chunk_ids`), so `build_context` and
+    `format_citations` number them identically.
+    """
+    budget = settings.CONTEXT_TOKEN_BUDGET if budget_tokens is None else budget_tokens
+    seen: dict[str, dict] = {}
+    ranked: list[dict] = []
+    for i, c in enumerate(chunks):
+        digest = hashlib.sha1(" ".join((c.get("text") or "").split()).encode("utf-8")).hexdigest()
+        if digest in seen:
+            seen[digest]["_dups"].append(c.get("chunk_id"))
+            continue
+        seen[digest] = {**c, "_rank": i, "_dups": []}
+        ranked.append(seen[digest])
+
+    by_doc: dict[str, list[dict]] = {}
+    for c in ranked:
+        by_doc.setdefault(c.get("doc_id"), []).append(c)
+    blocks: list[dict] = []
+    for group in by_doc.values():
+        if any(c.get("start_char") is None or c.get("end_char") is None for c in group):
+            blocks.extend(_merge([c]) for c in group)
+            continue
+        group.sort(key=lambda c: (c["start_char"], c["end_char"]))
+        run = [group[0]]
+        for c in group[1:]:
+            if c["start_char"] <= max(x["end_char"] for x in run):
+                run.append(c)
+            else:
+                blocks.append(_merge(run))
+                run = [c]
+        blocks.append(_merge(run))
+    blocks.sort(key=lambda b: b["_rank"])
+
+    out: list[dict] = []
+    left = budget * CHARS_PER_TOKEN if budget > 0 else None
+    for b in blocks:
+        b.pop("_rank")
+        if left is None:
+            out.append(b)
+        elif len(b["text"]) <= left:
+            out.append(b)
+            left -= len(b["text"])
+        elif not out:
+            b["text"] = b["text"][:left]
+            out.append(b)
+            left = 0
+    return out
@@ -14,6 +14,8 @@ You can switch via env:
 
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from typing import List
 
 import httpx
@@ -23,6 +25,10 @@ from app.core.config import settings
 
 _st_model = None
 
+# Query embeddings are reused by retrieval and the answer cache; repeated questions are common.
+_query_cache: "OrderedDict[tuple[str, str], list[float]]" = OrderedDict()
+_query_lock = threading.Lock()
+
 
 def _embed_with_sentence_transformers(texts: List[str]) -> list[list[float]]:
     global _st_model
@@ -95,6 +101,20 @@ def _embed_with_openai(texts: List[str]) -> list[list[float]]:
     return [d.embedding for d in resp.data]
 
 
+def preload_embed_model() -> None:
+    """Load the embedding model ahead of the first ingest/search (Ollama only)."""
+    backend = (settings.EMBED_BACKEND or "ollama").lower()
+    if backend != "ollama":
+        return
+    base = settings.OLLAMA_BASE_URL.rstrip("/")
+    with httpx.Client(timeout=300) as client:
+        r = client.post(
+            f"{base}/api/embed",
+            json={"model": settings.OLLAMA_EMBED_MODEL, "input": "", "keep_alive": settings.OLLAMA_KEEP_ALIVE},
+        )
+        r.raise_for_status()
+
+
 def embed_texts(texts: List[str]) -> list[list[float]]:
     backend = (settings.EMBED_BACKEND or "ollama").lower()
     if backend in {"st", "sentence_transformers", "sentence-transformer"}:
@@ -103,3 +123,33 @@ def embed_texts(texts: List[str]) -> list[list[float]]:
         return _embed_with_openai(texts)
     # default
     return _embed_with_ollama(texts)
+
+
+def _embed_model_id() -> str:
+    backend = (settings.EMBED_BACKEND or "ollama").lower()
+    if backend == "openai":
+        return f"openai:{settings.OPENAI_EMBED_MODEL}"
+    if backend in {"st", "sentence_transformers", "sentence-transformer"}:
+        return f"st:{settings.EMBED_MODEL}"
+    return f"ollama:{settings.OLLAMA_EMBED_MODEL}"
+
+
+def embed_query(text: str) -> list[float]:
+    """Embed a single query string, memoized in a small LRU (QUERY_EMBED_CACHE_SIZE)."""
+    key = (_embed_model_id(), text)
+    with _query_lock:
+        vec = _query_cache.get(key)
+        if vec is not None:
+            _query_cache.move_to_end(key)
+            return vec
+    vec = embed_texts([text])[0]
+    with _query_lock:
+        _query_cache[key] = vec
+        while len(_query_cache) > max(0, settings.QUERY_EMBED_CACHE_SIZE):
+            _query_cache.popitem(last=False)
+    return vec
+
+
+def clear_query_cache() -> None:
+    with _query_lock:
+        _query_cache.clear()
@@ -0,0 +1,225 @@
+"""Concurrent batch URL ingestion (POST /ingest/urls).
+
+Why this exists:
+- /ingest/url fetches one URL at a time with a blocking client and always downloads
+  the full body again, even when the page has not changed since the last ingest.
+
+Here:
+- one pooled async client (FETCH_CONCURRENCY connections) fetches all URLs
+  concurrently, at most FETCH_PER_HOST at a time per host so we do not hammer a
+  single intranet server,
+- bodies are streamed to disk and hashed while downloading (never held in memory),
+- the ETag / Last-Modified of every successfully ingested URL is stored in
+  `url_fetch_meta`; the next fetch is conditional and a `304 Not Modified` skips
+  the URL without downloading or parsing anything,
+- parsing + embedding of a finished download overlaps with the remaining fetches,
+  documents are updated in place (update=True) and BM25 is rebuilt once at the end.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+_TYPES = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/plain": ".txt",
+    "text/markdown": ".md",
+}
+_FILE_SUFFIXES = (".pdf", ".docx", ".txt", ".md")
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def load_fetch_meta(url: str) -> dict | None:
+    conn = _connect()
+    row = conn.execute(
+        "SELECT etag, last_modified, content_hash, fetched_at FROM url_fetch_meta WHERE url=?", (url,)
+    ).fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {"etag": row[0], "last_modified": row[1], "content_hash": row[2], "fetched_at": row[3]}
+
+
+def save_fetch_meta(url: str, etag: str | None, last_modified: str | None, content_hash: str | None) -> None:
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO url_fetch_meta(url, etag, last_modified, content_hash, fetched_at) VALUES(?,?,?,?,?)",
+        (url, etag, last_modified, content_hash, time.time()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _is_youtube(url: str) -> bool:
+    lower = url.lower()
+    return "youtu.be/" in lower or "youtube.com/" in lower
+
+
+def _suffix(url: str, content_type: str) -> str:
+    path_suffix = Path(urlparse(url).path).suffix.lower()
+    if path_suffix in _FILE_SUFFIXES:
+        return path_suffix
+    return _TYPES.get(content_type, ".html")
+
+
+def _conditional_headers(url: str) -> dict:
+    from app.services.store_service import find_document_by_source_key
+
+    prev = load_fetch_meta(url)
+    # Only ask for 304 if we still have the document that the validators describe.
+    if not prev or not find_document_by_source_key(url):
+        return {}
+    headers = {}
+    if prev["etag"]:
+        headers["If-None-Match"] = prev["etag"]
+    if prev["last_modified"]:
+        headers["If-Modified-Since"] = prev["last_modified"]
+    return headers
+
+
+async def fetch_url(client, url: str, sem: asyncio.Semaphore) -> dict:
+    """Conditionally GET `url` and stream the body to DATA_DIR/downloads."""
+    headers = await asyncio.to_thread(_conditional_headers, url)
+    dest_dir = Path(settings.DATA_DIR) / "downloads"
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    limit = settings.FETCH_MAX_MB * 1024 * 1024
+    async with sem:
+        async with client.stream("GET", url, headers=headers) as r:
+            if r.status_code == 304:
+                return {"url": url, "status": "not_modified"}
+            r.raise_for_status()
+            content_type = r.headers.get("content-type", "").split(";")[0].strip().lower()
+            suffix = _suffix(str(r.url), content_type)
+            path = dest_dir / f"download_{uuid.uuid4().hex}{suffix}"
+            sha = hashlib.sha256()
+            size = 0
+            try:
+                with open(path, "wb") as f:
+                    async for buf in r.aiter_bytes(1 << 20):
+                        size += len(buf)
+                        if limit and size > limit:
+                            raise ValueError(f"Download exceeds FETCH_MAX_MB={settings.FETCH_MAX_MB}")
+                        sha.update(buf)
+                        f.write(buf)
+            except BaseException:
+                path.unlink(missing_ok=True)
+                raise
+            return {
+                "url": url,
+                "status": "fetched",
+                "path": str(path),
+                "suffix": suffix,
+                "encoding": r.charset_encoding or "utf-8",
+                "content_hash": sha.hexdigest(),
+                "etag": r.headers.get("etag"),
+                "last_modified": r.headers.get("last-modified"),
+                "bytes": size,
+            }
+
+
+def _ingest_fetched(res: dict, mode: str) -> dict:
+    from app.services.blob_service import put_file
+    from app.services.ingest_service import _safe_filename_from_url, ingest_path_auto, ingest_youtube, parse_html
+    from app.services.pipeline_service import ingest_document
+
+    url = res["url"]
+    if res["status"] == "youtube":
+        doc = ingest_youtube(url)
+        doc.meta["source_key"] = url
+    else:
+        extra = {"url": url, "content_hash": res["content_hash"], "source_key": url}
+        if res["suffix"] == ".html":
+            with open(res["path"], encoding=res["encoding"], errors="ignore") as f:
+                doc = parse_html(f.read(), url, meta_extra=extra)
+            os.remove(res["path"])
+        else:
+            blob_hash, path = put_file(res["path"], res["content_hash"])
+            name = _safe_filename_from_url(url)
+            meta = {**extra, "original_name": name, "blob_hash": blob_hash}
+            doc = ingest_path_auto(path, title_override=name, meta_extra=meta)
+    return ingest_document(doc, mode=mode, update=True, reindex=False)
+
+
+async def ingest_urls(urls: list[str], mode: str = "auto", progress=None) -> dict:
+    """Fetch and ingest many URLs; returns a per-URL report plus totals."""
+    import httpx
+
+    from app.services.retrieve_service import rebuild_bm25
+
+    report = progress or (lambda *a, **k: None)
+    urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+    order = {u: i for i, u in enumerate(urls)}
+    t0 = time.perf_counter()
+    results: list[dict] = []
+    sems: dict[str, asyncio.Semaphore] = defaultdict(lambda: asyncio.Semaphore(max(1, settings.FETCH_PER_HOST)))
+
+    async def fetch_one(client, url: str) -> dict:
+        if _is_youtube(url):
+            return {"url": url, "status": "youtube"}  # transcript API, nothing to download
+        try:
+            return await fetch_url(client, url, sems[urlparse(url).netloc])
+        except Exception as e:
+            return {"url": url, "status": "failed", "error": str(e)}
+
+    limits = httpx.Limits(max_connections=settings.FETCH_CONCURRENCY, max_keepalive_connections=settings.FETCH_CONCURRENCY)
+    report("fetch", done=0, total=len(urls))
+    async with httpx.AsyncClient(limits=limits, timeout=settings.FETCH_TIMEOUT_SEC, follow_redirects=True) as client:
+        tasks = [asyncio.create_task(fetch_one(client, u)) for u in urls]
+        # Ingest downloads as they complete; remaining fetches keep running meanwhile.
+        for fut in asyncio.as_completed(tasks):
+            res = await fut
+            out = {"url": res["url"], "status": res["status"]}
+            if res["status"] in {"fetched", "youtube"}:
+                try:
+                    ing = await asyncio.to_thread(_ingest_fetched, res, mode)
+                    out.update(
+                        status="unchanged" if ing.get("unchanged") else "ingested",
+                        doc_id=ing["doc_id"],
+                        title=ing["title"],
+                        chunks=ing["chunks"],
+                        embedded=ing["embedded"],
+                        warnings=ing["warnings"],
+                    )
+                    if res["status"] == "fetched":
+                        await asyncio.to_thread(
+                            save_fetch_meta, res["url"], res["etag"], res["last_modified"], res["content_hash"]
+                        )
+                except Exception as e:
+                    log.warning("cannot ingest %s: %s", res["url"], e)
+                    out.update(status="failed", error=str(e))
+            elif res["status"] == "failed":
+                out["error"] = res["error"]
+            results.append(out)
+            report("fetch", done=len(results), total=len(urls))
+
+    counts = {s: sum(1 for r in results if r["status"] == s) for s in ("ingested", "unchanged", "not_modified", "failed")}
+    if counts["ingested"]:
+        report("index")
+        await asyncio.to_thread(rebuild_bm25)
+        report("index", status="done")
+    return {
+        "ok": not counts["failed"],
+        "urls": len(urls),
+        **counts,
+        "results": sorted(results, key=lambda r: order[r["url"]]),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
@@ -1,3 +1,4 @@
+import hashlib
 import uuid
 from pathlib import Path
 from urllib.parse import urlparse
@@ -5,12 +6,36 @@ from urllib.parse import urlparse
 from app.core.models import Document
 
 
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(chunk_size)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def source_key_for_path(path: str) -> str:
+    """Stable identity of a file on disk, used to re-ingest it in place."""
+    return str(Path(path).resolve())
+
+
+def _file_meta(p: Path, meta_extra: dict | None, **extra) -> dict:
+    meta = {"path": str(p), **extra}
+    if meta_extra:
+        meta.update(meta_extra)
+    # Callers that already hashed the bytes (streamed uploads) pass content_hash in.
+    if not meta.get("content_hash"):
+        meta["content_hash"] = file_sha256(str(p))
+    return meta
+
+
 def ingest_txt_path(path: str, *, title_override: str | None = None, meta_extra: dict | None = None) -> Document:
     p = Path(path)
     text = p.read_text(encoding="utf-8", errors="ignore")
-    meta = {"path": str(p)}
-    if meta_extra:
-        meta.update(meta_extra)
+    meta = _file_meta(p, meta_extra)
     return Document(
         doc_id=str(uuid.uuid4()),
         source="txt",
@@ -30,9 +55,7 @@ def ingest_docx_path(path: str, *, title_override: str | None = None, meta_extra
         if para.text.strip():
             parts.append(para.text)
     text = "\n".join(parts)
-    meta = {"path": str(p)}
-    if meta_extra:
-        meta.update(meta_extra)
+    meta = _file_meta(p, meta_extra)
     return Document(
         doc_id=str(uuid.uuid4()),
         source="docx",
@@ -42,20 +65,80 @@ def ingest_docx_path(path: str, *, title_override: str | None = None, meta_extra
     )
 
 
+def extract_pdf_pages(path: str, start: int, stop: int) -> list[str]:
+    """Extract text of pages [start, stop). Worker entry point for the page pool."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _extract_pages_parallel(path: str, page_nos: list[int], workers: int) -> dict[int, str]:
+    """Fan page extraction out over a process pool, one contiguous page range per task."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Contiguous runs of missing pages, split so every worker gets a few tasks.
+    runs: list[tuple[int, int]] = []
+    for n in page_nos:
+        if runs and runs[-1][1] == n:
+            runs[-1] = (runs[-1][0], n + 1)
+        else:
+            runs.append((n, n + 1))
+    step = max(8, len(page_nos) // (workers * 4) or 1)
+    tasks = [(lo, min(lo + step, hi)) for start, hi in runs for lo in range(start, hi, step)]
+
+    out: dict[int, str] = {}
+    # spawn: same reason as bulk ingest, the API process has threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for (a, b), texts in zip(tasks, pool.map(extract_pdf_pages, [path] * len(tasks), *zip(*tasks))):
+            out.update(zip(range(a, b), texts))
+    return out
+
+
+def _pdf_page_texts(path: str, reader, content_hash: str) -> list[str]:
+    """Page texts for a PDF, served from the (file hash, page) cache where possible."""
+    import multiprocessing
+    import os
+
+    from app.core.config import settings
+    from app.services.store_service import load_pdf_pages, save_pdf_pages
+
+    n_pages = len(reader.pages)
+    cached = load_pdf_pages(content_hash) if settings.PDF_PAGE_CACHE else {}
+    missing = [i for i in range(n_pages) if i not in cached]
+    if missing:
+        workers = min(settings.PDF_WORKERS or os.cpu_count() or 1, max(1, len(missing) // 8))
+        # Already inside a worker process (bulk ingest): do not nest pools.
+        if workers > 1 and len(missing) >= settings.PDF_PARALLEL_MIN_PAGES and multiprocessing.parent_process() is None:
+            fresh = _extract_pages_parallel(path, missing, workers)
+        else:
+            fresh = {i: reader.pages[i].extract_text() or "" for i in missing}
+        if settings.PDF_PAGE_CACHE:
+            save_pdf_pages(content_hash, fresh)
+        cached.update(fresh)
+    return [cached[i] for i in range(n_pages)]
+
+
 def ingest_pdf_path(path: str, *, title_override: str | None = None, meta_extra: dict | None = None) -> Document:
     from pypdf import PdfReader
 
     p = Path(path)
     reader = PdfReader(path)
+    meta = _file_meta(p, meta_extra, pages=len(reader.pages))
     parts = []
-    for page in reader.pages:
-        t = page.extract_text() or ""
+    # [start_char, end_char, page_no] per non-empty page (1-based), for page citations.
+    spans: list[list[int]] = []
+    pos = 0
+    for i, t in enumerate(_pdf_page_texts(path, reader, meta["content_hash"])):
         if t.strip():
+            if parts:
+                pos += 2  # "\n\n" separator
             parts.append(t)
+            spans.append([pos, pos + len(t), i + 1])
+            pos += len(t)
     text = "\n\n".join(parts)
-    meta = {"path": str(p), "pages": len(reader.pages)}
-    if meta_extra:
-        meta.update(meta_extra)
+    meta["page_spans"] = spans
     return Document(
         doc_id=str(uuid.uuid4()),
         source="pdf",
@@ -65,14 +148,29 @@ def ingest_pdf_path(path: str, *, title_override: str | None = None, meta_extra:
     )
 
 
+def ingest_path_auto(path: str, **kwargs) -> Document:
+    """Pick the parser from the file extension (.pdf, .docx, anything else as text)."""
+    lower = path.lower()
+    if lower.endswith(".pdf"):
+        return ingest_pdf_path(path, **kwargs)
+    if lower.endswith(".docx"):
+        return ingest_docx_path(path, **kwargs)
+    return ingest_txt_path(path, **kwargs)
+
+
 def ingest_html_url(url: str) -> Document:
     # lightweight: fetch + strip tags. For heavier crawling, replace with Playwright/Unstructured.
     import httpx
-    from bs4 import BeautifulSoup
 
     r = httpx.get(url, timeout=60, follow_redirects=True)
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+    return parse_html(r.text, url)
+
+
+def parse_html(html: str, url: str, meta_extra: dict | None = None) -> Document:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
     for tag in soup(["script", "style", "noscript"]):
         tag.extract()
     text = "\n".join([line.strip() for line in soup.get_text("\n").splitlines() if line.strip()])
@@ -82,7 +180,7 @@ def ingest_html_url(url: str) -> Document:
         source="html",
         title=title,
         raw_text=text,
-        meta={"url": url},
+        meta={"url": url, **(meta_extra or {})},
     )
 
 
@@ -184,13 +282,18 @@ def ingest_url_auto(url: str, *, data_dir: str) -> Document:
                     break
         tmp = os.path.join(data_dir, f"download_{uuid.uuid4().hex}{ext or ''}")
 
-        r = httpx.get(url, timeout=120, follow_redirects=True)
-        r.raise_for_status()
-        with open(tmp, "wb") as f:
-            f.write(r.content)
+        # Stream to disk: large PDFs should not be held in memory.
+        with httpx.stream("GET", url, timeout=120, follow_redirects=True) as r:
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for buf in r.iter_bytes(1 << 20):
+                    f.write(buf)
+
+        from app.services.blob_service import put_file
 
+        blob_hash, tmp = put_file(tmp)
         title_override = base if base else None
-        meta_extra = {"url": url, "original_name": base}
+        meta_extra = {"url": url, "original_name": base, "blob_hash": blob_hash, "content_hash": blob_hash}
 
         if tmp.endswith(".pdf"):
             return ingest_pdf_path(tmp, title_override=title_override, meta_extra=meta_extra)
@@ -0,0 +1,294 @@
+"""Persistent background ingest jobs (SQLite-backed queue).
+
+Why this exists:
+- Parsing, chunking, embedding, vector upsert and the BM25 rebuild used to run inside
+  the HTTP request. Big PDFs blocked the client for minutes and hit proxy timeouts.
+- With `background=true` the ingest routes enqueue a row in `ingest_jobs` and return
+  202 immediately. `INGEST_WORKERS` asyncio workers (started in the app lifespan)
+  claim queued jobs and run them in a thread, recording per-stage progress and
+  warnings that `/ingest/jobs/{job_id}` exposes.
+
+Jobs survive restarts: anything still `running` when the process died is put back
+to `queued` at startup (up to INGEST_JOB_MAX_ATTEMPTS times), so this assumes a
+single API process owns the queue, as in the default Docker setup.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+from typing import Any, Callable
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+_JOB_COLS = "job_id, kind, status, stage, payload_json, progress_json, warnings_json, result_json, error, attempts, created_at, updated_at"
+
+_wakeup: asyncio.Event | None = None
+
+ProgressFn = Callable[..., None]
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _row_to_job(r) -> dict:
+    return {
+        "job_id": r[0],
+        "kind": r[1],
+        "status": r[2],
+        "stage": r[3],
+        "payload": json.loads(r[4] or "{}"),
+        "progress": json.loads(r[5] or "{}"),
+        "warnings": json.loads(r[6] or "[]"),
+        "result": json.loads(r[7]) if r[7] else None,
+        "error": r[8],
+        "attempts": r[9],
+        "created_at": r[10],
+        "updated_at": r[11],
+    }
+
+
+def submit_job(kind: str, payload: dict) -> dict:
+    """Enqueue a job and wake up a worker. Returns the stored job."""
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    conn = _connect()
+    conn.execute(
+        "INSERT INTO ingest_jobs(job_id, kind, status, stage, payload_json, progress_json, warnings_json, attempts, created_at, updated_at) "
+        "VALUES(?,?,?,?,?,?,?,?,?,?)",
+        (job_id, kind, "queued", None, json.dumps(payload), "{}", "[]", 0, now, now),
+    )
+    conn.commit()
+    conn.close()
+    if _wakeup is not None:
+        _wakeup.set()
+    return get_job(job_id)
+
+
+def get_job(job_id: str) -> dict | None:
+    conn = _connect()
+    row = conn.execute(f"SELECT {_JOB_COLS} FROM ingest_jobs WHERE job_id=?", (job_id,)).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(status: str | None = None, limit: int = 50) -> list[dict]:
+    conn = _connect()
+    sql = f"SELECT {_JOB_COLS} FROM ingest_jobs"
+    params: tuple = ()
+    if status:
+        sql += " WHERE status=?"
+        params = (status,)
+    sql += " ORDER BY created_at DESC LIMIT ?"
+    rows = conn.execute(sql, params + (limit,)).fetchall()
+    conn.close()
+    return [_row_to_job(r) for r in rows]
+
+
+def find_pending_upload(content_hash: str) -> dict | None:
+    """A queued or running upload job for the same bytes (not yet a document)."""
+    if not content_hash:
+        return None
+    conn = _connect()
+    row = conn.execute(
+        f"SELECT {_JOB_COLS} FROM ingest_jobs WHERE kind='upload' AND status IN ('queued', 'running') "
+        "AND json_extract(payload_json, '$.content_hash')=? ORDER BY created_at LIMIT 1",
+        (content_hash,),
+    ).fetchone()
+    conn.close()
+    return _row_to_job(row) if row else None
+
+
+def _update(job_id: str, **fields: Any) -> None:
+    cols = []
+    vals = []
+    for k, v in fields.items():
+        if k in {"progress", "warnings", "result"}:
+            k, v = f"{k}_json", json.dumps(v)
+        cols.append(f"{k}=?")
+        vals.append(v)
+    cols.append("updated_at=?")
+    vals.append(time.time())
+    conn = _connect()
+    conn.execute(f"UPDATE ingest_jobs SET {', '.join(cols)} WHERE job_id=?", (*vals, job_id))
+    conn.commit()
+    conn.close()
+
+
+def claim_next_job() -> dict | None:
+    """Atomically move the oldest queued job to `running` and return it."""
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            f"SELECT {_JOB_COLS} FROM ingest_jobs WHERE status='queued' ORDER BY created_at LIMIT 1"
+        ).fetchone()
+        if not row:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE ingest_jobs SET status='running', attempts=attempts+1, updated_at=? WHERE job_id=?",
+            (time.time(), row[0]),
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    job = _row_to_job(row)
+    job["status"] = "running"
+    job["attempts"] += 1
+    return job
+
+
+def recover_jobs() -> int:
+    """Requeue jobs interrupted by a restart; give up on ones that keep dying."""
+    conn = _connect()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE ingest_jobs SET status='failed', error=?, updated_at=? WHERE status='running' AND attempts>=?",
+        ("Interrupted too many times", time.time(), settings.INGEST_JOB_MAX_ATTEMPTS),
+    )
+    cur.execute("UPDATE ingest_jobs SET status='queued', updated_at=? WHERE status='running'", (time.time(),))
+    n = cur.rowcount
+    conn.commit()
+    conn.close()
+    return n
+
+
+class JobProgress:
+    """Progress callback handed to the ingest pipeline; persists stage updates."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.stages: dict[str, dict] = {}
+        self._last_write = 0.0
+
+    def __call__(self, stage: str, *, done: int | None = None, total: int | None = None, status: str = "running"):
+        info = self.stages.setdefault(stage, {})
+        info["status"] = status
+        if done is not None:
+            info["done"] = done
+        if total is not None:
+            info["total"] = total
+        # Throttle DB writes for chatty stages; always write stage transitions.
+        now = time.monotonic()
+        if status != "running" or done in (None, 0) or now - self._last_write > 0.5:
+            self._last_write = now
+            _update(self.job_id, stage=stage, progress=self.stages)
+
+
+def execute(kind: str, payload: dict, progress: ProgressFn | None = None) -> dict:
+    """Parse the job's source and push it through the ingest pipeline.
+
+    Used by both the background workers and the synchronous routes, so there is a
+    single place that maps a request onto parsers.
+    """
+    from app.services.ingest_service import (
+        ingest_html_url,
+        ingest_path_auto,
+        ingest_url_auto,
+        ingest_youtube,
+        source_key_for_path,
+    )
+    from app.services.pipeline_service import ingest_document
+
+    mode = payload.get("mode") or "auto"
+    if kind == "bulk":
+        from app.services.bulk_service import bulk_ingest
+
+        return bulk_ingest(payload["path"], mode=mode, workers=payload.get("workers"), progress=progress)
+
+    if kind == "urls":
+        from app.services.fetch_service import ingest_urls
+
+        # Worker threads have no running event loop.
+        return asyncio.run(ingest_urls(payload["urls"], mode=mode, progress=progress))
+
+    if progress:
+        progress("parse")
+
+    if kind in {"path", "upload"}:
+        path = payload["path"]
+        kwargs: dict[str, Any] = {}
+        meta_extra = {k: payload[k] for k in ("original_name", "content_hash", "blob_hash") if payload.get(k)}
+        if payload.get("original_name"):
+            kwargs["title_override"] = payload["original_name"]
+        if meta_extra:
+            kwargs["meta_extra"] = meta_extra
+        doc = ingest_path_auto(path, **kwargs)
+        if kind == "upload":
+            # Stored copy of the upload (content-addressed blob store).
+            doc.meta = dict(doc.meta or {})
+            doc.meta["tmp_path"] = path
+        else:
+            doc.meta["source_key"] = source_key_for_path(path)
+    elif kind == "url":
+        source = payload.get("source") or "auto"
+        if source == "youtube":
+            doc = ingest_youtube(payload["url"])
+        elif source == "html":
+            doc = ingest_html_url(payload["url"])
+        else:
+            doc = ingest_url_auto(payload["url"], data_dir=settings.DATA_DIR)
+        doc.meta = dict(doc.meta or {})
+        doc.meta["source_key"] = payload["url"]
+    else:
+        raise ValueError(f"Unknown ingest job kind: {kind}")
+
+    if progress:
+        progress("parse", status="done")
+    return ingest_document(doc, mode=mode, progress=progress, update=bool(payload.get("update")))
+
+
+def _run_job(job: dict) -> None:
+    progress = JobProgress(job["job_id"])
+    try:
+        result = execute(job["kind"], job["payload"], progress=progress)
+        _update(
+            job["job_id"],
+            status="done",
+            stage="done",
+            progress=progress.stages,
+            warnings=result.get("warnings") or [],
+            result=result,
+        )
+    except Exception as e:
+        log.exception("ingest job %s failed", job["job_id"])
+        _update(job["job_id"], status="failed", progress=progress.stages, error=str(e))
+
+
+async def _worker(n: int) -> None:
+    assert _wakeup is not None
+    while True:
+        try:
+            job = await asyncio.to_thread(claim_next_job)
+        except Exception as e:
+            log.warning("ingest worker %d: cannot claim job: %s", n, e)
+            job = None
+        if job is None:
+            _wakeup.clear()
+            try:
+                # Poll as a fallback in case jobs are inserted by another process.
+                await asyncio.wait_for(_wakeup.wait(), timeout=settings.INGEST_POLL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await asyncio.to_thread(_run_job, job)
+
+
+def start_workers() -> list[asyncio.Task]:
+    """Recover interrupted jobs and start INGEST_WORKERS worker tasks."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    n = recover_jobs()
+    if n:
+        log.info("requeued %d interrupted ingest job(s)", n)
+    return [asyncio.create_task(_worker(i)) for i in range(max(0, settings.INGEST_WORKERS))]
@@ -1,8 +1,34 @@
 from app.core.config import settings
-from app.adapters.llm.ollama import OllamaLLM
-from app.adapters.llm.openai import OpenAILLM
 
-def get_llm():
+def _backend(spec: str):
+    """(name, adapter) for "openai", "ollama" or an Ollama base URL."""
+    spec = spec.strip()
+    if spec == "openai":
+        from app.adapters.llm.openai import OpenAILLM
+        return f"openai:{settings.OPENAI_MODEL}", OpenAILLM()
+    from app.adapters.llm.ollama import OllamaLLM
+    llm = OllamaLLM(None if spec == "ollama" else spec)
+    return f"ollama:{llm.base_url}", llm
+
+
+def get_llm(priority: int | None = None):
+    """Return the configured LLM; with a `priority` its calls go through the scheduler."""
+    # Adapters are imported lazily so app startup doesn't pay for SDKs it may never use.
+    primary = _backend("openai" if settings.LLM_PROVIDER == "openai" else "ollama")
+    extra = [b for b in (settings.LLM_HEDGE_BACKENDS or "").split(",") if b.strip()]
+    if extra:
+        from app.adapters.llm.hedged import HedgedLLM
+        llm = HedgedLLM([primary] + [_backend(b) for b in extra])
+    else:
+        llm = primary[1]
+    if priority is None or settings.LLM_MAX_CONCURRENCY <= 0:
+        return llm
+    from app.adapters.llm.scheduled import ScheduledLLM
+    return ScheduledLLM(llm, priority)
+
+
+def llm_model_id() -> str:
+    """Provider + model name, e.g. "ollama:llama3.1" (part of answer cache keys)."""
     if settings.LLM_PROVIDER == "openai":
-        return OpenAILLM()
-    return OllamaLLM()
+        return f"openai:{settings.OPENAI_MODEL}"
+    return f"ollama:{settings.OLLAMA_MODEL}"
@@ -1,10 +1,22 @@
-from app.core.models import Document
-from app.legal.legal_chunker import chunk_legal
+import bisect
+import queue
+import threading
+from typing import Iterable, Iterator
+
+from app.core.config import settings
+from app.core.models import Chunk, Document
+from app.legal.legal_chunker import iter_chunks_legal
 from app.legal.legal_metadata import enrich_legal_metadata
-from app.services.chunk_service import chunk_general
+from app.services.chunk_service import iter_chunks_general
 from app.services.embed_service import embed_texts
 from app.services.retrieve_service import get_vector, rebuild_bm25
-from app.services.store_service import save_chunks, save_document
+from app.services.store_service import (
+    delete_chunks,
+    find_document_by_source_key,
+    list_chunk_ids,
+    save_chunks,
+    save_document,
+)
 from app.services.title_service import best_title
 
 
@@ -19,50 +31,238 @@ def _resolve_mode(doc: Document, mode: str) -> str:
     return "legal" if hits >= 2 else "general"
 
 
-def ingest_document(doc: Document, mode: str = "auto") -> dict:
+def prepare_document(doc: Document, mode: str = "auto") -> str:
+    """Resolve the ingest mode, enrich metadata and pick a title. Returns the mode."""
     effective_mode = _resolve_mode(doc, mode)
-    warnings: list[str] = []
-
     doc.meta = dict(doc.meta or {})
     doc.meta["mode"] = effective_mode
     if effective_mode == "legal":
         doc.meta["legal_mode"] = True
         doc.meta = enrich_legal_metadata(doc.meta)
-
     doc.title = best_title(doc)
-    save_document(doc)
+    return effective_mode
+
+
+def chunk_document(doc: Document, effective_mode: str) -> list[Chunk]:
+    return list(iter_document_chunks(doc, effective_mode))
+
+
+def iter_document_chunks(doc: Document, effective_mode: str) -> Iterator[Chunk]:
+    chunks = iter_chunks_legal(doc) if effective_mode == "legal" else iter_chunks_general(doc)
+    spans = (doc.meta or {}).get("page_spans")
+    return _with_pages(chunks, spans) if spans else chunks
+
+
+def page_range(spans: list[list[int]], start: int, end: int, starts: list[int] | None = None) -> tuple[int, int]:
+    """First and last page number covering characters [start, end) of the document text."""
+    starts = starts if starts is not None else [s[0] for s in spans]
+    first = max(0, bisect.bisect_right(starts, start) - 1)
+    last = max(first, bisect.bisect_left(starts, end) - 1)
+    return spans[first][2], spans[last][2]
+
+
+def _with_pages(chunks: Iterable[Chunk], spans: list[list[int]]) -> Iterator[Chunk]:
+    """Replace the document-level page span list with the chunk's own page range."""
+    starts = [s[0] for s in spans]
+    for c in chunks:
+        c.meta.pop("page_spans", None)
+        c.meta["page_start"], c.meta["page_end"] = page_range(spans, c.start_char, c.end_char, starts)
+        yield c
+
+
+def upsert_vectors(chunks: list[Chunk], vectors: list[list[float]], ensure: bool = True) -> None:
+    vec = get_vector()
+    if ensure:
+        vec.ensure_collection(dim=len(vectors[0]))
+    vec.upsert(
+        ids=[c.chunk_id for c in chunks],
+        vectors=vectors,
+        payloads=[{"chunk_id": c.chunk_id, "doc_id": c.doc_id, **(c.meta or {})} for c in chunks],
+    )
+
+
+_DONE = object()
+
+
+def _batched(items: Iterable, size: int) -> Iterator[list]:
+    batch: list = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
 
-    chunks = chunk_legal(doc) if effective_mode == "legal" else chunk_general(doc)
-    save_chunks(chunks)
+def _run_ahead(items: Iterable, depth: int) -> Iterator:
+    """Consume `items` in a background thread, at most `depth` items ahead of the caller.
 
-    vectors = []
-    if chunks:
+    The bounded queue is the backpressure between pipeline stages: a fast producer
+    blocks instead of buffering the whole document in memory.
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def produce():
         try:
-            vectors = embed_texts([c.text for c in chunks])
-        except Exception as e:
-            warnings.append(f"Embedding unavailable, indexed with BM25 only: {e}")
+            for item in items:
+                while not stop.is_set():
+                    try:
+                        q.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            q.put((_DONE, None))
+        except BaseException as e:  # surface producer errors in the consumer
+            q.put((_DONE, e))
+
+    t = threading.Thread(target=produce, name="eka-ingest-stage", daemon=True)
+    t.start()
+    try:
+        while True:
+            item, err = q.get()
+            if item is _DONE:
+                if err is not None:
+                    raise err
+                return
+            yield item
+    finally:
+        stop.set()
+        t.join(timeout=5)
+
+
+def ingest_document(
+    doc: Document,
+    mode: str = "auto",
+    progress=None,
+    update: bool = False,
+    reindex: bool = True,
+    chunks: list[Chunk] | None = None,
+) -> dict:
+    """Chunk, store, embed and index a parsed document.
+
+    Runs as a streaming pipeline over fixed-size batches (PIPELINE_BATCH chunks):
+    the chunker runs ahead in one thread, embedding in another, and the caller stores
+    and upserts each batch. Bounded queues between the stages keep peak memory
+    independent of document size.
+
+    With `update=True` and a `source_key` in doc.meta (path or URL), a document
+    previously ingested from the same source is updated in place: it keeps its
+    doc_id, and because chunk ids are content-derived only chunks that are new or
+    changed get embedded; chunks that disappeared are deleted from SQLite and the
+    vector store, and BM25 is rebuilt without them.
+
+    `reindex=False` skips the BM25 rebuild for callers that ingest many documents and
+    rebuild once at the end (folder sync).
+
+    `chunks` are chunks already computed for `doc` (bulk workers); they are used instead
+    of chunking again when they were made under the doc_id the document ends up with.
+
+    `progress(stage, done=..., total=..., status=...)` is optional and is called as the
+    document moves through chunk -> embed -> upsert -> index (used by ingest jobs).
+    """
+    report = progress or (lambda *a, **k: None)
+    warnings: list[str] = []
+
+    existing_ids: set[str] = set()
+    previous = find_document_by_source_key((doc.meta or {}).get("source_key")) if update else None
+    if previous:
+        doc.doc_id = previous["doc_id"]
+        existing_ids = list_chunk_ids(doc.doc_id)
+
+    effective_mode = prepare_document(doc, mode)
+    if chunks and chunks[0].doc_id != doc.doc_id:
+        chunks = None  # ids derive from the doc_id: these cannot be diffed against the stored ones
+    if previous and existing_ids and previous["content_hash"] and previous["content_hash"] == doc.meta.get("content_hash"):
+        return {
+            "ok": True,
+            "doc_id": doc.doc_id,
+            "title": previous["title"],
+            "mode": effective_mode,
+            "chunks": len(existing_ids),
+            "updated": True,
+            "unchanged": True,
+            "embedded": 0,
+            "deleted": 0,
+            "warnings": warnings,
+        }
+    save_document(doc)
+    if doc.meta.get("blob_hash"):
+        from app.services.blob_service import set_doc_blob
+
+        set_doc_blob(doc.doc_id, doc.meta["blob_hash"])
 
-    if chunks and vectors:
+    state = {"embed_ok": True, "upsert_ok": True, "chunks": 0, "embedded": 0, "upserted": 0}
+    seen_ids: set[str] = set()
+    depth = settings.PIPELINE_QUEUE_DEPTH
+
+    def embedded_batches():
+        source = chunks if chunks is not None else iter_document_chunks(doc, effective_mode)
+        for batch in _run_ahead(_batched(source, settings.PIPELINE_BATCH), depth):
+            # Unchanged chunks keep their id and their stored vector.
+            fresh = [c for c in batch if c.chunk_id not in existing_ids]
+            vectors = None
+            if fresh and state["embed_ok"] and state["upsert_ok"]:
+                try:
+                    vectors = embed_texts([c.text for c in fresh])
+                    state["embedded"] += len(fresh)
+                    report("embed", done=state["embedded"])
+                except Exception as e:
+                    warnings.append(f"Embedding unavailable, indexed with BM25 only: {e}")
+                    state["embed_ok"] = False
+                    report("embed", status="failed")
+            yield batch, fresh, vectors
+
+    report("chunk")
+    for batch, fresh, vectors in _run_ahead(embedded_batches(), depth):
+        save_chunks(batch)
+        seen_ids.update(c.chunk_id for c in batch)
+        state["chunks"] += len(batch)
+        report("chunk", done=state["chunks"])
+        if vectors and state["upsert_ok"]:
+            try:
+                upsert_vectors(fresh, vectors, ensure=state["upserted"] == 0)
+                state["upserted"] += len(fresh)
+                report("upsert", done=state["upserted"])
+            except Exception as e:
+                warnings.append(f"Vector upsert unavailable, indexed with BM25 only: {e}")
+                state["upsert_ok"] = False
+                report("upsert", status="failed")
+
+    n_chunks = state["chunks"]
+    report("chunk", done=n_chunks, total=n_chunks, status="done")
+    if state["embedded"]:
+        report("embed", done=state["embedded"], total=n_chunks, status="done" if state["embed_ok"] else "failed")
+    if state["upserted"]:
+        report("upsert", done=state["upserted"], total=n_chunks, status="done" if state["upsert_ok"] else "failed")
+
+    vanished = sorted(existing_ids - seen_ids)
+    if vanished:
+        delete_chunks(vanished)
         try:
             vec = get_vector()
-            vec.ensure_collection(dim=len(vectors[0]))
-            vec.upsert(
-                ids=[c.chunk_id for c in chunks],
-                vectors=vectors,
-                payloads=[{"chunk_id": c.chunk_id, "doc_id": c.doc_id, **(c.meta or {})} for c in chunks],
-            )
+            if hasattr(vec, "delete_ids"):
+                vec.delete_ids(vanished)
         except Exception as e:
-            warnings.append(f"Vector upsert unavailable, indexed with BM25 only: {e}")
+            warnings.append(f"Could not delete {len(vanished)} stale vectors: {e}")
 
-    if chunks:
+    if reindex and (n_chunks or vanished):
+        report("index")
         rebuild_bm25()
+        report("index", status="done")
 
-    return {
+    result = {
         "ok": True,
         "doc_id": doc.doc_id,
         "title": doc.title,
         "mode": effective_mode,
-        "chunks": len(chunks),
+        "chunks": n_chunks,
+        "embedded": state["embedded"],
         "warnings": warnings,
     }
-
+    if previous:
+        result.update({"updated": True, "deleted": len(vanished)})
+    return result
@@ -0,0 +1,190 @@
+"""On-demand request profiling.
+
+Why this exists:
+- Aggregate latency numbers don't tell us *why* one particular query is slow.
+- A single `/search` or `/chat` request can opt in (admin header or `?profile=1`)
+  and gets wrapped in a lightweight sampling profiler.
+
+Output is the "collapsed stack" format (one `frame;frame;frame count` per line)
+that flamegraph.pl, speedscope and inferno read directly. Files live under
+`DATA_DIR/profiles` and are pruned to `PROFILE_MAX_FILES`.
+
+Disabled by default (PROFILE_ENABLED=false). When disabled the middleware is not
+installed at all, so requests pay nothing.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from app.core.config import settings
+
+PROFILE_SUFFIX = ".collapsed"
+_NAME_RE = re.compile(r"^[A-Za-z0-9_\-]+\.collapsed$")
+
+
+def profiles_dir() -> Path:
+    return Path(settings.DATA_DIR) / "profiles"
+
+
+def is_requested(headers, query_params) -> bool:
+    """Return True when the caller asked for a profile and is allowed to get one."""
+    flag = headers.get(settings.PROFILE_HEADER) or query_params.get("profile")
+    if not flag or flag.strip().lower() in {"0", "false", "no", "off"}:
+        return False
+    token = settings.PROFILE_TOKEN
+    if token:
+        supplied = headers.get(settings.PROFILE_TOKEN_HEADER) or query_params.get("profile_token")
+        return supplied == token
+    return True
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Sample one thread's Python stack at a fixed interval.
+
+    The target is the thread that starts the profiler (the event loop thread for
+    async handlers). Busy threads of asyncio's default executor (retrieval runs there
+    via `asyncio.to_thread`) are sampled too, under a `thread:<name>` root frame.
+    Other requests served concurrently will show up in the samples as well; profile a
+    quiet instance for clean results.
+    """
+
+    def __init__(self, interval_ms: float | None = None):
+        self.interval = max(0.5, float(interval_ms or settings.PROFILE_INTERVAL_MS)) / 1000.0
+        self.samples: Counter[str] = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.started_at = 0.0
+        self.duration = 0.0
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            self._sample(frames.get(self._target))
+            for t in threading.enumerate():
+                if t.name.startswith("asyncio_") and t.ident in frames:
+                    self._sample(frames[t.ident], root=f"thread:{t.name.rsplit('_', 1)[0]}")
+
+    def _sample(self, frame, root: str | None = None):
+        stack = []
+        while frame is not None:
+            stack.append(_frame_label(frame))
+            frame = frame.f_back
+        if root is not None:
+            if not stack or stack[0].startswith("thread.py:_worker"):
+                return  # idle executor thread waiting for work
+            stack.append(root)
+        if stack:
+            self.samples[";".join(reversed(stack))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="eka-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.duration = time.perf_counter() - self.started_at
+        return self
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def new_profile_name(path: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", path).strip("_") or "root"
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+    return f"{stamp}_{slug}_{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+
+
+def save_profile(name: str, profiler: SamplingProfiler) -> Path:
+    d = profiles_dir()
+    d.mkdir(parents=True, exist_ok=True)
+    target = d / name
+    tmp = target.with_suffix(".tmp")
+    tmp.write_text(profiler.collapsed(), encoding="utf-8")
+    os.replace(tmp, target)
+    prune_profiles()
+    return target
+
+
+def prune_profiles(max_files: int | None = None) -> int:
+    """Keep only the newest `max_files` profiles. Returns the number removed."""
+    keep = settings.PROFILE_MAX_FILES if max_files is None else max_files
+    files = sorted(profiles_dir().glob(f"*{PROFILE_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True)
+    removed = 0
+    for p in files[max(0, keep):]:
+        try:
+            p.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def list_profiles() -> list[dict]:
+    d = profiles_dir()
+    if not d.is_dir():
+        return []
+    out = []
+    for p in sorted(d.glob(f"*{PROFILE_SUFFIX}"), key=lambda p: p.stat().st_mtime, reverse=True):
+        st = p.stat()
+        out.append({"name": p.name, "size": st.st_size, "created_at": st.st_mtime})
+    return out
+
+
+def resolve_profile(name: str) -> Path | None:
+    """Map a user-supplied name to a file inside the profiles dir (no traversal)."""
+    if not _NAME_RE.match(name or ""):
+        return None
+    p = profiles_dir() / name
+    return p if p.is_file() else None
+
+
+def install_profiling(app) -> None:
+    """Register the profiling middleware on `app` (only call when enabled)."""
+    prefixes = tuple(p.strip() for p in (settings.PROFILE_PATHS or "").split(",") if p.strip())
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        if not request.url.path.startswith(prefixes) or not is_requested(request.headers, request.query_params):
+            return await call_next(request)
+
+        name = new_profile_name(request.url.path)
+        profiler = SamplingProfiler().start()
+        try:
+            response = await call_next(request)
+        except Exception:
+            save_profile(name, profiler.stop())
+            raise
+        response.headers[settings.PROFILE_HEADER + "-Id"] = name
+
+        # call_next always hands back a streamed body. For /chat/stream the real work
+        # happens while that body is consumed, so keep sampling until the last chunk.
+        inner = response.body_iterator
+
+        async def wrapped():
+            try:
+                async for chunk in inner:
+                    yield chunk
+            finally:
+                save_profile(name, profiler.stop())
+
+        response.body_iterator = wrapped()
+        return response
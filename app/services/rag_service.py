@@ -1,6 +1,10 @@
 from app.services.citation_service import build_context
 
-def build_prompt(question: str, context: str, mode: str = "auto") -> str:
+# Bump whenever the prompt below changes: cached answers are keyed on it.
+PROMPT_VERSION = "2"
+
+
+def build_prompt(question: str, context: str, mode: str = "auto", history: str = "") -> str:
     # Unified assistant so UI doesn't need a mode switch.
     system = (
         "You are a knowledge assistant. Prefer and cite the provided CONTEXT (knowledge base) when it is relevant. "
@@ -8,6 +12,9 @@ def build_prompt(question: str, context: str, mode: str = "auto") -> str:
         "Only ask a clarifying question if the user request is truly ambiguous. "
         "Keep answers clear and practical. Cite sources like [1], [2] when using CONTEXT."
     )
+    if history:
+        # Condensed earlier turns of a chat session (see session_service.condense_history).
+        system += f"\n\nCONVERSATION SO FAR:\n{history}"
     return f"""{system}
 
 QUESTION:
@@ -17,3 +24,18 @@ CONTEXT:
 {context}
 
 ANSWER:"""
+
+
+def build_followup_prompt(question: str, context: str) -> str:
+    """Prompt for a session turn that continues the previous turn's LLM context.
+
+    The instructions and earlier turns are already in that context (and in Ollama's KV
+    cache), so only the new question and passages are sent.
+    """
+    return f"""FOLLOW-UP QUESTION:
+{question}
+
+CONTEXT:
+{context}
+
+ANSWER:"""
@@ -5,14 +5,37 @@ Enable with optional deps:
   pip install .[local_ml]
 and set:
   RERANK_BACKEND=st
+
+With the cross-encoder:
+- only the RERANK_MAX_CANDIDATES candidates sharing the most terms with the query are
+  scored (a cheap lexical pre-filter), with passages cut to RERANK_MAX_CHARS,
+- (query, chunk) scores are kept in an LRU of RERANK_CACHE_SIZE entries, so repeated
+  questions skip the model,
+- the model runs in one dedicated thread. Pairs submitted by concurrent requests while
+  it is busy (or within RERANK_BATCH_WAIT_MS) are scored together in one predict call.
 """
 
 from __future__ import annotations
 
+import hashlib
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
 from app.core.config import settings
 
 _reranker = None
 
+_scores: "OrderedDict[tuple, float]" = OrderedDict()
+# Guards the LRU and the counters (updated from request threads and the model thread).
+_scores_lock = threading.Lock()
+_stats = {"cache_hits": 0, "cache_misses": 0, "prefiltered": 0, "batches": 0, "pairs": 0}
+
+_TOKEN_RE = re.compile(r"\w+")
+
 
 def _get_st_reranker():
     global _reranker
@@ -27,11 +50,124 @@ def _get_st_reranker():
     return _reranker
 
 
+class _Batcher:
+    """Single model thread that scores the queued requests' pairs in one call."""
+
+    def __init__(self):
+        self._queue: "queue.Queue[tuple[list, Future]]" = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def submit(self, pairs: list[list[str]]) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rerank", daemon=True)
+                self._thread.start()
+        self._queue.put((pairs, fut))
+        return fut
+
+    def _collect(self) -> list[tuple[list, Future]]:
+        batch = [self._queue.get()]
+        n = len(batch[0][0])
+        deadline = time.monotonic() + settings.RERANK_BATCH_WAIT_MS / 1000.0
+        while n < settings.RERANK_BATCH_MAX_PAIRS:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            n += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            pairs = [p for ps, _ in batch for p in ps]
+            try:
+                model = _get_st_reranker()
+                scores = [float(s) for s in model.predict(pairs, batch_size=max(1, settings.RERANK_BATCH_MAX_PAIRS))]
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            with _scores_lock:
+                _stats["batches"] += 1
+                _stats["pairs"] += len(pairs)
+            i = 0
+            for ps, fut in batch:
+                fut.set_result(scores[i : i + len(ps)])
+                i += len(ps)
+
+
+_batcher = _Batcher()
+
+
+def _terms(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
+
+
+def prefilter(query: str, candidates: list[dict], limit: int) -> list[dict]:
+    """Keep the `limit` candidates covering the most query terms (ties keep retrieval order)."""
+    if limit <= 0 or len(candidates) <= limit:
+        return candidates
+    q = _terms(query)
+    ranked = sorted(
+        range(len(candidates)), key=lambda i: (-len(q & _terms(candidates[i].get("text", ""))), i)
+    )
+    return [candidates[i] for i in sorted(ranked[:limit])]
+
+
+def _cache_key(query_hash: str, c: dict) -> tuple:
+    # The text hash keeps a score from outliving an edit of the chunk.
+    return (settings.RERANK_MODEL, query_hash, c.get("chunk_id"), hash(c.get("text", "")))
+
+
+def score(query: str, candidates: list[dict]) -> list[float]:
+    """Cross-encoder scores for `candidates`, from the LRU where possible."""
+    query_hash = hashlib.sha1(" ".join(query.casefold().split()).encode("utf-8")).hexdigest()
+    keys = [_cache_key(query_hash, c) for c in candidates]
+    out: list[float | None] = []
+    with _scores_lock:
+        for k in keys:
+            s = _scores.get(k)
+            if s is not None:
+                _scores.move_to_end(k)
+            out.append(s)
+        missing = [i for i, s in enumerate(out) if s is None]
+        _stats["cache_hits"] += len(out) - len(missing)
+        _stats["cache_misses"] += len(missing)
+    if missing:
+        limit = settings.RERANK_MAX_CHARS
+        pairs = [[query, (candidates[i].get("text", "") or "")[: limit if limit > 0 else None]] for i in missing]
+        fresh = _batcher.submit(pairs).result()
+        with _scores_lock:
+            for i, s in zip(missing, fresh):
+                out[i] = s
+                _scores[keys[i]] = s
+            while len(_scores) > max(0, settings.RERANK_CACHE_SIZE):
+                _scores.popitem(last=False)
+    return out
+
+
+def clear_cache() -> None:
+    with _scores_lock:
+        _scores.clear()
+
+
+def stats() -> dict:
+    with _scores_lock:
+        out = {**_stats, "cached_scores": len(_scores)}
+    out["avg_batch_pairs"] = round(out["pairs"] / out["batches"], 1) if out["batches"] else 0.0
+    return out
+
+
 def rerank(query: str, candidates: list[dict], top_k: int) -> list[dict]:
     """Return top_k candidates sorted by rerank_score.
 
     If reranking is disabled or not available, returns the first top_k candidates
-    (preserving their current order).
+    (preserving their current order). Blocks until scored; call it off the event loop.
     """
     if not candidates:
         return []
@@ -41,11 +177,13 @@ def rerank(query: str, candidates: list[dict], top_k: int) -> list[dict]:
         return candidates[:top_k]
 
     if backend in {"st", "sentence_transformers"}:
-        pairs = [[query, c.get("text", "")] for c in candidates]
-        scores = _get_st_reranker().predict(pairs).tolist()
-        for c, s in zip(candidates, scores):
-            c["rerank_score"] = float(s)
-        return sorted(candidates, key=lambda x: x.get("rerank_score", 0.0), reverse=True)[:top_k]
+        limit = max(settings.RERANK_MAX_CANDIDATES, top_k) if settings.RERANK_MAX_CANDIDATES > 0 else 0
+        shortlist = prefilter(query, candidates, limit)
+        with _scores_lock:
+            _stats["prefiltered"] += len(candidates) - len(shortlist)
+        for c, s in zip(shortlist, score(query, shortlist)):
+            c["rerank_score"] = s
+        return sorted(shortlist, key=lambda x: x.get("rerank_score", 0.0), reverse=True)[:top_k]
 
     # unknown backend => safe fallback
     return candidates[:top_k]
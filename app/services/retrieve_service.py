@@ -1,6 +1,5 @@
-from app.adapters.vector.qdrant import QdrantVectorStore
 from app.adapters.bm25.bm25 import BM25Index
-from app.services.embed_service import embed_texts
+from app.services.embed_service import embed_query
 # NOTE: avoid circular import; import store_service lazily inside functions
 
 from app.core.config import settings
@@ -11,7 +10,12 @@ _bm25 = BM25Index()
 def get_vector():
     global _vector
     if _vector is None:
-        _vector = QdrantVectorStore()
+        if (settings.VECTOR_BACKEND or "qdrant").lower() == "memory":
+            from app.adapters.vector.memory import InMemoryVectorStore
+            _vector = InMemoryVectorStore()
+        else:
+            from app.adapters.vector.qdrant import QdrantVectorStore
+            _vector = QdrantVectorStore()
     return _vector
 
 def rebuild_bm25():
@@ -27,32 +31,24 @@ def rrf_fuse(rank_a: list[str], rank_b: list[str], k: int) -> list[str]:
         score[cid] = score.get(cid, 0.0) + 1.0 / (k + r + 1)
     return [cid for cid, _ in sorted(score.items(), key=lambda x: x[1], reverse=True)]
 
-def hybrid_search(query: str, topk_vector: int | None = None, topk_bm25: int | None = None, meta_filter: dict | None = None) -> list[dict]:
-    topk_vector = topk_vector or settings.TOPK_VECTOR
-    topk_bm25 = topk_bm25 or settings.TOPK_BM25
-    out_limit = max(topk_vector, topk_bm25)
+def lexical_ranks(query: str, topk_bm25: int) -> list[str]:
+    try:
+        return [h["chunk_id"] for h in _bm25.search(query, topk_bm25)]
+    except Exception:
+        return []
+
 
+def vector_ranks(query: str, topk_vector: int, meta_filter: dict | None = None) -> list[str]:
     # Embeddings or vector DB may be temporarily unavailable (e.g., Ollama model not pulled yet).
     # We degrade gracefully to BM25-only instead of returning 500.
-    qvec = None
-    vec_hits = []
-    bm25_hits = []
-
     try:
-        qvec = embed_texts([query])[0]
+        qvec = embed_query(query)
     except Exception:
-        qvec = None
-
-    if qvec is not None:
-        try:
-            vec_hits = get_vector().search(qvec, topk_vector, filter=meta_filter)
-        except Exception:
-            vec_hits = []
-
+        return []
     try:
-        bm25_hits = _bm25.search(query, topk_bm25)
+        vec_hits = get_vector().search(qvec, topk_vector, filter=meta_filter)
     except Exception:
-        bm25_hits = []
+        return []
 
     vec_rank = []
     for h in vec_hits:
@@ -63,21 +59,19 @@ def hybrid_search(query: str, topk_vector: int | None = None, topk_bm25: int | N
             cid = getattr(h, "chunk_id", None) or getattr(h, "id", None) or payload.get("chunk_id") or payload.get("id")
         if cid is not None:
             vec_rank.append(str(cid))
-    bm25_rank = [h["chunk_id"] for h in bm25_hits]
-    # If one side is empty, just use the other.
-    if vec_rank and bm25_rank:
-        fused = rrf_fuse(vec_rank, bm25_rank, settings.RRF_K)
-    else:
-        fused = vec_rank or bm25_rank
+    return vec_rank
+
+
+def hydrate(chunk_ids: list[str], limit: int) -> list[dict]:
+    """Load text + metadata for ranked chunk ids (skipping unknown ids)."""
+    from app.services import store_service
 
-    # hydrate chunks (text + metadata)
     out = []
     seen = set()
-    for cid in fused:
+    for cid in chunk_ids:
         if cid in seen:
             continue
         seen.add(cid)
-        from app.services import store_service
         c = store_service.get_chunk(cid)
         if not c:
             continue
@@ -85,9 +79,44 @@ def hybrid_search(query: str, topk_vector: int | None = None, topk_bm25: int | N
             "chunk_id": cid,
             "text": c["text"],
             "doc_id": c["doc_id"],
+            "start_char": c["start_char"],
+            "end_char": c["end_char"],
             "heading_path": c["heading_path"],
             "meta": c["meta"],
         })
-        if len(out) >= out_limit:
+        if len(out) >= limit:
             break
     return out
+
+
+def hybrid_search(
+    query: str,
+    topk_vector: int | None = None,
+    topk_bm25: int | None = None,
+    meta_filter: dict | None = None,
+    on_stage=None,
+) -> list[dict]:
+    """BM25 + vector retrieval fused with RRF.
+
+    `on_stage(name, hits)` (optional) is called with the hydrated "lexical" hits as soon
+    as BM25 is done (before the slower embedding call) and with the "fused" result.
+    """
+    topk_vector = topk_vector or settings.TOPK_VECTOR
+    topk_bm25 = topk_bm25 or settings.TOPK_BM25
+    out_limit = max(topk_vector, topk_bm25)
+
+    bm25_rank = lexical_ranks(query, topk_bm25)
+    if on_stage is not None:
+        on_stage("lexical", hydrate(bm25_rank, topk_bm25))
+    vec_rank = vector_ranks(query, topk_vector, meta_filter)
+
+    # If one side is empty, just use the other.
+    if vec_rank and bm25_rank:
+        fused = rrf_fuse(vec_rank, bm25_rank, settings.RRF_K)
+    else:
+        fused = vec_rank or bm25_rank
+
+    out = hydrate(fused, out_limit)
+    if on_stage is not None:
+        on_stage("fused", out)
+    return out
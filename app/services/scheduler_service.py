@@ -0,0 +1,148 @@
+"""Admission control and priority queue in front of the LLM.
+
+Why this exists:
+- Ollama only runs a few generations at a time. Every /chat request used to go straight
+  to it, so under load requests piled up invisibly inside Ollama until clients timed out.
+
+At most LLM_MAX_CONCURRENCY generations run at once. Further requests wait in a
+bounded queue (LLM_QUEUE_MAX) ordered by priority, FIFO within a priority:
+INTERACTIVE (/chat/stream, a person is watching) before BATCH (/chat, API callers).
+A full queue is rejected immediately (429) and a request that waited longer than
+LLM_QUEUE_TIMEOUT_SEC gets 503, both with a Retry-After estimate derived from recent
+generation times. Waiters can observe their queue position (SSE `queue` events).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from app.core.config import settings
+
+INTERACTIVE = 0
+BATCH = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class Overloaded(Exception):
+    """The LLM queue is full (status 429) or the wait timed out (status 503)."""
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class Scheduler:
+    def __init__(self):
+        self._active = 0
+        # [priority, seq, future, on_position, last reported position]; cancelled entries are skipped lazily
+        self._heap: list[list] = []
+        self._seq = itertools.count()
+        self._waits: deque[float] = deque(maxlen=1000)
+        self._service_sec = 10.0  # EWMA of slot hold time, used for Retry-After
+        self._counts = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @property
+    def limit(self) -> int:
+        return max(1, settings.LLM_MAX_CONCURRENCY)
+
+    def _queued(self) -> list[list]:
+        return [e for e in self._heap if not e[2].done()]
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self._service_sec * (len(self._queued()) + 1) / self.limit))
+
+    def check(self) -> None:
+        """Raise Overloaded(429) if a new request would not even fit in the queue."""
+        if self._active >= self.limit and len(self._queued()) >= settings.LLM_QUEUE_MAX:
+            self._counts["rejected"] += 1
+            raise Overloaded("LLM queue is full", 429, self.retry_after())
+
+    def _dispatch(self) -> None:
+        while self._heap and self._active < self.limit:
+            fut = heapq.heappop(self._heap)[2]
+            if not fut.done():
+                self._active += 1
+                fut.set_result(None)
+        self._notify()
+
+    def _notify(self) -> None:
+        """Tell every waiter whose queue position changed."""
+        for pos, e in enumerate(sorted(self._queued(), key=lambda e: (e[0], e[1])), 1):
+            if e[3] is not None and e[4] != pos:
+                e[4] = pos
+                e[3](pos)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = BATCH, on_position: Callable[[int], None] | None = None):
+        """Hold one generation slot for the duration of the block."""
+        t0 = time.perf_counter()
+        if self._active < self.limit and not self._queued():
+            self._active += 1
+        else:
+            self.check()
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._heap, [priority, next(self._seq), fut, on_position, None])
+            self._notify()
+            try:
+                await asyncio.wait_for(asyncio.shield(fut), timeout=settings.LLM_QUEUE_TIMEOUT_SEC)
+            except asyncio.TimeoutError:
+                if not fut.done():  # otherwise admitted in the same tick: keep the slot
+                    self._counts["timed_out"] += 1
+                    fut.cancel()
+                    self._notify()
+                    raise Overloaded("Timed out waiting for the LLM", 503, self.retry_after()) from None
+            except BaseException:
+                if fut.done() and not fut.cancelled():
+                    # Admitted just as we gave up: pass the slot on.
+                    self._active -= 1
+                    self._dispatch()
+                else:
+                    fut.cancel()
+                    self._notify()
+                raise
+            if on_position is not None:
+                on_position(0)
+        self._counts["admitted"] += 1
+        self._waits.append(time.perf_counter() - t0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._service_sec = 0.8 * self._service_sec + 0.2 * (time.perf_counter() - started)
+            self._active -= 1
+            self._dispatch()
+
+    def stats(self) -> dict:
+        queued = self._queued()
+        waits = sorted(self._waits)
+
+        def pct(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 1) if waits else 0.0
+
+        return {
+            "active": self._active,
+            "limit": self.limit,
+            "queued": len(queued),
+            "queue_max": settings.LLM_QUEUE_MAX,
+            "queued_by_priority": {
+                name: sum(1 for e in queued if e[0] == p) for p, name in _PRIORITY_NAMES.items()
+            },
+            **self._counts,
+            "wait_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+            "generation_sec_ewma": round(self._service_sec, 3),
+        }
+
+
+_scheduler = Scheduler()
+
+
+def get_scheduler() -> Scheduler:
+    return _scheduler
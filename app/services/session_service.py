@@ -0,0 +1,184 @@
+"""Server-side multi-turn chat sessions.
+
+Why this exists:
+- /chat only knew the current question: follow-ups ("and for contractors?") retrieved
+  the wrong passages, and every turn sent Ollama a brand-new prompt, so nothing of the
+  previous turn's KV cache was reused.
+
+A session stores its turns in SQLite (`chat_sessions`, `chat_turns`) and expires
+CHAT_SESSION_TTL_SEC after its last turn. Each turn:
+- retrieves with the previous question prepended, so follow-ups find the same topic,
+- with Ollama, continues from the `context` token array the previous turn returned:
+  the conversation so far is already in the model's KV cache and the new prompt only
+  carries the new question and passages (much lower time-to-first-token),
+- otherwise (other providers, model changed, context over CHAT_KV_MAX_TOKENS) falls
+  back to a condensed history block: the last CHAT_HISTORY_TURNS turns with answers
+  shortened, capped at CHAT_HISTORY_MAX_CHARS, so prompts never grow without limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import uuid
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def purge_expired(now: float | None = None) -> int:
+    now = now or time.time()
+    conn = _connect()
+    ids = [r[0] for r in conn.execute("SELECT session_id FROM chat_sessions WHERE expires_at < ?", (now,))]
+    conn.executemany("DELETE FROM chat_turns WHERE session_id=?", [(i,) for i in ids])
+    conn.executemany("DELETE FROM chat_sessions WHERE session_id=?", [(i,) for i in ids])
+    conn.commit()
+    conn.close()
+    return len(ids)
+
+
+async def _loop() -> None:
+    # Expired sessions are also purged on create; this covers servers nobody starts chats on.
+    while True:
+        await asyncio.sleep(min(3600, max(60, settings.CHAT_SESSION_TTL_SEC)))
+        try:
+            n = await asyncio.to_thread(purge_expired)
+            if n:
+                log.info("chat sessions: purged %d expired session(s)", n)
+        except Exception as e:
+            log.warning("chat session purge failed: %s", e)
+
+
+def start() -> list[asyncio.Task]:
+    return [asyncio.create_task(_loop())]
+
+
+def create_session() -> str:
+    purge_expired()
+    now = time.time()
+    session_id = str(uuid.uuid4())
+    conn = _connect()
+    conn.execute(
+        "INSERT INTO chat_sessions(session_id, created_at, updated_at, expires_at) VALUES(?,?,?,?)",
+        (session_id, now, now, now + settings.CHAT_SESSION_TTL_SEC),
+    )
+    conn.commit()
+    conn.close()
+    return session_id
+
+
+def get_session(session_id: str, turns: int | None = None) -> dict | None:
+    """Session with its last `turns` turns (all when None); None if unknown or expired."""
+    conn = _connect()
+    row = conn.execute(
+        "SELECT created_at, updated_at, expires_at, llm_model, llm_context FROM chat_sessions WHERE session_id=?",
+        (session_id,),
+    ).fetchone()
+    if not row or row[2] < time.time():
+        conn.close()
+        return None
+    sql = "SELECT turn_no, question, answer, citations_json, created_at FROM chat_turns WHERE session_id=? ORDER BY turn_no DESC"
+    params: tuple = (session_id,)
+    if turns is not None:
+        sql += " LIMIT ?"
+        params += (turns,)
+    rows = conn.execute(sql, params).fetchall()
+    n = conn.execute("SELECT COUNT(*) FROM chat_turns WHERE session_id=?", (session_id,)).fetchone()[0]
+    conn.close()
+    return {
+        "session_id": session_id,
+        "created_at": row[0],
+        "updated_at": row[1],
+        "expires_at": row[2],
+        "llm_model": row[3],
+        "llm_context": json.loads(row[4]) if row[4] else None,
+        "turn_count": n,
+        "turns": [
+            {"turn": r[0], "question": r[1], "answer": r[2], "citations": json.loads(r[3] or "[]"), "created_at": r[4]}
+            for r in reversed(rows)
+        ],
+    }
+
+
+def add_turn(
+    session_id: str,
+    question: str,
+    answer: str,
+    citations: list[dict],
+    llm_model: str | None = None,
+    llm_context: list[int] | None = None,
+) -> None:
+    """Append a turn and remember the LLM context it ended with (None clears it)."""
+    now = time.time()
+    conn = _connect()
+    with conn:
+        # One statement: two streams finishing on the same session cannot both read the
+        # same MAX(turn_no) (SQLite holds the write lock for the whole INSERT ... SELECT).
+        conn.execute(
+            "INSERT INTO chat_turns(session_id, turn_no, question, answer, citations_json, created_at) "
+            "SELECT ?, COALESCE(MAX(turn_no), 0) + 1, ?, ?, ?, ? FROM chat_turns WHERE session_id=?",
+            (session_id, question, answer, json.dumps(citations, ensure_ascii=False), now, session_id),
+        )
+        conn.execute(
+            "UPDATE chat_sessions SET updated_at=?, expires_at=?, llm_model=?, llm_context=? WHERE session_id=?",
+            (
+                now,
+                now + settings.CHAT_SESSION_TTL_SEC,
+                llm_model,
+                json.dumps(llm_context) if llm_context else None,
+                session_id,
+            ),
+        )
+    conn.close()
+
+
+def delete_session(session_id: str) -> bool:
+    conn = _connect()
+    conn.execute("DELETE FROM chat_turns WHERE session_id=?", (session_id,))
+    deleted = conn.execute("DELETE FROM chat_sessions WHERE session_id=?", (session_id,)).rowcount
+    conn.commit()
+    conn.close()
+    return bool(deleted)
+
+
+def retrieval_query(question: str, turns: list[dict]) -> str:
+    """Follow-ups are often elliptical; search with the previous question as well."""
+    if not turns:
+        return question
+    return f"{turns[-1]['question']}\n{question}"
+
+
+def condense_history(turns: list[dict], max_chars: int | None = None, answer_chars: int = 400) -> str:
+    """Recent turns as `User:`/`Assistant:` lines, newest kept first when over budget."""
+    budget = settings.CHAT_HISTORY_MAX_CHARS if max_chars is None else max_chars
+    lines: list[str] = []
+    used = 0
+    for t in reversed(turns[-settings.CHAT_HISTORY_TURNS :] if settings.CHAT_HISTORY_TURNS > 0 else []):
+        answer = " ".join((t["answer"] or "").split())
+        if len(answer) > answer_chars:
+            answer = answer[:answer_chars].rsplit(" ", 1)[0] + " …"
+        entry = f"User: {t['question'].strip()}\nAssistant: {answer}"
+        if used + len(entry) > budget:
+            break
+        lines.append(entry)
+        used += len(entry)
+    return "\n".join(reversed(lines))
+
+
+def reusable_context(session: dict | None, model: str) -> list[int] | None:
+    """The previous turn's LLM context, if it can be continued from."""
+    if not session or not session["llm_context"] or session["llm_model"] != model:
+        return None
+    if len(session["llm_context"]) > settings.CHAT_KV_MAX_TOKENS:
+        return None
+    return session["llm_context"]
@@ -0,0 +1,243 @@
+"""Coalesce identical concurrent /search and /chat requests (single-flight).
+
+Why this exists:
+- During incidents many people ask the same question at the same moment, and every
+  request ran its own retrieval and its own full LLM generation.
+
+`run(key, factory)`: the first caller for `key` (the leader) starts `factory()` as a
+task; callers arriving while it is in flight (followers) await the same task. The
+task is shielded, so a leader that disconnects does not cancel the work the
+followers are waiting for. Once it finishes the key is released: later requests
+start fresh (the answer cache covers repeats after that).
+
+`stream(key, factory)`: the same for token streams. One producer task reads the LLM
+stream into a `Broadcast`; every subscriber first replays the tokens emitted so far
+and then follows live. The producer is cancelled only when its last subscriber leaves.
+While the generation waits for an LLM slot, the producer publishes its queue position
+to all subscribers. Streams are also resumable by id after a dropped connection (see
+`Broadcast`).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.core.config import settings
+
+_inflight: dict[tuple, asyncio.Future] = {}
+_streams: dict[tuple, "Broadcast"] = {}
+_by_id: dict[str, "Broadcast"] = {}
+_stats = {"leaders": 0, "followers": 0}
+
+
+def normalize(text: str) -> str:
+    """Case- and whitespace-insensitive form of a question used in coalescing keys."""
+    return " ".join((text or "").casefold().split())
+
+
+async def run(key: tuple, factory: Callable[[], Awaitable]):
+    """Await `factory()`, sharing one execution among concurrent callers with the same key."""
+    if not settings.COALESCE_ENABLED:
+        return await factory()
+    fut = _inflight.get(key)
+    if fut is None:
+        _stats["leaders"] += 1
+        fut = asyncio.ensure_future(factory())
+        _inflight[key] = fut
+
+        def _release(f, k=key):
+            if _inflight.get(k) is f:
+                del _inflight[k]
+            if not f.cancelled():
+                f.exception()  # followers may all be gone; mark the exception as retrieved
+
+        fut.add_done_callback(_release)
+    else:
+        _stats["followers"] += 1
+    return await asyncio.shield(fut)
+
+
+class Broadcast:
+    """Fan one async token stream out to any number of subscribers.
+
+    Every stream has an `id`; a subscriber's position is the absolute index of the next
+    delta (the SSE event id is `<id>:<cursor>`), so a client that reconnects resumes with
+    `subscribe(start=cursor)`. Deltas are kept in a buffer capped at
+    STREAM_BUFFER_MAX_CHARS (oldest dropped first). With no subscriber the producer keeps
+    running for STREAM_GRACE_SEC before it is cancelled, and a finished stream stays
+    resumable for STREAM_RESUME_TTL_SEC.
+    """
+
+    def __init__(
+        self, factory: Callable[["Broadcast"], AsyncIterator[str]], on_complete: Callable[[str], None] | None = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.meta: dict = {}  # first SSE event (citations...), re-sent to clients resuming from 0
+        self.parts: list[str] = []
+        self.base = 0  # absolute index of parts[0]
+        self._chars = 0
+        self.error: Exception | None = None
+        self.done = False
+        self.queue_position = 0
+        self._changed = asyncio.Event()
+        self._subscribers = 0
+        self._task = asyncio.create_task(self._pump(factory(self), on_complete))
+        self._task.add_done_callback(self._finished)
+        # Also covers a client that disconnects before it ever subscribed.
+        self._grace = asyncio.get_running_loop().call_later(settings.STREAM_GRACE_SEC, self._abandon)
+        _by_id[self.id] = self
+
+    @property
+    def cursor(self) -> int:
+        return self.base + len(self.parts)
+
+    def set_queue_position(self, position: int) -> None:
+        self.queue_position = position
+        self._wake()
+
+    def _wake(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _append(self, delta: str) -> None:
+        self.parts.append(delta)
+        self._chars += len(delta)
+        limit = settings.STREAM_BUFFER_MAX_CHARS
+        while limit > 0 and self._chars > limit and len(self.parts) > 1:
+            self._chars -= len(self.parts.pop(0))
+            self.base += 1
+        self._wake()
+
+    async def _pump(self, source: AsyncIterator[str], on_complete) -> None:
+        # `parts` is trimmed to STREAM_BUFFER_MAX_CHARS; on_complete needs the whole answer.
+        answer: list[str] | None = [] if on_complete is not None else None
+        try:
+            async for delta in source:
+                if delta:
+                    self._append(delta)
+                    if answer is not None:
+                        answer.append(delta)
+            if on_complete is not None:
+                on_complete("".join(answer))
+        except asyncio.CancelledError:
+            self.error = RuntimeError("cancelled")
+            raise
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._wake()
+
+    def _abandon(self) -> None:
+        self._grace = None
+        if self._subscribers == 0 and not self._task.done():
+            self._task.cancel()
+
+    def _finished(self, _task) -> None:
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+        asyncio.get_running_loop().call_later(
+            settings.STREAM_RESUME_TTL_SEC, lambda: _by_id.pop(self.id, None) if _by_id.get(self.id) is self else None
+        )
+
+    def _pending_chars(self, i: int) -> int:
+        return sum(len(p) for p in self.parts[max(0, i - self.base) :])
+
+    async def subscribe(
+        self, start: int = 0, ping_sec: float = 15.0, frame_sec: float | None = None, frame_chars: int | None = None
+    ) -> AsyncIterator[tuple]:
+        """Yield ("token", text, cursor), ("queue", position), ("ping",) or ("gap",).
+
+        Frames are rate-limited to one per `frame_sec` (unless `frame_chars` are pending):
+        the first token goes out at once, later deltas are coalesced so a fast model does
+        not cost one SSE event (and one json.dumps) per token. ("gap",)
+        means `start` fell out of the buffer and the stream cannot be resumed there.
+        """
+        frame_sec = settings.STREAM_FRAME_MS / 1000.0 if frame_sec is None else frame_sec
+        frame_chars = settings.STREAM_FRAME_MAX_CHARS if frame_chars is None else frame_chars
+        loop = asyncio.get_running_loop()
+        self._subscribers += 1
+        if self._grace is not None:
+            self._grace.cancel()
+            self._grace = None
+        i = start
+        position = 0
+        last_frame = float("-inf")
+        try:
+            while True:
+                if self.queue_position != position and self.cursor == 0:
+                    position = self.queue_position
+                    yield ("queue", position)
+                    continue
+                if i < self.cursor:
+                    deadline = last_frame + frame_sec
+                    while not self.done and self._pending_chars(i) < frame_chars:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        changed = self._changed
+                        try:
+                            await asyncio.wait_for(changed.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            break
+                    if i < self.base:
+                        yield ("gap",)
+                        return
+                    end = self.cursor
+                    text = "".join(self.parts[i - self.base : end - self.base])
+                    i = end
+                    last_frame = loop.time()
+                    yield ("token", text, i)
+                    continue
+                if i < self.base:
+                    yield ("gap",)
+                    return
+                if self.done:
+                    return
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=ping_sec)
+                except asyncio.TimeoutError:
+                    yield ("ping",)
+        finally:
+            self._subscribers -= 1
+            if self._subscribers == 0 and not self._task.done():
+                self._grace = loop.call_later(settings.STREAM_GRACE_SEC, self._abandon)
+
+
+def resumable(stream_id: str) -> Broadcast | None:
+    """A live or recently finished stream by id (for Last-Event-ID resumes)."""
+    return _by_id.get(stream_id)
+
+
+def streaming(key: tuple) -> bool:
+    b = _streams.get(key)
+    return b is not None and not b.done
+
+
+def stream(
+    key: tuple,
+    factory: Callable[[Broadcast], AsyncIterator[str]],
+    on_complete: Callable[[str], None] | None = None,
+) -> tuple[Broadcast, bool]:
+    """Return (broadcast, is_leader); followers get the in-flight broadcast for `key`.
+
+    `factory(broadcast)` creates the token stream (and may report queue positions to it).
+    """
+    b = _streams.get(key) if settings.COALESCE_ENABLED else None
+    if b is not None and not b.done and b.base == 0:  # followers replay from the first token
+        _stats["followers"] += 1
+        return b, False
+    _stats["leaders"] += 1
+    b = Broadcast(factory, on_complete)
+    if settings.COALESCE_ENABLED:
+        _streams[key] = b
+        b._task.add_done_callback(lambda _t, k=key, b=b: _streams.pop(k, None) if _streams.get(k) is b else None)
+    return b, True
+
+
+def stats() -> dict:
+    return {"in_flight": len(_inflight), "streams": len(_streams), "resumable": len(_by_id), **_stats}
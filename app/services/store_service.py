@@ -1,4 +1,9 @@
+import logging
 import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from typing import Iterable
 from app.core.config import settings
 from app.core.models import Document, Chunk
@@ -6,6 +11,77 @@ from app.core.models import Document, Chunk
 from app.services.title_service import best_title, is_generic_title
 # NOTE: avoid circular import; import get_vector lazily when needed
 
+log = logging.getLogger(__name__)
+
+# doc_id -> {title, source, meta subset}; read by citation formatting on every chat.
+_META_KEYS = ("url", "original_name", "mode", "pages", "video_id")
+_meta_cache: "OrderedDict[str, dict]" = OrderedDict()
+_meta_lock = threading.Lock()
+
+
+def invalidate_doc_meta(doc_ids: Iterable[str] | None = None) -> None:
+    """Drop cached metadata for `doc_ids` (everything when None)."""
+    with _meta_lock:
+        if doc_ids is None:
+            _meta_cache.clear()
+            return
+        for doc_id in doc_ids:
+            _meta_cache.pop(doc_id, None)
+
+
+def _documents_changed(doc_ids: Iterable[str]) -> None:
+    """Drop derived state (metadata cache, cached chat answers) for changed documents."""
+    from app.services import answer_cache_service
+
+    doc_ids = list(doc_ids)
+    invalidate_doc_meta(doc_ids)
+    answer_cache_service.invalidate(doc_ids)
+
+
+def get_documents_meta(doc_ids: Iterable[str]) -> dict[str, dict]:
+    """Title/source/key meta for many documents: cache hits plus one query for the rest.
+
+    Unknown ids are absent from the result. Entries are dropped whenever a document is
+    saved, retitled or deleted through this module.
+    """
+    import json
+
+    wanted = list(dict.fromkeys(d for d in doc_ids if d))
+    out: dict[str, dict] = {}
+    with _meta_lock:
+        for doc_id in wanted:
+            hit = _meta_cache.get(doc_id)
+            if hit is not None:
+                _meta_cache.move_to_end(doc_id)
+                out[doc_id] = hit
+    missing = [d for d in wanted if d not in out]
+    if missing:
+        conn = sqlite3.connect(settings.DB_PATH)
+        rows = []
+        for i in range(0, len(missing), 500):  # stay under SQLite's bound-parameter limit
+            part = missing[i : i + 500]
+            rows += conn.execute(
+                f"SELECT doc_id, title, source, meta_json FROM documents WHERE doc_id IN ({','.join('?' * len(part))})",
+                part,
+            ).fetchall()
+        conn.close()
+        with _meta_lock:
+            for doc_id, title, source, meta_json in rows:
+                meta = json.loads(meta_json or "{}")
+                entry = {"title": title, "source": source, "meta": {k: meta[k] for k in _META_KEYS if k in meta}}
+                out[doc_id] = entry
+                _meta_cache[doc_id] = entry
+            while len(_meta_cache) > max(0, settings.DOC_META_CACHE_SIZE):
+                _meta_cache.popitem(last=False)
+    return out
+
+
+def _ensure_column(cur, table: str, column: str, decl: str) -> None:
+    """Additive schema migration for databases created by older builds."""
+    cols = {r[1] for r in cur.execute(f"PRAGMA table_info({table})").fetchall()}
+    if column not in cols:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
 
 def init_db():
     import os
@@ -34,15 +110,299 @@ def init_db():
     );
     """)
     cur.execute("CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);")
+    # sha256 of the source file; lets re-uploads of the same bytes skip ingestion.
+    _ensure_column(cur, "documents", "content_hash", "TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents(content_hash);")
+    # Canonical path/URL a document was ingested from; re-ingestion updates in place.
+    _ensure_column(cur, "documents", "source_key", "TEXT")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_documents_source_key ON documents(source_key);")
+    # Extracted text lives here zlib-compressed; documents.raw_text is left empty.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS document_text(
+        doc_id TEXT PRIMARY KEY,
+        codec TEXT,
+        chars INTEGER,
+        data BLOB
+    );
+    """)
+    # Per-page character offsets of PDFs; read only for page lookups, never with metadata.
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS document_pages(
+        doc_id TEXT PRIMARY KEY,
+        spans_json TEXT
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ingest_jobs(
+        job_id TEXT PRIMARY KEY,
+        kind TEXT,
+        status TEXT,
+        stage TEXT,
+        payload_json TEXT,
+        progress_json TEXT,
+        warnings_json TEXT,
+        result_json TEXT,
+        error TEXT,
+        attempts INTEGER DEFAULT 0,
+        created_at REAL,
+        updated_at REAL
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON ingest_jobs(status, created_at);")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sync_files(
+        path TEXT PRIMARY KEY,
+        root TEXT,
+        mtime REAL,
+        size INTEGER,
+        content_hash TEXT,
+        doc_id TEXT,
+        status TEXT,
+        error TEXT,
+        synced_at REAL
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sync_root ON sync_files(root);")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS url_fetch_meta(
+        url TEXT PRIMARY KEY,
+        etag TEXT,
+        last_modified TEXT,
+        content_hash TEXT,
+        fetched_at REAL
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS blobs(
+        hash TEXT PRIMARY KEY,
+        path TEXT,
+        size INTEGER,
+        created_at REAL,
+        last_ref_at REAL
+    );
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS blob_refs(
+        hash TEXT,
+        doc_id TEXT,
+        PRIMARY KEY(hash, doc_id)
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_blob_refs_doc ON blob_refs(doc_id);")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS pdf_pages(
+        file_hash TEXT,
+        page_no INTEGER,
+        text TEXT,
+        cached_at REAL,
+        PRIMARY KEY(file_hash, page_no)
+    );
+    """)
+    _ensure_column(cur, "pdf_pages", "cached_at", "REAL")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS chat_sessions(
+        session_id TEXT PRIMARY KEY,
+        created_at REAL,
+        updated_at REAL,
+        expires_at REAL,
+        llm_model TEXT,
+        llm_context TEXT
+    );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_expiry ON chat_sessions(expires_at);")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS chat_turns(
+        session_id TEXT,
+        turn_no INTEGER,
+        question TEXT,
+        answer TEXT,
+        citations_json TEXT,
+        created_at REAL,
+        PRIMARY KEY(session_id, turn_no)
+    );
+    """)
     conn.commit()
+    moved = _migrate_raw_text(conn)
+    if moved:
+        log.info("compressed raw text of %d document(s); vacuuming", moved)
+    spans_moved = _migrate_page_spans(conn)
+    if spans_moved:
+        log.info("moved page offsets of %d document(s) out of meta_json", spans_moved)
+    if moved or spans_moved:
+        conn.execute("VACUUM")
+    conn.close()
+
+
+def _migrate_raw_text(conn, batch: int = 200) -> int:
+    """Move raw_text written by older builds into document_text (one-time)."""
+    moved = 0
+    while True:
+        rows = conn.execute("SELECT doc_id, raw_text FROM documents WHERE raw_text <> '' LIMIT ?", (batch,)).fetchall()
+        if not rows:
+            return moved
+        with conn:
+            conn.executemany(_TEXT_UPSERT_SQL, [_text_row(doc_id, text) for doc_id, text in rows])
+            conn.executemany("UPDATE documents SET raw_text='' WHERE doc_id=?", [(r[0],) for r in rows])
+        moved += len(rows)
+
+
+def _migrate_page_spans(conn, batch: int = 200) -> int:
+    """Move `page_spans` that older builds kept in meta_json into document_pages (one-time)."""
+    import json
+
+    moved = 0
+    while True:
+        rows = conn.execute(
+            "SELECT doc_id, meta_json FROM documents WHERE json_extract(meta_json, '$.page_spans') IS NOT NULL LIMIT ?",
+            (batch,),
+        ).fetchall()
+        if not rows:
+            return moved
+        metas = [(doc_id, json.loads(meta_json)) for doc_id, meta_json in rows]
+        with conn:
+            conn.executemany(_PAGES_UPSERT_SQL, [(doc_id, json.dumps(meta.pop("page_spans"))) for doc_id, meta in metas])
+            conn.executemany("UPDATE documents SET meta_json=? WHERE doc_id=?", [(json.dumps(m), d) for d, m in metas])
+        moved += len(rows)
+
+
+_TEXT_UPSERT_SQL = "INSERT OR REPLACE INTO document_text(doc_id, codec, chars, data) VALUES(?,?,?,?)"
+_PAGES_UPSERT_SQL = "INSERT OR REPLACE INTO document_pages(doc_id, spans_json) VALUES(?,?)"
+
+
+def _text_row(doc_id: str, text: str | None) -> tuple:
+    text = text or ""
+    return (doc_id, "zlib", len(text), zlib.compress(text.encode("utf-8"), settings.TEXT_COMPRESS_LEVEL))
+
+
+def get_document_text(doc_id: str) -> str | None:
+    """Decompress and return the full text of a document (None if unknown)."""
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
+    row = cur.execute("SELECT codec, data FROM document_text WHERE doc_id=?", (doc_id,)).fetchone()
+    if not row:
+        # Not migrated yet (written by another process running an older build).
+        row = cur.execute("SELECT 'plain', raw_text FROM documents WHERE doc_id=?", (doc_id,)).fetchone()
+    conn.close()
+    if not row:
+        return None
+    codec, data = row
+    if codec == "zlib":
+        return zlib.decompress(data).decode("utf-8")
+    return data or ""
+
+_DOC_UPSERT_SQL = (
+    "INSERT OR REPLACE INTO documents(doc_id, source, title, raw_text, meta_json, content_hash, source_key) "
+    "VALUES(?,?,?,?,?,?,?)"
+)
+
+
+def _doc_row(doc: Document) -> tuple:
+    import json
+    # page_spans stays on the in-memory Document (the chunker needs it) but goes to document_pages.
+    meta = {k: v for k, v in (doc.meta or {}).items() if k != "page_spans"}
+    return (doc.doc_id, doc.source, doc.title, "", json.dumps(meta), meta.get("content_hash"), meta.get("source_key"))
+
+
+def _save_page_spans(conn, docs: list[Document]) -> None:
+    import json
+    spans = {d.doc_id: (d.meta or {}).get("page_spans") for d in docs}
+    conn.executemany(_PAGES_UPSERT_SQL, [(k, json.dumps(v)) for k, v in spans.items() if v])
+    conn.executemany("DELETE FROM document_pages WHERE doc_id=?", [(k,) for k, v in spans.items() if not v])
+
+
+def get_page_spans(doc_id: str) -> list[list[int]]:
+    """[start_char, end_char, page_no] per non-empty PDF page; empty for other documents."""
+    import json
+    conn = sqlite3.connect(settings.DB_PATH)
+    row = conn.execute("SELECT spans_json FROM document_pages WHERE doc_id=?", (doc_id,)).fetchone()
     conn.close()
+    return json.loads(row[0]) if row and row[0] else []
+
 
 def save_document(doc: Document):
     conn = sqlite3.connect(settings.DB_PATH)
     cur = conn.cursor()
+    cur.execute(_DOC_UPSERT_SQL, _doc_row(doc))
+    cur.execute(_TEXT_UPSERT_SQL, _text_row(doc.doc_id, doc.raw_text))
+    _save_page_spans(conn, [doc])
+    conn.commit()
+    conn.close()
+    _documents_changed([doc.doc_id])
+
+
+def find_document_by_hash(content_hash: str) -> dict | None:
+    """Return {doc_id, title, source} of a document ingested from identical bytes."""
+    if not content_hash:
+        return None
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
     cur.execute(
-        "INSERT OR REPLACE INTO documents(doc_id, source, title, raw_text, meta_json) VALUES(?,?,?,?,?)",
-        (doc.doc_id, doc.source, doc.title, doc.raw_text, __import__("json").dumps(doc.meta)),
+        "SELECT doc_id, title, source FROM documents WHERE content_hash=? ORDER BY rowid DESC LIMIT 1",
+        (content_hash,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {"doc_id": row[0], "title": row[1], "source": row[2]}
+
+
+def find_document_by_source_key(source_key: str) -> dict | None:
+    """Return {doc_id, title, content_hash} of the latest document ingested from a path/URL."""
+    if not source_key:
+        return None
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT doc_id, title, content_hash FROM documents WHERE source_key=? ORDER BY rowid DESC LIMIT 1",
+        (source_key,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row:
+        return None
+    return {"doc_id": row[0], "title": row[1], "content_hash": row[2]}
+
+
+def list_chunk_ids(doc_id: str) -> set[str]:
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
+    cur.execute("SELECT chunk_id FROM chunks WHERE doc_id=?", (doc_id,))
+    ids = {r[0] for r in cur.fetchall()}
+    conn.close()
+    return ids
+
+
+def delete_chunks(chunk_ids: Iterable[str]) -> None:
+    """Delete chunks by id (SQLite only; callers handle the vector store)."""
+    from app.services import answer_cache_service
+
+    chunk_ids = list(chunk_ids)
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
+    cur.executemany("DELETE FROM chunks WHERE chunk_id=?", [(cid,) for cid in chunk_ids])
+    conn.commit()
+    conn.close()
+    answer_cache_service.invalidate(chunk_ids)
+
+
+def load_pdf_pages(file_hash: str) -> dict[int, str]:
+    """Cached page texts of a PDF, keyed by 0-based page number."""
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    cur = conn.cursor()
+    cur.execute("SELECT page_no, text FROM pdf_pages WHERE file_hash=?", (file_hash,))
+    pages = {r[0]: r[1] for r in cur.fetchall()}
+    conn.close()
+    return pages
+
+
+def save_pdf_pages(file_hash: str, pages: dict[int, str]) -> None:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    cur = conn.cursor()
+    now = time.time()
+    cur.executemany(
+        "INSERT OR REPLACE INTO pdf_pages(file_hash, page_no, text, cached_at) VALUES(?,?,?,?)",
+        [(file_hash, n, t, now) for n, t in pages.items()],
     )
     conn.commit()
     conn.close()
@@ -55,6 +415,7 @@ def update_document_title(doc_id: str, title: str) -> None:
     cur.execute("UPDATE documents SET title=? WHERE doc_id=?", (title, doc_id))
     conn.commit()
     conn.close()
+    _documents_changed([doc_id])
 
 def save_chunks(chunks: list[Chunk]):
     conn = sqlite3.connect(settings.DB_PATH)
@@ -70,27 +431,77 @@ def save_chunks(chunks: list[Chunk]):
     conn.commit()
     conn.close()
 
-def get_document(doc_id: str) -> Document | None:
+def save_documents_and_chunks(docs: list[Document], chunks: list[Chunk]) -> None:
+    """Write many documents and their chunks in a single transaction (bulk ingest)."""
+    import json
+    conn = sqlite3.connect(settings.DB_PATH)
+    try:
+        with conn:
+            conn.executemany(_DOC_UPSERT_SQL, [_doc_row(d) for d in docs])
+            conn.executemany(_TEXT_UPSERT_SQL, [_text_row(d.doc_id, d.raw_text) for d in docs])
+            _save_page_spans(conn, docs)
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks(chunk_id, doc_id, text, start_char, end_char, heading_json, meta_json) VALUES(?,?,?,?,?,?,?)",
+                [
+                    (c.chunk_id, c.doc_id, c.text, c.start_char, c.end_char, json.dumps(c.heading_path), json.dumps(c.meta))
+                    for c in chunks
+                ],
+            )
+    finally:
+        conn.close()
+    _documents_changed(d.doc_id for d in docs)
+
+def get_document(doc_id: str, with_text: bool = False) -> Document | None:
+    """Load document metadata; the (compressed) text only when `with_text` is set."""
     conn = sqlite3.connect(settings.DB_PATH)
     cur = conn.cursor()
-    cur.execute("SELECT doc_id, source, title, raw_text, meta_json FROM documents WHERE doc_id=?", (doc_id,))
+    cur.execute("SELECT doc_id, source, title, meta_json FROM documents WHERE doc_id=?", (doc_id,))
     row = cur.fetchone()
     conn.close()
     if not row:
         return None
     import json
-    doc = Document(doc_id=row[0], source=row[1], title=row[2], raw_text=row[3], meta=json.loads(row[4] or "{}"))
-    # Best-effort backfill: if title is a temp upload name, derive a better one from content/meta.
-    try:
-        if is_generic_title(doc.title):
-            bt = best_title(doc)
-            if bt and bt != doc.title:
-                doc.title = bt
-                update_document_title(doc.doc_id, bt)
-    except Exception:
-        pass
+    doc = Document(doc_id=row[0], source=row[1], title=row[2], meta=json.loads(row[3] or "{}"))
+    if with_text:
+        doc.raw_text = get_document_text(doc_id) or ""
     return doc
 
+
+def backfill_titles(batch: int = 200) -> int:
+    """Replace temp-upload titles (upload_<uuid>.ext) from older builds, once.
+
+    New documents get their title at ingest time (`best_title`); this only fixes rows
+    written before that. Runs as a background warm-up step, never on a read path.
+    """
+    import json
+
+    conn = sqlite3.connect(settings.DB_PATH)
+    cur = conn.cursor()
+    rows = cur.execute(
+        "SELECT doc_id, source, title, meta_json FROM documents WHERE title IS NULL OR title = '' OR title LIKE 'upload\\_%' ESCAPE '\\'"
+    ).fetchall()
+    conn.close()
+    updates = []
+    for doc_id, source, title, meta_json in rows:
+        if not is_generic_title(title):
+            continue
+        try:
+            doc = Document(doc_id=doc_id, source=source, title=title, meta=json.loads(meta_json or "{}"))
+            doc.raw_text = get_document_text(doc_id) or ""
+            bt = best_title(doc)
+        except Exception:
+            continue
+        if bt and bt != title:
+            updates.append((bt, doc_id))
+    conn = sqlite3.connect(settings.DB_PATH)
+    for i in range(0, len(updates), batch):
+        with conn:
+            conn.executemany("UPDATE documents SET title=? WHERE doc_id=?", updates[i : i + batch])
+    conn.close()
+    _documents_changed(doc_id for _, doc_id in updates)
+    return len(updates)
+
+
 def get_chunk(chunk_id: str) -> dict | None:
     conn = sqlite3.connect(settings.DB_PATH)
     cur = conn.cursor()
@@ -135,25 +546,39 @@ def list_chunks(where_sql: str = "", params: tuple = ()) -> list[dict]:
 
 
 def list_documents() -> list[Document]:
+    docs, _ = list_documents_page()
+    return [Document(doc_id=d["doc_id"], source=d["source"], title=d["title"], meta=d["meta"]) for d in docs]
+
+
+def list_documents_page(limit: int | None = None, cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """Newest-first page of document metadata (no text) and the cursor of the next page.
+
+    Keyset pagination on rowid: `cursor` is the rowid of the last row already seen, so
+    every page is an index range scan regardless of how deep the client pages.
+    """
+    import json
+
+    sql = "SELECT rowid, doc_id, source, title, meta_json FROM documents"
+    params: list = []
+    if cursor:
+        sql += " WHERE rowid < ?"
+        params.append(int(cursor))
+    sql += " ORDER BY rowid DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit + 1)
     conn = sqlite3.connect(settings.DB_PATH)
-    cur = conn.cursor()
-    cur.execute("SELECT doc_id, source, title, raw_text, meta_json FROM documents ORDER BY rowid DESC")
-    rows = cur.fetchall()
+    rows = conn.execute(sql, params).fetchall()
     conn.close()
-    import json
-    out: list[Document] = []
-    for r in rows:
-        doc = Document(doc_id=r[0], source=r[1], title=r[2], raw_text=r[3], meta=json.loads(r[4] or "{}"))
-        try:
-            if is_generic_title(doc.title):
-                bt = best_title(doc)
-                if bt and bt != doc.title:
-                    doc.title = bt
-                    update_document_title(doc.doc_id, bt)
-        except Exception:
-            pass
-        out.append(doc)
-    return out
+    next_cursor = None
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1][0])
+    out = []
+    for _, doc_id, source, title, meta_json in rows:
+        meta = json.loads(meta_json or "{}")
+        out.append({"doc_id": doc_id, "source": source, "title": title, "mode": None, "meta": meta})
+    return out, next_cursor
 
 
 def delete_document(doc_id: str) -> None:
@@ -168,9 +593,29 @@ def delete_document(doc_id: str) -> None:
     except Exception:
         pass
 
+    # The source file is kept until blob GC runs past the retention window.
+    from app.services.blob_service import drop_refs
+
+    drop_refs(doc_id)
+
     conn = sqlite3.connect(settings.DB_PATH)
     cur = conn.cursor()
+    chunk_ids = [r[0] for r in cur.execute("SELECT chunk_id FROM chunks WHERE doc_id=?", (doc_id,))]
     cur.execute("DELETE FROM chunks WHERE doc_id=?", (doc_id,))
+    row = cur.execute("SELECT content_hash FROM documents WHERE doc_id=?", (doc_id,)).fetchone()
     cur.execute("DELETE FROM documents WHERE doc_id=?", (doc_id,))
+    cur.execute("DELETE FROM document_text WHERE doc_id=?", (doc_id,))
+    cur.execute("DELETE FROM document_pages WHERE doc_id=?", (doc_id,))
+    # Drop cached PDF pages once no remaining document was built from that file.
+    if row and row[0]:
+        cur.execute(
+            "DELETE FROM pdf_pages WHERE file_hash=? AND NOT EXISTS (SELECT 1 FROM documents WHERE content_hash=?)",
+            (row[0], row[0]),
+        )
     conn.commit()
     conn.close()
+    _documents_changed([doc_id])
+    # A cached answer can cite one of these chunks as the duplicate of another document's.
+    from app.services import answer_cache_service
+
+    answer_cache_service.invalidate(chunk_ids)
@@ -0,0 +1,206 @@
+"""Keep the index in sync with watched folders (SYNC_DIRS).
+
+Why this exists:
+- The knowledge base lives in a shared folder; uploading every new or edited file by
+  hand does not scale and deletions were never propagated.
+
+Each scan walks the configured directories and compares every supported file with
+the `sync_files` table:
+- same mtime and size as last time => unchanged, no read at all,
+- otherwise the file is hashed; an identical hash (touch, copy, restore) only
+  refreshes the stored stat,
+- new or really changed files go through the normal parser + ingest pipeline with
+  `update=True`, so an edited file keeps its doc_id and only changed chunks are
+  re-embedded,
+- tracked files that vanished from disk are deleted from the index.
+
+State lives in SQLite, so the first scan after a restart is as cheap as any other.
+BM25 is rebuilt once per scan, not per file.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+def sync_dirs() -> list[str]:
+    return [d.strip() for d in (settings.SYNC_DIRS or "").split(",") if d.strip()]
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(settings.DB_PATH, timeout=30)
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
+
+
+def _load_state(root: str) -> dict[str, dict]:
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT path, mtime, size, content_hash, doc_id, status FROM sync_files WHERE root=?", (root,)
+    ).fetchall()
+    conn.close()
+    return {r[0]: {"mtime": r[1], "size": r[2], "content_hash": r[3], "doc_id": r[4], "status": r[5]} for r in rows}
+
+
+def _save_state(root: str, path: str, **fields) -> None:
+    conn = _connect()
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_files(path, root, mtime, size, content_hash, doc_id, status, error, synced_at) "
+        "VALUES(?,?,?,?,?,?,?,?,?)",
+        (
+            path,
+            root,
+            fields.get("mtime"),
+            fields.get("size"),
+            fields.get("content_hash"),
+            fields.get("doc_id"),
+            fields.get("status", "ok"),
+            fields.get("error"),
+            time.time(),
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _drop_state(path: str) -> None:
+    conn = _connect()
+    conn.execute("DELETE FROM sync_files WHERE path=?", (path,))
+    conn.commit()
+    conn.close()
+
+
+def _walk(root: Path) -> list[Path]:
+    from app.services.bulk_service import SUPPORTED_SUFFIXES
+
+    return sorted(
+        f
+        for f in root.rglob("*")
+        if f.is_file() and f.suffix.lower() in SUPPORTED_SUFFIXES and not any(p.startswith(".") for p in f.relative_to(root).parts)
+    )
+
+
+def _ingest(path: str, content_hash: str, mode: str) -> dict:
+    from app.services.ingest_service import ingest_path_auto, source_key_for_path
+    from app.services.pipeline_service import ingest_document
+
+    doc = ingest_path_auto(path, meta_extra={"content_hash": content_hash, "source_key": source_key_for_path(path)})
+    return ingest_document(doc, mode=mode, update=True, reindex=False)
+
+
+def sync_root(root: str, mode: str = "auto") -> dict:
+    """Apply additions, modifications and deletions under one directory."""
+    from app.services.ingest_service import file_sha256, source_key_for_path
+    from app.services.store_service import delete_document
+
+    base = Path(root)
+    if not base.is_dir():
+        raise FileNotFoundError(f"Sync directory not found: {root}")
+    root_key = source_key_for_path(root)
+    state = _load_state(root_key)
+    report: dict = {"root": root, "added": [], "modified": [], "deleted": [], "touched": 0, "unchanged": 0, "failed": []}
+
+    for f in _walk(base):
+        path = source_key_for_path(str(f))
+        prev = state.pop(path, None)
+        st = f.stat()
+        if prev and prev["status"] == "ok" and prev["mtime"] == st.st_mtime and prev["size"] == st.st_size:
+            report["unchanged"] += 1
+            continue
+        try:
+            h = file_sha256(path)
+            if prev and prev["status"] == "ok" and prev["content_hash"] == h:
+                _save_state(root_key, path, mtime=st.st_mtime, size=st.st_size, content_hash=h, doc_id=prev["doc_id"])
+                report["touched"] += 1
+                continue
+            res = _ingest(path, h, mode)
+            _save_state(root_key, path, mtime=st.st_mtime, size=st.st_size, content_hash=h, doc_id=res["doc_id"])
+            report["modified" if prev else "added"].append(path)
+        except Exception as e:
+            log.warning("sync: cannot ingest %s: %s", path, e)
+            # No stat recorded: the file is retried on the next scan.
+            _save_state(root_key, path, doc_id=(prev or {}).get("doc_id"), status="failed", error=str(e))
+            report["failed"].append({"path": path, "error": str(e)})
+
+    # Whatever is left in `state` was tracked before but is gone from disk.
+    for path, prev in state.items():
+        if prev["doc_id"]:
+            delete_document(prev["doc_id"])
+        _drop_state(path)
+        report["deleted"].append(path)
+    return report
+
+
+def sync_all(dirs: list[str] | None = None, mode: str | None = None) -> dict:
+    """Scan every directory once and rebuild BM25 if anything changed."""
+    from app.services.retrieve_service import rebuild_bm25
+
+    dirs = dirs if dirs is not None else sync_dirs()
+    mode = mode or settings.SYNC_MODE
+    t0 = time.perf_counter()
+    with _lock:  # background loop and manual triggers never overlap
+        roots, warnings = [], []
+        for d in dirs:
+            try:
+                roots.append(sync_root(d, mode=mode))
+            except Exception as e:
+                warnings.append(str(e))
+        changed = any(r["added"] or r["modified"] or r["deleted"] for r in roots)
+        if changed:
+            rebuild_bm25()
+    return {
+        "ok": not warnings and not any(r["failed"] for r in roots),
+        "roots": roots,
+        "changed": changed,
+        "seconds": round(time.perf_counter() - t0, 3),
+        "warnings": warnings,
+    }
+
+
+def status() -> dict:
+    conn = _connect()
+    rows = conn.execute("SELECT root, status, COUNT(*), MAX(synced_at) FROM sync_files GROUP BY root, status").fetchall()
+    failed = conn.execute("SELECT path, error FROM sync_files WHERE status='failed' ORDER BY path LIMIT 50").fetchall()
+    conn.close()
+    roots: dict[str, dict] = {}
+    for root, st, n, last in rows:
+        info = roots.setdefault(root, {"files": 0, "failed": 0, "last_synced_at": None})
+        info["files"] += n
+        if st == "failed":
+            info["failed"] += n
+        info["last_synced_at"] = max(info["last_synced_at"] or 0, last or 0) or None
+    return {
+        "dirs": sync_dirs(),
+        "interval_sec": settings.SYNC_INTERVAL_SEC,
+        "roots": roots,
+        "failed": [{"path": p, "error": e} for p, e in failed],
+    }
+
+
+async def _loop() -> None:
+    while True:
+        try:
+            res = await asyncio.to_thread(sync_all)
+            if res["changed"]:
+                log.info("sync: %s", {r["root"]: {k: len(r[k]) for k in ("added", "modified", "deleted")} for r in res["roots"]})
+        except Exception as e:
+            log.warning("sync failed: %s", e)
+        await asyncio.sleep(settings.SYNC_INTERVAL_SEC)
+
+
+def start() -> list[asyncio.Task]:
+    """Start the periodic scan when SYNC_DIRS and SYNC_INTERVAL_SEC are set."""
+    if not sync_dirs() or settings.SYNC_INTERVAL_SEC <= 0:
+        return []
+    return [asyncio.create_task(_loop())]
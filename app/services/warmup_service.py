@@ -0,0 +1,97 @@
+"""Background warm-up and readiness tracking.
+
+Why this exists:
+- Building the BM25 index, checking the Qdrant collection and loading Ollama models
+  used to happen inside `create_app()`, so uvicorn couldn't accept a connection until
+  all of it finished (minutes on a cold Ollama).
+- Now the app starts listening right away and these steps run as background tasks.
+  `/health` keeps reporting dependency reachability; `/ready` reports whether this
+  instance has finished warming up and can serve search/chat with full quality.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from app.core.config import settings
+
+log = logging.getLogger(__name__)
+
+# Components that must be warm before /ready returns 200. The rest are best-effort:
+# search degrades to BM25-only without vectors, and a cold model is merely slow.
+REQUIRED = ("db", "bm25")
+
+_state: dict[str, dict] = {}
+
+
+def _set(name: str, status: str, **extra) -> None:
+    _state[name] = {"status": status, "at": time.time(), **extra}
+
+
+def mark_ok(name: str, **extra) -> None:
+    _set(name, "ok", **extra)
+
+
+def readiness() -> dict:
+    components = {k: dict(v) for k, v in _state.items()}
+    ready = all(components.get(k, {}).get("status") == "ok" for k in REQUIRED)
+    return {"ready": ready, "components": components}
+
+
+async def _step(name: str, fn, *, is_async: bool = False) -> None:
+    _set(name, "pending")
+    t0 = time.perf_counter()
+    try:
+        if is_async:
+            await fn()
+        else:
+            await asyncio.to_thread(fn)
+        _set(name, "ok", seconds=round(time.perf_counter() - t0, 3))
+    except Exception as e:
+        log.warning("warm-up step %s failed: %s", name, e)
+        _set(name, "error", error=str(e), seconds=round(time.perf_counter() - t0, 3))
+
+
+def _ensure_collection() -> None:
+    from app.services.retrieve_service import get_vector
+
+    get_vector().ensure_collection(dim=settings.EMBED_DIM)
+
+
+def _rebuild_bm25() -> None:
+    from app.services.retrieve_service import rebuild_bm25
+
+    rebuild_bm25()
+
+
+def _backfill_titles() -> None:
+    from app.services.store_service import backfill_titles
+
+    backfill_titles()
+
+
+def _preload_embed() -> None:
+    from app.services.embed_service import preload_embed_model
+
+    preload_embed_model()
+
+
+async def _preload_llm() -> None:
+    from app.services.llm_factory import get_llm
+
+    await get_llm().preload()
+
+
+async def warmup() -> None:
+    """Run all warm-up steps concurrently. Never raises; failures land in readiness()."""
+    steps = [
+        _step("bm25", _rebuild_bm25),
+        _step("vector", _ensure_collection),
+        _step("titles", _backfill_titles),
+    ]
+    if settings.WARMUP_PRELOAD_MODELS:
+        steps.append(_step("embed_model", _preload_embed))
+        steps.append(_step("llm_model", _preload_llm, is_async=True))
+    await asyncio.gather(*steps)
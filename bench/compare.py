@@ -0,0 +1,61 @@
+"""Compare two bench.run result files.
+
+  python -m bench.compare base.json head.json [--threshold 10]
+
+Prints every numeric metric with its relative change. Exit code 1 when any latency
+metric (`*_ms`) regressed by more than --threshold percent, or any throughput
+metric (`*_per_s`) dropped by more than that, so CI can gate on it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+
+
+def flatten(obj, prefix: str = "") -> dict[str, float]:
+    out: dict[str, float] = {}
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            out.update(flatten(v, f"{prefix}.{k}" if prefix else str(k)))
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        out[prefix] = float(obj)
+    return out
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple[list[tuple], bool]:
+    a = flatten(base.get("results", {}))
+    b = flatten(head.get("results", {}))
+    rows, regressed = [], False
+    for key in sorted(set(a) & set(b)):
+        old, new = a[key], b[key]
+        delta = ((new - old) / old * 100.0) if old else 0.0
+        bad = (key.endswith("_ms") and delta > threshold) or (key.endswith("_per_s") and delta < -threshold)
+        regressed = regressed or bad
+        rows.append((key, old, new, delta, bad))
+    return rows, regressed
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("base")
+    ap.add_argument("head")
+    ap.add_argument("--threshold", type=float, default=10.0, help="allowed regression in percent")
+    args = ap.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+
+    rows, regressed = compare(base, head, args.threshold)
+    print(f"base={base.get('meta', {}).get('git_rev')} head={head.get('meta', {}).get('git_rev')}")
+    width = max((len(r[0]) for r in rows), default=10)
+    for key, old, new, delta, bad in rows:
+        flag = "  <-- regression" if bad else ""
+        print(f"{key:<{width}}  {old:>12.3f}  {new:>12.3f}  {delta:+8.1f}%{flag}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
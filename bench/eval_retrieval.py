@@ -0,0 +1,234 @@
+"""Retrieval quality vs latency over a golden query set.
+
+Usage:
+  python -m bench.eval_retrieval
+  python -m bench.eval_retrieval --grid "TOPK_VECTOR=4,8;TOPK_BM25=3,6;TOPK_RERANK=3,6;RRF_K=20,60" \
+      --min-recall 0.9 --min-mrr 0.7 --out eval.json
+  python -m bench.eval_retrieval --embed live   # use the configured Ollama/OpenAI embeddings
+
+The corpus (default: data/test_samples) is ingested into a temp DATA_DIR with the
+in-memory vector store. Each golden entry lists the passages that answer it as
+(document file name, text snippet); a retrieved chunk is relevant when it comes from
+that document and contains the snippet.
+
+For every grid point we run all questions through `hybrid_search` + `rerank` and
+report recall@k, MRR and nDCG@k (k = TOPK_RERANK) next to p50/p99 latency. With
+--min-recall/--min-mrr the cheapest passing configuration (lowest p50, then fewest
+candidates) is printed as the recommendation.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import math
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from bench.stats import summarize_ms
+
+GRID_KEYS = ("TOPK_VECTOR", "TOPK_BM25", "TOPK_RERANK", "RRF_K")
+DEFAULT_GRID = "TOPK_VECTOR=4,8,16;TOPK_BM25=3,6,12;TOPK_RERANK=3,6;RRF_K=60"
+SUFFIXES = {".txt", ".md", ".pdf", ".docx"}
+
+
+def parse_grid(spec: str) -> list[dict[str, int]]:
+    axes: dict[str, list[int]] = {}
+    for part in (spec or "").split(";"):
+        if not part.strip():
+            continue
+        key, _, values = part.partition("=")
+        key = key.strip().upper()
+        if key not in GRID_KEYS:
+            raise ValueError(f"unsupported grid key {key!r} (expected one of {GRID_KEYS})")
+        axes[key] = [int(v) for v in values.split(",") if v.strip()]
+    keys = list(axes)
+    return [dict(zip(keys, combo)) for combo in itertools.product(*(axes[k] for k in keys))]
+
+
+def load_golden(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ingest_corpus(corpus_dir: str) -> dict[str, str]:
+    """Ingest every supported file; returns {file name: doc_id}."""
+    from app.services.ingest_service import ingest_docx_path, ingest_pdf_path, ingest_txt_path
+    from app.services.pipeline_service import ingest_document
+
+    doc_ids: dict[str, str] = {}
+    for p in sorted(Path(corpus_dir).iterdir()):
+        if p.suffix.lower() not in SUFFIXES:
+            continue
+        if p.suffix.lower() == ".pdf":
+            doc = ingest_pdf_path(str(p))
+        elif p.suffix.lower() == ".docx":
+            doc = ingest_docx_path(str(p))
+        else:
+            doc = ingest_txt_path(str(p))
+        res = ingest_document(doc, mode="auto")
+        for w in res.get("warnings") or []:
+            print(f"warning ({p.name}): {w}")
+        doc_ids[p.name] = res["doc_id"]
+    return doc_ids
+
+
+def relevance(hits: list[dict], targets: list[dict], doc_ids: dict[str, str]) -> tuple[list[int], int]:
+    """Return (per-hit target index or -1, number of targets)."""
+    out = []
+    for h in hits:
+        match = -1
+        for i, t in enumerate(targets):
+            if h.get("doc_id") == doc_ids.get(t["doc"]) and t["text"].lower() in (h.get("text") or "").lower():
+                match = i
+                break
+        out.append(match)
+    return out, len(targets)
+
+
+def score_query(matches: list[int], n_targets: int, k: int) -> dict[str, float]:
+    top = matches[:k]
+    found = {m for m in top if m >= 0}
+    recall = len(found) / n_targets if n_targets else 0.0
+    rr = 0.0
+    for rank, m in enumerate(top, 1):
+        if m >= 0:
+            rr = 1.0 / rank
+            break
+    # Binary gains; each target counts once (duplicates from overlapping chunks don't inflate).
+    seen: set[int] = set()
+    dcg = 0.0
+    for rank, m in enumerate(top, 1):
+        if m >= 0 and m not in seen:
+            seen.add(m)
+            dcg += 1.0 / math.log2(rank + 1)
+    idcg = sum(1.0 / math.log2(r + 1) for r in range(1, min(n_targets, k) + 1))
+    return {"recall": recall, "mrr": rr, "ndcg": dcg / idcg if idcg else 0.0}
+
+
+def clear_caches() -> None:
+    """Drop process-wide caches so every timed run pays the full retrieval cost."""
+    from app.services import answer_cache_service, embed_service, rerank_service
+
+    embed_service.clear_query_cache()
+    answer_cache_service.clear()
+    rerank_service.clear_cache()
+
+
+def evaluate(config: dict[str, int], golden: list[dict], doc_ids: dict[str, str], repeat: int) -> dict:
+    from app.core.config import settings
+    from app.services.rerank_service import rerank
+    from app.services.retrieve_service import hybrid_search
+
+    for key, value in config.items():
+        setattr(settings, key, value)
+    k = settings.TOPK_RERANK
+    clear_caches()
+
+    latencies: list[float] = []
+    totals = {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+    misses = []
+    for g in golden:
+        top: list[dict] = []
+        for _ in range(max(1, repeat)):
+            clear_caches()
+            t0 = time.perf_counter()
+            hits = hybrid_search(g["question"])
+            top = rerank(g["question"], hits, k)
+            latencies.append(time.perf_counter() - t0)
+        matches, n = relevance(top, g["relevant"], doc_ids)
+        s = score_query(matches, n, k)
+        for m in totals:
+            totals[m] += s[m]
+        if s["recall"] < 1.0:
+            misses.append(g.get("id") or g["question"])
+
+    n = max(1, len(golden))
+    lat = summarize_ms(latencies)
+    return {
+        "config": {key: getattr(settings, key) for key in GRID_KEYS},
+        "k": k,
+        "recall": round(totals["recall"] / n, 4),
+        "mrr": round(totals["mrr"] / n, 4),
+        "ndcg": round(totals["ndcg"] / n, 4),
+        "p50_ms": lat["p50_ms"],
+        "p99_ms": lat["p99_ms"],
+        "misses": misses,
+    }
+
+
+def pick_cheapest(rows: list[dict], min_recall: float, min_mrr: float) -> dict | None:
+    ok = [r for r in rows if r["recall"] >= min_recall and r["mrr"] >= min_mrr]
+    if not ok:
+        return None
+    return min(ok, key=lambda r: (r["p50_ms"], sum(r["config"][k] for k in ("TOPK_VECTOR", "TOPK_BM25", "TOPK_RERANK"))))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--corpus", default="data/test_samples")
+    ap.add_argument("--golden", default="data/eval/golden.jsonl")
+    ap.add_argument("--grid", default=DEFAULT_GRID)
+    ap.add_argument("--repeat", type=int, default=3, help="timed runs per question (latency only)")
+    ap.add_argument("--embed", choices=["fake", "live"], default="fake")
+    ap.add_argument("--dim", type=int, default=768, help="embedding dim for --embed fake")
+    ap.add_argument("--min-recall", type=float, default=0.0)
+    ap.add_argument("--min-mrr", type=float, default=0.0)
+    ap.add_argument("--out", default=None)
+    args = ap.parse_args(argv)
+
+    grid = parse_grid(args.grid)
+    golden = load_golden(args.golden)
+    corpus = os.path.abspath(args.corpus)
+
+    fake = None
+    with tempfile.TemporaryDirectory(prefix="eka-eval-") as tmp:
+        if args.embed == "fake":
+            from bench.fakes import FakeOllama
+            from bench.run import configure_env
+
+            fake = FakeOllama(dim=args.dim).start()
+            configure_env(tmp, fake.url, args.dim)
+        else:
+            os.environ.update({
+                "DATA_DIR": tmp,
+                "DB_PATH": os.path.join(tmp, "eka.sqlite3"),
+                "VECTOR_BACKEND": "memory",
+            })
+
+        from app.services.store_service import init_db
+
+        init_db()
+        doc_ids = ingest_corpus(corpus)
+        rows = [evaluate(cfg, golden, doc_ids, args.repeat) for cfg in grid]
+
+    if fake is not None:
+        fake.stop()
+
+    header = f"{'TOPK_VEC':>8} {'TOPK_BM25':>9} {'TOPK_RR':>7} {'RRF_K':>5} {'recall':>7} {'mrr':>6} {'ndcg':>6} {'p50ms':>8} {'p99ms':>8}"
+    print(header)
+    for r in rows:
+        c = r["config"]
+        print(
+            f"{c['TOPK_VECTOR']:>8} {c['TOPK_BM25']:>9} {c['TOPK_RERANK']:>7} {c['RRF_K']:>5} "
+            f"{r['recall']:>7.3f} {r['mrr']:>6.3f} {r['ndcg']:>6.3f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f}"
+        )
+
+    best = pick_cheapest(rows, args.min_recall, args.min_mrr)
+    if args.min_recall or args.min_mrr:
+        if best:
+            print(f"\ncheapest config meeting recall>={args.min_recall} mrr>={args.min_mrr}: {best['config']}")
+        else:
+            print(f"\nno config meets recall>={args.min_recall} mrr>={args.min_mrr}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": rows, "recommended": best}, f, indent=2)
+    return 0 if (best or not (args.min_recall or args.min_mrr)) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,154 @@
+"""Deterministic local stand-ins for external services.
+
+`FakeOllama` speaks the subset of the Ollama HTTP API EKA uses:
+  - POST /api/embed       {"model", "input": [..]}  -> {"embeddings": [[..], ..]}
+  - POST /api/embeddings  {"model", "prompt": ".."} -> {"embedding": [..]}
+  - POST /api/generate    stream=true|false          -> NDJSON / JSON
+  - GET  /api/tags
+
+Embeddings are hashed bag-of-words vectors: the same text always maps to the same
+vector and texts sharing words are close in cosine space, which keeps retrieval
+behaviour meaningful without a model. Generation emits a fixed answer word by word
+after a configurable time-to-first-token.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def fake_embedding(text: str, dim: int = 768) -> list[float]:
+    vec = [0.0] * dim
+    for tok in _WORD_RE.findall((text or "").lower()):
+        h = int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+        vec[h % dim] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class FakeOllama:
+    """Run a fake Ollama server on 127.0.0.1 in a background thread."""
+
+    def __init__(
+        self,
+        *,
+        dim: int = 768,
+        ttft_ms: float = 50.0,
+        token_ms: float = 2.0,
+        embed_ms: float = 0.0,
+        answer_words: int = 64,
+        port: int = 0,
+    ):
+        self.dim = dim
+        self.ttft = ttft_ms / 1000.0
+        self.token_delay = token_ms / 1000.0
+        self.embed_delay = embed_ms / 1000.0
+        self.answer = [f"word{i}" for i in range(answer_words)]
+        self.calls: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, path: str):
+        with self._lock:
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):  # keep benchmark output clean
+                pass
+
+            def _json(self, obj, status: int = 200):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> dict:
+                n = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(n) or b"{}") if n else {}
+
+            def do_GET(self):
+                fake._count(self.path)
+                if self.path == "/api/tags":
+                    return self._json({"models": [{"name": "fake"}]})
+                return self._json({"error": "not found"}, 404)
+
+            def do_POST(self):
+                fake._count(self.path)
+                req = self._body()
+                if self.path == "/api/embed":
+                    if fake.embed_delay:
+                        time.sleep(fake.embed_delay)
+                    inp = req.get("input")
+                    texts = inp if isinstance(inp, list) else [inp or ""]
+                    return self._json({"embeddings": [fake_embedding(t, fake.dim) for t in texts]})
+                if self.path == "/api/embeddings":
+                    return self._json({"embedding": fake_embedding(req.get("prompt") or "", fake.dim)})
+                if self.path == "/api/generate":
+                    return self._generate(req)
+                return self._json({"error": "not found"}, 404)
+
+            def _generate(self, req: dict):
+                if not req.get("prompt"):
+                    # Ollama preload request: load model, no output.
+                    return self._json({"response": "", "done": True})
+                time.sleep(fake.ttft)
+                if not req.get("stream", True):
+                    time.sleep(fake.token_delay * len(fake.answer))
+                    return self._json({"response": " ".join(fake.answer), "done": True, "context": [1, 2, 3]})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def chunk(obj):
+                    data = (json.dumps(obj) + "\n").encode("utf-8")
+                    self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+
+                for i, w in enumerate(fake.answer):
+                    if i:
+                        time.sleep(fake.token_delay)
+                    chunk({"response": (" " if i else "") + w, "done": False})
+                chunk({"response": "", "done": True, "context": [1, 2, 3]})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
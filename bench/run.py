@@ -0,0 +1,281 @@
+"""Reproducible EKA benchmark runner.
+
+Usage:
+  python -m bench.run --chunks 20000 --out bench_results.json
+  python -m bench.run --chunks 1000000 --dim 64 --scenarios bm25_rebuild,hybrid_search
+  python -m bench.compare base.json bench_results.json
+
+Every run gets a fresh temp DATA_DIR/SQLite, a fake Ollama server (bench.fakes) and
+the in-memory vector store (VECTOR_BACKEND=memory), so numbers only depend on EKA's
+own code and the machine. Results are JSON with one entry per scenario.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench.corpus import Corpus
+from bench.fakes import FakeOllama, fake_embedding
+from bench.stats import summarize_ms
+
+SCENARIOS = ["ingest_document", "bm25_rebuild", "hybrid_search", "rerank", "chat_stream_ttft"]
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def configure_env(data_dir: str, ollama_url: str, dim: int, extra: dict[str, str] | None = None) -> None:
+    """Point EKA settings at the stand-ins. Must run before any `app.*` import."""
+    if "app.core.config" in sys.modules:
+        raise RuntimeError("configure_env() must be called before importing app modules")
+    env = {
+        "ENV": "bench",
+        "DATA_DIR": data_dir,
+        "DB_PATH": os.path.join(data_dir, "eka.sqlite3"),
+        "VECTOR_BACKEND": "memory",
+        "EMBED_BACKEND": "ollama",
+        "OLLAMA_BASE_URL": ollama_url,
+        "EMBED_DIM": str(dim),
+        "LLM_PROVIDER": "ollama",
+        "PROFILE_ENABLED": "false",
+        # Measure the real retrieval / generation cost, not cache hits on repeated queries.
+        "ANSWER_CACHE_ENABLED": "false",
+        "QUERY_EMBED_CACHE_SIZE": "0",
+    }
+    env.update(extra or {})
+    os.environ.update(env)
+
+
+def seed_corpus(corpus: Corpus, total_chunks: int, dim: int, chunks_per_doc: int) -> dict:
+    """Bulk-load chunks straight into SQLite + vector store (not timed as ingest)."""
+    from app.services.chunk_service import chunk_general
+    from app.services.retrieve_service import get_vector
+    from app.services.store_service import save_chunks, save_document
+
+    vec = get_vector()
+    vec.ensure_collection(dim=dim)
+    t0 = time.perf_counter()
+    n_docs = n_chunks = 0
+    for doc in corpus.iter_documents(total_chunks, chunks_per_doc=chunks_per_doc, start=1_000_000):
+        chunks = chunk_general(doc)
+        save_document(doc)
+        save_chunks(chunks)
+        vec.upsert(
+            ids=[c.chunk_id for c in chunks],
+            vectors=[fake_embedding(c.text, dim) for c in chunks],
+            payloads=[{"chunk_id": c.chunk_id, "doc_id": c.doc_id, **(c.meta or {})} for c in chunks],
+        )
+        n_docs += 1
+        n_chunks += len(chunks)
+    return {"docs": n_docs, "chunks": n_chunks, "seconds": round(time.perf_counter() - t0, 3)}
+
+
+def bench_ingest(corpus: Corpus, docs: int, chunks_per_doc: int) -> dict:
+    from app.services.pipeline_service import ingest_document
+
+    times: list[float] = []
+    chunks = 0
+    for doc in corpus.iter_documents(docs * chunks_per_doc, chunks_per_doc=chunks_per_doc):
+        t0 = time.perf_counter()
+        res = ingest_document(doc, mode="general")
+        times.append(time.perf_counter() - t0)
+        chunks += res.get("chunks", 0)
+    total = sum(times) or 1e-9
+    return {
+        "docs": len(times),
+        "chunks": chunks,
+        "docs_per_s": round(len(times) / total, 3),
+        "chunks_per_s": round(chunks / total, 3),
+        "per_doc": summarize_ms(times),
+    }
+
+
+def bench_bm25(repeat: int) -> dict:
+    from app.services.retrieve_service import rebuild_bm25
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rebuild_bm25()
+        times.append(time.perf_counter() - t0)
+    return summarize_ms(times)
+
+
+def bench_search(queries: list[str]) -> dict:
+    from app.services.retrieve_service import hybrid_search
+
+    hybrid_search(queries[0])  # warm caches / connections
+    times, hits = [], 0
+    for q in queries:
+        t0 = time.perf_counter()
+        hits += len(hybrid_search(q))
+        times.append(time.perf_counter() - t0)
+    out = summarize_ms(times)
+    out["avg_hits"] = round(hits / max(1, len(queries)), 2)
+    return out
+
+
+def bench_rerank(queries: list[str], top_k: int) -> dict:
+    from app.core.config import settings
+    from app.services.rerank_service import clear_cache, rerank
+    from app.services.retrieve_service import hybrid_search
+
+    pairs = [(q, hybrid_search(q)) for q in queries]
+    times = []
+    for q, hits in pairs:
+        clear_cache()  # time the cross-encoder, not the score cache
+        t0 = time.perf_counter()
+        rerank(q, hits, top_k)
+        times.append(time.perf_counter() - t0)
+    out = summarize_ms(times)
+    out["backend"] = settings.RERANK_BACKEND
+    return out
+
+
+class _Server:
+    """Run the real FastAPI app under uvicorn on a free local port."""
+
+    def __init__(self):
+        import uvicorn
+
+        from app.main import create_app
+
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.port = self.sock.getsockname()[1]
+        app = create_app()
+        # create_app() enables DEBUG logging for non-prod ENVs; that would swamp the timings.
+        logging.getLogger().setLevel(logging.WARNING)
+        self.server = uvicorn.Server(uvicorn.Config(app, log_level="warning", lifespan="on"))
+        self.thread = threading.Thread(target=self.server.run, kwargs={"sockets": [self.sock]}, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def _ttft_once(client, url: str, question: str) -> tuple[float, float]:
+    t0 = time.perf_counter()
+    first = None
+    async with client.stream("POST", url, json={"question": question}) as r:
+        r.raise_for_status()
+        async for line in r.aiter_lines():
+            if first is None and line.startswith("event: token"):
+                first = time.perf_counter() - t0
+    return (first if first is not None else float("nan")), time.perf_counter() - t0
+
+
+def bench_chat_stream(queries: list[str], concurrency: int) -> dict:
+    import httpx
+
+    async def run(base: str):
+        url = f"{base}/chat/stream"
+        async with httpx.AsyncClient(timeout=120) as client:
+            await _ttft_once(client, url, queries[0])
+            ttft, total = [], []
+            for i in range(0, len(queries), concurrency):
+                batch = queries[i : i + concurrency]
+                for a, b in await asyncio.gather(*[_ttft_once(client, url, q) for q in batch]):
+                    ttft.append(a)
+                    total.append(b)
+            return ttft, total
+
+    with _Server() as srv:
+        ttft, total = asyncio.run(run(f"http://127.0.0.1:{srv.port}"))
+    return {"concurrency": concurrency, "ttft": summarize_ms(ttft), "total": summarize_ms(total)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=5000, help="corpus size (chunks) for search/BM25 scenarios")
+    ap.add_argument("--chunks-per-doc", type=int, default=50)
+    ap.add_argument("--ingest-docs", type=int, default=20, help="documents pushed through ingest_document")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--stream-queries", type=int, default=20)
+    ap.add_argument("--stream-concurrency", type=int, default=1)
+    ap.add_argument("--bm25-repeat", type=int, default=3)
+    ap.add_argument("--dim", type=int, default=768)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--ttft-ms", type=float, default=50.0, help="fake LLM time-to-first-token")
+    ap.add_argument("--token-ms", type=float, default=2.0, help="fake LLM delay between tokens")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--out", default=None, help="write JSON results here (default: stdout)")
+    args = ap.parse_args(argv)
+
+    wanted = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(wanted) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {sorted(unknown)}")
+
+    fake = FakeOllama(dim=args.dim, ttft_ms=args.ttft_ms, token_ms=args.token_ms).start()
+    with tempfile.TemporaryDirectory(prefix="eka-bench-") as tmp:
+        configure_env(tmp, fake.url, args.dim)
+        from app.services.store_service import init_db
+
+        init_db()
+        corpus = Corpus(seed=args.seed)
+        queries = corpus.queries(args.queries)
+        results: dict[str, dict] = {}
+
+        if "ingest_document" in wanted:
+            results["ingest_document"] = bench_ingest(corpus, args.ingest_docs, args.chunks_per_doc)
+        seed = seed_corpus(corpus, args.chunks, args.dim, args.chunks_per_doc)
+        from app.services.retrieve_service import rebuild_bm25
+
+        rebuild_bm25()
+        if "bm25_rebuild" in wanted:
+            results["bm25_rebuild"] = bench_bm25(args.bm25_repeat)
+        if "hybrid_search" in wanted:
+            results["hybrid_search"] = bench_search(queries)
+        if "rerank" in wanted:
+            from app.core.config import settings
+
+            results["rerank"] = bench_rerank(queries[: max(1, args.queries // 4)], settings.TOPK_RERANK)
+        if "chat_stream_ttft" in wanted:
+            results["chat_stream_ttft"] = bench_chat_stream(queries[: args.stream_queries], args.stream_concurrency)
+
+    fake.stop()
+    report = {
+        "meta": {
+            "git_rev": _git_rev(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "params": vars(args),
+            "seeded": seed,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import math
+import statistics
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile (p in 0..100). Empty input => 0.0."""
+    if not values:
+        return 0.0
+    s = sorted(values)
+    k = max(0, min(len(s) - 1, math.ceil(p * len(s) / 100.0) - 1))
+    return s[k]
+
+
+def summarize_ms(seconds: list[float]) -> dict:
+    ms = [x * 1000.0 for x in seconds]
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
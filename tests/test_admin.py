@@ -0,0 +1,32 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes_admin import router
+from app.core.config import settings
+from app.services.store_service import init_db
+
+
+def _client(tmp_path, monkeypatch) -> TestClient:
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def test_gc_is_refused_without_an_admin_token(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    assert client.post("/admin/gc").status_code == 403
+    assert client.post("/admin/gc", params={"dry_run": True}).status_code == 403
+    assert client.get("/admin/blobs").status_code == 200  # read-only stays open
+
+
+def test_gc_requires_the_configured_token(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/gc").status_code == 403
+    assert client.get("/admin/blobs").status_code == 403
+    r = client.post("/admin/gc", params={"dry_run": True}, headers={settings.ADMIN_TOKEN_HEADER: "s3cret"})
+    assert r.status_code == 200 and r.json()["dry_run"] is True
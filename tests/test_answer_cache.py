@@ -0,0 +1,56 @@
+from app.core.config import settings
+from app.services import answer_cache_service as cache
+
+
+def _cite(cid, doc="d1"):
+    return {"chunk_id": cid, "doc_id": doc, "title": "Policy"}
+
+
+def test_paraphrase_hit_requires_same_evidence(monkeypatch):
+    cache.clear()
+    key = cache.evidence_key([{"chunk_id": "c2"}, {"chunk_id": "c1"}], "ollama:m")
+    cache.store([1.0, 0.0, 0.1], key, "How many leave days?", "Twenty.", [_cite("c1"), _cite("c2")])
+
+    hit = cache.lookup([1.0, 0.02, 0.1], cache.evidence_key([{"chunk_id": "c1"}, {"chunk_id": "c2"}], "ollama:m"))
+    assert hit and hit["answer"] == "Twenty."
+    # Different evidence set, different model, or a dissimilar question => miss.
+    assert cache.lookup([1.0, 0.0, 0.1], cache.evidence_key([{"chunk_id": "c1"}], "ollama:m")) is None
+    assert cache.lookup([1.0, 0.0, 0.1], cache.evidence_key([{"chunk_id": "c1"}, {"chunk_id": "c2"}], "openai:m")) is None
+    assert cache.lookup([0.0, 1.0, 0.0], key) is None
+
+    monkeypatch.setattr(settings, "ANSWER_CACHE_TTL_SEC", -1)
+    assert cache.lookup([1.0, 0.0, 0.1], key) is None
+
+
+def test_invalidate_by_chunk_or_doc():
+    cache.clear()
+    key = cache.evidence_key([{"chunk_id": "c1"}], "m")
+    cache.store([1.0, 0.0], key, "q", "a", [_cite("c1", "d1")])
+    assert cache.invalidate(["other"]) == 0
+    assert cache.invalidate(["d1"]) == 1
+    assert cache.lookup([1.0, 0.0], key) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_deleting_the_document_of_a_dropped_duplicate_invalidates(tmp_path, monkeypatch):
+    from app.core.models import Chunk, Document
+    from app.services import retrieve_service, store_service
+    from app.services.citation_service import pack_context
+
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "memory")
+    monkeypatch.setattr(retrieve_service, "_vector", None)
+    store_service.init_db()
+    for doc_id in ("d1", "d2"):
+        store_service.save_document(Document(doc_id=doc_id, source="txt", title=doc_id, raw_text="Same clause.", meta={}))
+        store_service.save_chunks([Chunk(chunk_id=f"{doc_id}c", doc_id=doc_id, text="Same clause.", start_char=0, end_char=12)])
+
+    cache.clear()
+    hits = [{"chunk_id": f"{d}c", "doc_id": d, "text": "Same clause.", "start_char": 0, "end_char": 12} for d in ("d1", "d2")]
+    (block,) = pack_context(hits, budget_tokens=0)
+    key = cache.evidence_key(hits, "m")
+    cache.store([1.0, 0.0], key, "q", "a", [{**_cite(block["chunk_id"]), "chunk_ids": block["chunk_ids"]}])
+
+    store_service.delete_document("d2")  # only the duplicate's document goes away
+    assert cache.lookup([1.0, 0.0], key) is None
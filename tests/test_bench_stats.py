@@ -0,0 +1,16 @@
+from bench.stats import percentile, summarize_ms
+
+
+def test_percentile_is_nearest_rank():
+    assert percentile(list(range(1, 101)), 99) == 99
+    assert percentile(list(range(1, 101)), 100) == 100
+    assert percentile(list(range(1, 11)), 50) == 5
+    assert percentile([1, 2], 50) == 1
+    assert percentile(list(range(1, 101)), 7) == 7  # 7 / 100 * 100 is 7.000000000000001
+    assert percentile([3, 1, 2], 0) == 1
+    assert percentile([], 50) == 0.0
+
+
+def test_summarize_ms():
+    out = summarize_ms([0.001 * i for i in range(1, 101)])
+    assert out["n"] == 100 and out["p50_ms"] == 50.0 and out["p99_ms"] == 99.0 and out["max_ms"] == 100.0
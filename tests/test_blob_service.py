@@ -0,0 +1,27 @@
+import os
+
+from app.core.config import settings
+from app.services import blob_service
+from app.services.store_service import init_db
+
+
+def test_identical_files_stored_once_and_collected_when_unreferenced(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    a, b = tmp_path / "upload_a.txt", tmp_path / "upload_b.txt"
+    a.write_bytes(b"same bytes")
+    b.write_bytes(b"same bytes")
+
+    h1, p1 = blob_service.put_file(str(a))
+    h2, p2 = blob_service.put_file(str(b))
+    assert (h1, p1) == (h2, p2)
+    assert not a.exists() and not b.exists() and os.path.exists(p1)
+
+    blob_service.set_doc_blob("doc-1", h1)
+    assert blob_service.gc(retention_sec=0)["removed"] == 0
+
+    blob_service.drop_refs("doc-1")
+    assert blob_service.gc(retention_sec=3600)["removed"] == 0  # still within retention
+    assert blob_service.gc(retention_sec=0)["removed"] == 1
+    assert not os.path.exists(p1)
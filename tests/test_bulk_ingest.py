@@ -0,0 +1,59 @@
+import zipfile
+from pathlib import Path
+
+from app.core.config import settings
+from app.services import bulk_service, embed_service, pipeline_service, retrieve_service, store_service
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "memory")
+    monkeypatch.setattr(retrieve_service, "_vector", None)
+    monkeypatch.setattr(embed_service, "embed_texts", lambda texts: [[float(len(t)), 1.0] for t in texts])
+    store_service.init_db()
+
+
+def _doc_count() -> int:
+    return len(store_service.list_documents())
+
+
+def test_rerun_skips_unchanged_and_updates_edited_files(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    src = tmp_path / "dept"
+    src.mkdir()
+    for name, body in [("a.txt", "Leave policy. " * 50), ("b.md", "# Travel\nBook trains. " * 30), ("c.txt", "Expenses. " * 40)]:
+        (src / name).write_text(body)
+    (src / "copy.txt").write_text("Expenses. " * 40)  # same bytes as c.txt
+
+    first = bulk_service.bulk_ingest(str(src), workers=1)
+    assert first["ingested"] == 3 and len(first["duplicates"]) == 1
+    assert first["duplicates"][0]["path"] in {str(src / "c.txt"), str(src / "copy.txt")}
+    assert _doc_count() == 3
+
+    (src / "a.txt").write_text("Leave policy, revised. " * 50)
+
+    def no_rechunk(*a, **kw):
+        raise AssertionError("the worker's chunks should be reused")
+
+    monkeypatch.setattr(pipeline_service, "iter_document_chunks", no_rechunk)
+    second = bulk_service.bulk_ingest(str(src), workers=1)
+    assert second["ok"] and second["updated"] == 1 and len(second["unchanged"]) == 2
+    assert _doc_count() == 3
+    assert len(second["doc_ids"]) == 1 and second["doc_ids"][0] in first["doc_ids"]  # same doc_id
+    texts = [c["text"] for c in store_service.list_chunks("doc_id=?", (second["doc_ids"][0],))]
+    assert texts and all("revised" in t for t in texts)
+
+
+def test_zip_is_keyed_by_member_and_extraction_removed(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    archive = tmp_path / "docs.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("hr/leave.txt", "Leave policy. " * 50)
+        zf.writestr("hr/travel.txt", "Travel policy. " * 50)
+
+    assert bulk_service.bulk_ingest(str(archive), workers=1)["ingested"] == 2
+    again = bulk_service.bulk_ingest(str(archive), workers=1)
+    assert again["ingested"] == 0 and len(again["unchanged"]) == 2
+    assert _doc_count() == 2
+    assert not any((Path(settings.DATA_DIR) / "bulk").iterdir())
@@ -0,0 +1,55 @@
+from app.core.config import settings
+from app.services import session_service as ss
+from app.services.store_service import init_db
+
+
+def test_turns_context_and_expiry(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    sid = ss.create_session()
+    ss.add_turn(sid, "How much leave?", "Twenty days.", [{"ref": 1}], "ollama:m", [1, 2, 3])
+    ss.add_turn(sid, "And contractors?", "None.", [], "ollama:m", [1, 2, 3, 4])
+
+    s = ss.get_session(sid, turns=1)
+    assert s["turn_count"] == 2 and [t["question"] for t in s["turns"]] == ["And contractors?"]
+    assert ss.retrieval_query("Since when?", s["turns"]) == "And contractors?\nSince when?"
+    assert ss.reusable_context(s, "ollama:m") == [1, 2, 3, 4]
+    assert ss.reusable_context(s, "ollama:other") is None
+    monkeypatch.setattr(settings, "CHAT_KV_MAX_TOKENS", 3)
+    assert ss.reusable_context(s, "ollama:m") is None
+
+    monkeypatch.setattr(settings, "CHAT_SESSION_TTL_SEC", -1)
+    ss.add_turn(sid, "q", "a", [])
+    assert ss.get_session(sid) is None
+    assert ss.purge_expired() == 1
+
+
+def test_condensed_history_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_HISTORY_TURNS", 3)
+    turns = [{"question": f"question {i}", "answer": "word " * 500} for i in range(10)]
+    text = ss.condense_history(turns, max_chars=1000)
+    assert len(text) <= 1000
+    assert "question 9" in text and "question 6" not in text  # newest turns win
+
+
+def test_concurrent_turns_are_all_kept(tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    sid = ss.create_session()
+    start = threading.Barrier(8)
+
+    def finish(i):
+        start.wait()
+        ss.add_turn(sid, f"q{i}", f"a{i}", [])
+
+    threads = [threading.Thread(target=finish, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    s = ss.get_session(sid)
+    assert s["turn_count"] == 8
+    assert [t["turn"] for t in s["turns"]] == list(range(1, 9))
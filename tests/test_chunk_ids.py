@@ -0,0 +1,18 @@
+from app.core.models import Document
+from app.services.chunk_service import chunk_general
+
+
+def _ids(text: str) -> list[str]:
+    doc = Document(doc_id="doc-1", source="txt", raw_text=text)
+    return [c.chunk_id for c in chunk_general(doc, max_chars=40, overlap=0)]
+
+
+def test_chunk_ids_are_content_derived():
+    sections = ["# A\nalpha alpha alpha", "# B\nbeta beta beta", "# C\nalpha alpha alpha"]
+    before = _ids("\n".join(sections))
+    assert before == _ids("\n".join(sections))
+    assert len(set(before)) == len(before)  # repeated text still gets distinct ids
+
+    sections[1] = "# B\nbeta, revised"
+    after = _ids("\n".join(sections))
+    assert [a == b for a, b in zip(before, after)] == [True, False, True]
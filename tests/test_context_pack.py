@@ -0,0 +1,62 @@
+from app.core.models import Document
+from app.services.chunk_service import chunk_general
+from app.services.citation_service import build_context, pack_context
+
+
+def _as_hits(chunks):
+    return [
+        {"chunk_id": c.chunk_id, "doc_id": c.doc_id, "text": c.text, "start_char": c.start_char,
+         "end_char": c.end_char, "heading_path": c.heading_path, "meta": c.meta}
+        for c in chunks
+    ]
+
+
+def test_overlapping_chunks_merge_and_duplicates_drop():
+    body = " ".join(f"sentence{i}." for i in range(400))
+    doc = Document(doc_id="d1", source="txt", raw_text=body)
+    hits = _as_hits(chunk_general(doc, max_chars=300, overlap=60))
+    copy = {**hits[1], "chunk_id": "x", "doc_id": "d2"}  # the same passage in another document
+    far = hits[-1]
+
+    blocks = pack_context([hits[2], hits[1], copy, far, hits[3]], budget_tokens=0)
+    assert len(blocks) == 2
+    merged, last = blocks
+    # The dropped duplicate's id stays with the block that kept its text.
+    assert merged["chunk_ids"] == [hits[1]["chunk_id"], hits[2]["chunk_id"], hits[3]["chunk_id"], "x"]
+    # Overlap text appears once: the block is exactly the covered span of the document.
+    assert merged["text"] == body[body.index(hits[1]["text"]) : body.index(hits[3]["text"]) + len(hits[3]["text"])]
+    assert last["chunk_id"] == far["chunk_id"]
+
+
+def test_budget_and_numbering():
+    hits = [
+        {"chunk_id": f"c{i}", "doc_id": f"d{i}", "text": f"passage {i} " + "x" * 390, "start_char": 0, "end_char": 400}
+        for i in range(5)
+    ]
+    hits.append({**hits[0], "chunk_id": "dup", "doc_id": "d9"})
+    blocks = pack_context(hits, budget_tokens=300)  # ~1200 chars => three 400-char blocks
+    assert [b["chunk_id"] for b in blocks] == ["c0", "c1", "c2"]
+    ctx = build_context(blocks)
+    assert ctx.startswith("[1]\npassage 0") and "[3]\npassage 2" in ctx and "[4]" not in ctx
+
+    big = pack_context([{**hits[0], "text": "y" * 5000}], budget_tokens=100)
+    assert len(big[0]["text"]) == 400
+
+
+def test_overlap_on_whitespace_boundaries_is_emitted_once():
+    def hit(cid, text, start, end):
+        return {"chunk_id": cid, "doc_id": "d1", "text": text, "start_char": start, "end_char": end}
+
+    # The overlap "three four" is spaced differently in the two stripped chunk texts.
+    a = hit("a", "one two three\n four", 0, 21)
+    b = hit("b", "three  four\n\nfive six", 9, 32)
+    (block,) = pack_context([a, b], budget_tokens=0)
+    assert block["text"] == "one two three\n four\n\nfive six"
+    assert block["chunk_ids"] == ["a", "b"]
+
+    # Real chunker output where windows start and end on runs of whitespace.
+    body = "".join(f"w{i}" + ("  \n " if i % 3 else "\n\n") for i in range(300))
+    doc = Document(doc_id="d2", source="txt", raw_text=body)
+    hits = _as_hits(chunk_general(doc, max_chars=120, overlap=7))
+    (block,) = pack_context(hits, budget_tokens=0)
+    assert block["text"].split() == body.split()
@@ -0,0 +1,22 @@
+from app.core.config import settings
+from app.core.models import Document
+from app.services import store_service
+from app.services.citation_service import format_citations
+
+
+def test_citation_titles_cached_and_invalidated(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    store_service.init_db()
+    store_service.invalidate_doc_meta()
+    store_service.save_document(Document(doc_id="d1", source="txt", title="Leave policy", raw_text="x"))
+
+    cites = format_citations([{"chunk_id": "c1", "doc_id": "d1", "text": "x"}, {"chunk_id": "c2", "doc_id": "gone"}])
+    assert [(c["title"], c["source"]) for c in cites] == [("Leave policy", "txt"), (None, None)]
+    assert "d1" in store_service._meta_cache
+
+    store_service.update_document_title("d1", "Leave policy 2025")
+    assert format_citations([{"doc_id": "d1"}])[0]["title"] == "Leave policy 2025"
+
+    store_service.delete_document("d1")
+    assert format_citations([{"doc_id": "d1"}])[0]["title"] is None
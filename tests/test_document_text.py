@@ -0,0 +1,68 @@
+import json
+import sqlite3
+import zlib
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes_documents import router
+from app.core.config import settings
+from app.core.models import Document
+from app.services import store_service
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+
+
+def test_legacy_raw_text_is_moved_once(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    legacy = {f"d{i}": f"Legacy text {i}. " * 200 for i in range(5)}
+    conn = sqlite3.connect(settings.DB_PATH)
+    conn.execute("CREATE TABLE documents(doc_id TEXT PRIMARY KEY, source TEXT, title TEXT, raw_text TEXT, meta_json TEXT)")
+    conn.executemany(
+        "INSERT INTO documents VALUES(?,?,?,?,?)", [(k, "txt", k, v, json.dumps({})) for k, v in legacy.items()]
+    )
+    conn.commit()
+    conn.close()
+
+    moved = []
+    real = store_service._migrate_raw_text
+    monkeypatch.setattr(store_service, "_migrate_raw_text", lambda c: moved.append(real(c, batch=2)) or moved[-1])
+    store_service.init_db()
+    assert moved == [5]
+
+    conn = sqlite3.connect(settings.DB_PATH)
+    assert conn.execute("SELECT COUNT(*) FROM documents WHERE raw_text <> ''").fetchone()[0] == 0
+    rows = dict(conn.execute("SELECT doc_id, data FROM document_text WHERE codec='zlib'").fetchall())
+    conn.close()
+    assert {k: zlib.decompress(v).decode("utf-8") for k, v in rows.items()} == legacy
+    assert store_service.get_document_text("d3") == legacy["d3"]
+
+    store_service.init_db()
+    assert moved == [5, 0]  # nothing left to move, no second VACUUM
+    assert store_service.get_document_text("d3") == legacy["d3"]
+
+
+def test_document_text_ranges(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    store_service.init_db()
+    store_service.save_document(Document(doc_id="d1", source="txt", title="t", raw_text="abcdefghij", meta={}))
+    app = FastAPI()
+    app.include_router(router)
+    client = TestClient(app)
+
+    def get(**params):
+        r = client.get("/documents/d1", params=params)
+        assert r.status_code == 200
+        body = r.json()
+        return body["raw_text"], body["text_length"], body["offset"], body["next_offset"]
+
+    assert get() == ("abcdefghij", 10, 0, None)
+    assert get(offset=0, limit=4) == ("abcd", 10, 0, 4)
+    assert get(offset=4, limit=4) == ("efgh", 10, 4, 8)
+    assert get(offset=8, limit=4) == ("ij", 10, 8, None)
+    assert get(offset=25, limit=4) == ("", 10, 25, None)
+    assert "text_length" not in client.get("/documents/d1", params={"include_text": False}).json()
+    assert client.get("/documents/missing").status_code == 404
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.models import Document
+from app.main import create_app
+from app.services import store_service
+
+
+def _client(tmp_path, monkeypatch) -> TestClient:
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    store_service.init_db()
+    return TestClient(create_app())  # no lifespan: no warm-up or background tasks
+
+
+def _add(doc_id: str) -> None:
+    store_service.save_document(Document(doc_id=doc_id, source="txt", title=doc_id, raw_text="x", meta={}))
+
+
+def test_pages_cover_every_document_once_despite_inserts(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    for i in range(7):
+        _add(f"d{i}")
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/documents/", params=params)
+        assert r.status_code == 200
+        seen += [d["doc_id"] for d in r.json()]
+        pages += 1
+        if pages == 1:
+            _add("new")  # newer than the cursor: belongs to a fresh listing, not this one
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == [f"d{i}" for i in reversed(range(7))]
+    assert client.get("/documents/").json()[0]["doc_id"] == "new"  # unpaged: full list
+
+
+def test_malformed_cursor_is_rejected(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    assert client.get("/documents/", params={"limit": 2, "cursor": "not-a-rowid"}).status_code == 400
+
+
+def test_cursor_header_is_readable_cross_origin(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CORS_ORIGINS", "http://localhost:3000")
+    client = _client(tmp_path, monkeypatch)
+    for i in range(3):
+        _add(f"d{i}")
+    r = client.get("/documents/", params={"limit": 2}, headers={"Origin": "http://localhost:3000"})
+    assert r.headers["X-Next-Cursor"]
+    assert "x-next-cursor" in r.headers["access-control-expose-headers"].lower()
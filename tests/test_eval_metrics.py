@@ -0,0 +1,20 @@
+import math
+
+from bench.eval_retrieval import parse_grid, score_query
+
+
+def test_score_query_metrics():
+    # one target, found at rank 2 of k=3
+    s = score_query([-1, 0, -1], n_targets=1, k=3)
+    assert s["recall"] == 1.0
+    assert s["mrr"] == 0.5
+    assert math.isclose(s["ndcg"], 1.0 / math.log2(3))
+
+    # duplicate hits for the same target don't count twice
+    s = score_query([0, 0], n_targets=2, k=2)
+    assert s["recall"] == 0.5
+
+
+def test_parse_grid_product():
+    grid = parse_grid("TOPK_VECTOR=4,8;RRF_K=60")
+    assert grid == [{"TOPK_VECTOR": 4, "RRF_K": 60}, {"TOPK_VECTOR": 8, "RRF_K": 60}]
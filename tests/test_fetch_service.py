@@ -0,0 +1,59 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.core.config import settings
+from app.core.models import Document
+from app.services import fetch_service
+from app.services.store_service import init_db, save_document
+
+
+class _Page(BaseHTTPRequestHandler):
+    etag = '"v1"'
+    hits: list[int] = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.etag:
+            self.hits.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b"<html><title>Policy</title><body>Leave policy v1</body></html>"
+        self.hits.append(200)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_conditional_refetch_skips_unchanged_page(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Page)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/policy"
+
+    async def fetch():
+        async with httpx.AsyncClient() as client:
+            return await fetch_service.fetch_url(client, url, asyncio.Semaphore(1))
+
+    try:
+        first = asyncio.run(fetch())
+        assert first["status"] == "fetched" and first["suffix"] == ".html" and first["etag"] == '"v1"'
+
+        # Validators are only used once the document they describe exists.
+        fetch_service.save_fetch_meta(url, first["etag"], None, first["content_hash"])
+        assert asyncio.run(fetch())["status"] == "fetched"
+        save_document(Document(doc_id="d1", source="html", raw_text="Leave policy v1", meta={"source_key": url}))
+        assert asyncio.run(fetch())["status"] == "not_modified"
+        assert _Page.hits == [200, 200, 304]
+    finally:
+        server.shutdown()
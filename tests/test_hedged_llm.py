@@ -0,0 +1,86 @@
+import asyncio
+
+from app.adapters.llm import hedged
+from app.adapters.llm.base import LLM
+from app.adapters.llm.hedged import HedgedLLM
+from app.core.config import settings
+
+
+class FakeLLM(LLM):
+    def __init__(self, ttft, words, fail=False, context=None, keeps_context=False):
+        self.ttft, self.words, self.fail, self.context = ttft, words, fail, context
+        self.keeps_context = keeps_context
+        self.cancelled = False
+        self.prompts = []
+
+    async def generate(self, prompt, state=None):
+        raise NotImplementedError
+
+    async def stream_generate(self, prompt, state=None):
+        self.prompts.append(prompt)
+        try:
+            await asyncio.sleep(self.ttft)
+            if self.fail:
+                raise RuntimeError("backend down")
+            for w in self.words:
+                yield w
+                await asyncio.sleep(0.001)
+            if state is not None and self.context is not None:
+                state["context"] = self.context
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_hedge_wins_and_cancels_slow_backend(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_AFTER_MS", 20)
+    monkeypatch.setattr(hedged, "_stats", {})
+    slow, fast = FakeLLM(1.0, ["slow"], context=[9]), FakeLLM(0.0, ["a", "b"])
+    state = {"context": [1, 2]}
+    llm = HedgedLLM([("slow", slow), ("fast", fast)])
+
+    assert asyncio.run(llm.generate("q", state=state)) == "ab"
+    assert slow.cancelled
+    assert state["context"] is None  # the winner keeps no conversation state
+    stats = hedged.stats()
+    assert stats["fast"]["wins"] == 1 and stats["fast"]["hedged"] == 1
+    assert stats["slow"]["cancelled"] == 1 and stats["slow"]["ttft_ms_ewma"] >= 20
+    # The slow backend is now tried last.
+    assert [name for name, _ in llm._ordered()] == ["fast", "slow"]
+
+
+def test_falls_back_immediately_on_error(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_AFTER_MS", 0)  # no hedging, fallback only
+    monkeypatch.setattr(hedged, "_stats", {})
+    state = {"context": None}
+    llm = HedgedLLM([("down", FakeLLM(0.0, [], fail=True)), ("up", FakeLLM(0.0, ["ok"], context=[7]))])
+
+    assert asyncio.run(llm.generate("q", state=state)) == "ok"
+    assert state["context"] == [7]
+    assert hedged.stats()["down"]["errors"] == 1
+
+
+def test_stateless_winner_gets_the_full_prompt(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_AFTER_MS", 20)
+    monkeypatch.setattr(hedged, "_stats", {})
+    ollama = FakeLLM(1.0, ["slow"], context=[9], keeps_context=True)
+    stateless = FakeLLM(0.0, ["full"])
+    state = {"context": [1, 2], "full_prompt": "system + history + question"}
+    llm = HedgedLLM([("ollama", ollama), ("openai", stateless)])
+
+    assert asyncio.run(llm.generate("question only", state=state)) == "full"
+    assert ollama.prompts == ["question only"]
+    assert stateless.prompts == ["system + history + question"]
+    assert state["context"] is None  # the next turn is rebuilt with its history
+
+
+def test_follow_up_without_full_prompt_stays_on_stateful_backends(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_HEDGE_AFTER_MS", 20)
+    monkeypatch.setattr(hedged, "_stats", {})
+    ollama = FakeLLM(0.05, ["kept"], context=[9], keeps_context=True)
+    stateless = FakeLLM(0.0, ["bare"])
+    state = {"context": [1, 2]}
+    llm = HedgedLLM([("ollama", ollama), ("openai", stateless)])
+
+    assert asyncio.run(llm.generate("question only", state=state)) == "kept"
+    assert stateless.prompts == [] and state["context"] == [9]
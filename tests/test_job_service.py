@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.services import job_service
+from app.services.store_service import init_db
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+
+
+def test_interrupted_job_is_requeued_then_failed(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "INGEST_JOB_MAX_ATTEMPTS", 3)
+    job = job_service.submit_job("path", {"path": "/nowhere.txt"})
+    assert job["status"] == "queued" and job["attempts"] == 0
+
+    for attempt in range(1, 3):
+        claimed = job_service.claim_next_job()
+        assert claimed["job_id"] == job["job_id"] and claimed["attempts"] == attempt
+        assert job_service.claim_next_job() is None  # already running
+        # The process dies here: the row stays `running` until the next startup.
+        assert job_service.recover_jobs() == 1
+        stored = job_service.get_job(job["job_id"])
+        assert stored["status"] == "queued" and stored["attempts"] == attempt
+
+    job_service.claim_next_job()
+    assert job_service.recover_jobs() == 0
+    stored = job_service.get_job(job["job_id"])
+    assert stored["status"] == "failed" and stored["attempts"] == 3
+    assert stored["error"] == "Interrupted too many times"
+    assert job_service.claim_next_job() is None
+
+
+def test_concurrent_claims_take_each_job_once(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    ids = {job_service.submit_job("path", {"path": f"/f{i}.txt"})["job_id"] for i in range(20)}
+
+    def drain() -> list[str]:
+        out = []
+        while (job := job_service.claim_next_job()) is not None:
+            out.append(job["job_id"])
+        return out
+
+    with ThreadPoolExecutor(4) as pool:
+        claimed = [j for part in pool.map(lambda _: drain(), range(4)) for j in part]
+    assert sorted(claimed) == sorted(ids)
+    assert {j["status"] for j in job_service.list_jobs(limit=100)} == {"running"}
+
+
+def test_run_job_records_the_outcome(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+
+    def fake_execute(kind, payload, progress=None):
+        progress("parse", status="done")
+        if payload["path"] == "/bad.txt":
+            raise ValueError("cannot parse")
+        return {"doc_id": "d1", "warnings": ["empty page"]}
+
+    monkeypatch.setattr(job_service, "execute", fake_execute)
+    good = job_service.submit_job("path", {"path": "/good.txt"})
+    bad = job_service.submit_job("path", {"path": "/bad.txt"})
+    job_service._run_job(job_service.claim_next_job())
+    job_service._run_job(job_service.claim_next_job())
+
+    good, bad = job_service.get_job(good["job_id"]), job_service.get_job(bad["job_id"])
+    assert good["status"] == "done" and good["result"]["doc_id"] == "d1" and good["warnings"] == ["empty page"]
+    assert good["progress"]["parse"]["status"] == "done"
+    assert bad["status"] == "failed" and bad["error"] == "cannot parse"
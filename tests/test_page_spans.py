@@ -0,0 +1,79 @@
+from app.core.models import Document
+from app.services.pipeline_service import chunk_document
+
+
+def test_chunks_carry_page_range_instead_of_spans():
+    pages = ["a" * 500, "b" * 500, "c" * 500]
+    spans, pos = [], 0
+    for i, t in enumerate(pages):
+        spans.append([pos, pos + len(t), i + 1])
+        pos += len(t) + 2
+    doc = Document(doc_id="d", source="pdf", raw_text="\n\n".join(pages), meta={"page_spans": spans})
+
+    chunks = chunk_document(doc, "general")
+    assert [(c.meta["page_start"], c.meta["page_end"]) for c in chunks] == [(1, 3), (3, 3)]
+    assert "page_spans" not in chunks[0].meta
+    assert doc.meta["page_spans"] == spans
+
+
+def _setup(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.services import store_service
+
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "memory")
+    store_service.init_db()
+    return store_service
+
+
+def test_spans_are_stored_outside_metadata(tmp_path, monkeypatch):
+    import sqlite3
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.api.routes_documents import router
+    from app.core.config import settings
+
+    store = _setup(tmp_path, monkeypatch)
+    spans = [[0, 500, 1], [502, 1002, 2], [1004, 1504, 4]]
+    store.save_document(
+        Document(doc_id="d1", source="pdf", title="t", raw_text="x" * 1504, meta={"pages": 4, "page_spans": spans})
+    )
+    store.save_documents_and_chunks([Document(doc_id="d2", source="txt", title="u", raw_text="y", meta={})], [])
+
+    conn = sqlite3.connect(settings.DB_PATH)
+    assert "page_spans" not in conn.execute("SELECT meta_json FROM documents WHERE doc_id='d1'").fetchone()[0]
+    conn.close()
+    assert store.get_documents_meta(["d1"])["d1"]["meta"].get("page_spans") is None
+    assert store.get_page_spans("d1") == spans and store.get_page_spans("d2") == []
+
+    client = TestClient(FastAPI())
+    client.app.include_router(router)
+    body = client.get("/documents/d1", params={"offset": 400, "limit": 500}).json()
+    assert (body["page_start"], body["page_end"]) == (1, 2)
+    assert "page_start" not in client.get("/documents/d2").json()
+
+    store.delete_document("d1")
+    assert store.get_page_spans("d1") == []
+
+
+def test_legacy_spans_move_out_of_meta_json(tmp_path, monkeypatch):
+    import json
+    import sqlite3
+
+    from app.core.config import settings
+
+    store = _setup(tmp_path, monkeypatch)
+    conn = sqlite3.connect(settings.DB_PATH)
+    conn.execute(
+        "INSERT INTO documents(doc_id, source, title, raw_text, meta_json) VALUES(?,?,?,?,?)",
+        ("old", "pdf", "t", "", json.dumps({"pages": 2, "page_spans": [[0, 5, 1], [7, 9, 2]]})),
+    )
+    conn.commit()
+    conn.close()
+
+    store.init_db()
+    assert store.get_page_spans("old") == [[0, 5, 1], [7, 9, 2]]
+    assert store.get_document("old").meta == {"pages": 2}
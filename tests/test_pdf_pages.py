@@ -0,0 +1,114 @@
+import sqlite3
+
+import pypdf
+
+from app.core.config import settings
+from app.core.models import Document
+from app.services import blob_service, ingest_service, store_service
+
+
+def _make_pdf(path, pages):
+    objs = []
+
+    def add(b):
+        objs.append(b)
+        return len(objs)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = len(objs) + 1 + 2 * len(pages)
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        c = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, c, font)
+        ))
+    add(b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids) + b"] /Count %d >>" % len(kids))
+    cat = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+    out, offs = b"%PDF-1.4\n", []
+    for i, o in enumerate(objs, 1):
+        offs.append(len(out))
+        out += b"%d 0 obj\n" % i + o + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1) + b"".join(b"%010d 00000 n \n" % o for o in offs)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, cat, xref)
+    path.write_bytes(out)
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "PDF_PAGE_CACHE", True)
+    store_service.init_db()
+
+
+def _count_extractions(monkeypatch) -> list:
+    calls = []
+    real = pypdf.PageObject.extract_text
+
+    def counting(self, *a, **kw):
+        calls.append(1)
+        return real(self, *a, **kw)
+
+    monkeypatch.setattr(pypdf.PageObject, "extract_text", counting)
+    return calls
+
+
+def test_reingest_reads_cached_pages(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 1000)
+    pdf = tmp_path / "handbook.pdf"
+    _make_pdf(pdf, [f"Page {i} text" for i in range(3)])
+    calls = _count_extractions(monkeypatch)
+
+    first = ingest_service.ingest_pdf_path(str(pdf))
+    assert len(calls) == 3
+    second = ingest_service.ingest_pdf_path(str(pdf))
+    assert len(calls) == 3  # nothing extracted again
+    assert second.raw_text == first.raw_text and "Page 2 text" in second.raw_text
+    assert [s[2] for s in second.meta["page_spans"]] == [1, 2, 3]
+
+
+def test_large_pdf_uses_the_page_pool_for_missing_pages_only(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "PDF_PARALLEL_MIN_PAGES", 8)
+    monkeypatch.setattr(settings, "PDF_WORKERS", 2)
+    pdf = tmp_path / "big.pdf"
+    _make_pdf(pdf, [f"Section {i}" for i in range(24)])
+    content_hash = ingest_service.file_sha256(str(pdf))
+    store_service.save_pdf_pages(content_hash, {i: f"Section {i}" for i in range(4)})
+
+    pooled = []
+    real = ingest_service._extract_pages_parallel
+
+    def spy(path, page_nos, workers):
+        pooled.append((list(page_nos), workers))
+        return real(path, page_nos, workers)
+
+    monkeypatch.setattr(ingest_service, "_extract_pages_parallel", spy)
+    doc = ingest_service.ingest_pdf_path(str(pdf))
+    assert pooled == [(list(range(4, 24)), 2)]
+    assert all(f"Section {i}" in doc.raw_text for i in range(24))
+    assert len(store_service.load_pdf_pages(content_hash)) == 24
+
+
+def test_gc_drops_page_caches_of_failed_ingests(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    store_service.save_pdf_pages("orphan", {0: "x", 1: "y"})
+    store_service.save_pdf_pages("kept", {0: "z"})
+    store_service.save_document(
+        Document(doc_id="d1", source="pdf", title="t", raw_text="z", meta={"content_hash": "kept"})
+    )
+
+    assert blob_service.gc(retention_sec=0, dry_run=True)["pdf_page_caches"] == 1
+    assert len(store_service.load_pdf_pages("orphan")) == 2
+    assert blob_service.gc(retention_sec=0)["pdf_page_caches"] == 1
+    assert store_service.load_pdf_pages("orphan") == {}
+    assert store_service.load_pdf_pages("kept") == {0: "z"}
+    # Fresh caches (an ingest still in progress) are left alone.
+    store_service.save_pdf_pages("in-progress", {0: "w"})
+    assert blob_service.gc(retention_sec=3600)["pdf_page_caches"] == 0
+    conn = sqlite3.connect(settings.DB_PATH)
+    assert conn.execute("SELECT COUNT(*) FROM pdf_pages WHERE file_hash='in-progress'").fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.models import Document
+from app.services import pipeline_service, retrieve_service, store_service
+
+
+def test_run_ahead_is_bounded_and_surfaces_errors():
+    produced = []
+
+    def items():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    it = pipeline_service._run_ahead(items(), depth=2)
+    assert next(it) == 0
+    time.sleep(0.3)  # a free-running producer would have finished by now
+    # One item handed out, `depth` queued, and at most one more held by the blocked producer.
+    assert len(produced) <= 1 + 2 + 1
+    assert list(it) == list(range(1, 50))
+
+    def failing():
+        yield 1
+        yield 2
+        raise ValueError("parser broke")
+
+    got = []
+    with pytest.raises(ValueError, match="parser broke"):
+        for x in pipeline_service._run_ahead(failing(), depth=1):
+            got.append(x)
+    assert got == [1, 2]
+
+
+def test_run_ahead_stops_producer_when_consumer_leaves():
+    it = pipeline_service._run_ahead(iter(range(1000)), depth=1)
+    next(it)
+    it.close()
+    assert not any(t.name == "eka-ingest-stage" and t.is_alive() for t in threading.enumerate())
+
+
+def test_ingest_embeds_in_fixed_batches_and_keeps_bm25_on_embed_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "memory")
+    monkeypatch.setattr(settings, "PIPELINE_BATCH", 4)
+    monkeypatch.setattr(retrieve_service, "_vector", None)
+    store_service.init_db()
+    batches = []
+
+    def embed(texts):
+        batches.append(len(texts))
+        if len(batches) == 3:
+            raise RuntimeError("embedding model not pulled")
+        return [[float(len(t)), 1.0] for t in texts]
+
+    monkeypatch.setattr(pipeline_service, "embed_texts", embed)
+    body = " ".join(f"word{i}" for i in range(3000))
+    doc = Document(doc_id="d1", source="txt", raw_text=body)
+
+    out = pipeline_service.ingest_document(doc, mode="general")
+    assert out["chunks"] > 12
+    assert batches == [4, 4, 4]  # stops embedding after the failure, chunks still stored
+    assert out["embedded"] == 8
+    assert any("BM25 only" in w for w in out["warnings"])
+    assert len(store_service.list_chunk_ids("d1")) == out["chunks"]
+
+
+def test_chunking_does_not_copy_the_document():
+    import tracemalloc
+
+    from app.services.chunk_service import iter_chunks_general
+
+    text = "".join(f"# Section {i}\n" + "lorem ipsum dolor " * 400 for i in range(1000))  # ~7 MB
+    doc = Document(doc_id="big", source="txt", raw_text=text)
+    tracemalloc.start()
+    n = sum(1 for _ in iter_chunks_general(doc))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert n > 1000
+    assert peak < len(text) // 4
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.api.routes_profiles import router as profiles_router
+from app.core.config import settings
+from app.services import profile_service
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PROFILE_ENABLED", True)
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", None)
+
+
+def test_is_requested_with_and_without_token(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", None)
+    assert profile_service.is_requested({}, {"profile": "1"})
+    assert profile_service.is_requested({"X-EKA-Profile": "yes"}, {})
+    assert not profile_service.is_requested({}, {"profile": "0"})
+    assert not profile_service.is_requested({}, {})
+
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "s3cret")
+    assert not profile_service.is_requested({}, {"profile": "1"})
+    assert not profile_service.is_requested({"X-EKA-Profile-Token": "wrong"}, {"profile": "1"})
+    assert profile_service.is_requested({"X-EKA-Profile-Token": "s3cret"}, {"profile": "1"})
+    assert profile_service.is_requested({}, {"profile": "1", "profile_token": "s3cret"})
+
+
+def test_resolve_profile_rejects_traversal_and_unknown_names(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    d = profile_service.profiles_dir()
+    d.mkdir()
+    (d / "ok_1.collapsed").write_text("a;b 1\n")
+    (tmp_path / "secret.collapsed").write_text("x")
+
+    assert profile_service.resolve_profile("ok_1.collapsed") == d / "ok_1.collapsed"
+    for name in ["../secret.collapsed", "..%2Fsecret.collapsed", "/etc/passwd", "ok_1.txt", "missing.collapsed", ""]:
+        assert profile_service.resolve_profile(name) is None
+
+    client = TestClient(_app())
+    assert client.get("/profiles/ok_1.collapsed").text == "a;b 1\n"
+    assert client.get("/profiles/..%2Fsecret.collapsed").status_code == 404
+
+
+def test_prune_keeps_the_newest_files(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "PROFILE_MAX_FILES", 3)
+    d = profile_service.profiles_dir()
+    d.mkdir()
+    now = time.time()
+    for i in range(5):
+        p = d / f"p{i}.collapsed"
+        p.write_text("x 1\n")
+        os.utime(p, (now - 100 + i, now - 100 + i))
+
+    assert profile_service.prune_profiles() == 2
+    assert sorted(p["name"] for p in profile_service.list_profiles()) == ["p2.collapsed", "p3.collapsed", "p4.collapsed"]
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(profiles_router)
+
+    @app.get("/chat/stream")
+    async def stream():
+        async def body():
+            for i in range(3):
+                await asyncio.sleep(0.02)
+                yield f"data: {i}\n\n"
+
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    profile_service.install_profiling(app)
+    return app
+
+
+def test_middleware_profiles_a_streamed_response(tmp_path, monkeypatch):
+    _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "PROFILE_INTERVAL_MS", 1.0)
+    client = TestClient(_app())
+
+    assert "X-EKA-Profile-Id" not in client.get("/chat/stream").headers
+    r = client.get("/chat/stream?profile=1")
+    assert r.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+    name = r.headers["X-EKA-Profile-Id"]
+    assert name.endswith(".collapsed")
+    # Saved once the body was consumed, so it covers the streaming part too.
+    assert [p["name"] for p in client.get("/profiles").json()["profiles"]] == [name]
+    assert client.get(f"/profiles/{name}").text.strip()
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import create_app
+from app.services import warmup_service
+
+
+def test_ready_waits_for_required_steps_and_reports_failures(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "INGEST_WORKERS", 0)
+    monkeypatch.setattr(settings, "SYNC_DIRS", "")
+    monkeypatch.setattr(settings, "BLOB_GC_INTERVAL_SEC", 0)
+    monkeypatch.setattr(settings, "WARMUP_PRELOAD_MODELS", False)
+    # Nothing listens here: /health must answer (with ok=false) without warm-up.
+    monkeypatch.setattr(settings, "VECTOR_DB_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(settings, "OLLAMA_BASE_URL", "http://127.0.0.1:9")
+    monkeypatch.setattr(warmup_service, "_state", {})
+
+    release = threading.Event()
+
+    def slow_bm25():
+        release.wait(10)
+
+    def broken_vector():
+        raise RuntimeError("qdrant unreachable")
+
+    monkeypatch.setattr(warmup_service, "_rebuild_bm25", slow_bm25)
+    monkeypatch.setattr(warmup_service, "_ensure_collection", broken_vector)
+    monkeypatch.setattr(warmup_service, "_backfill_titles", lambda: None)
+
+    with TestClient(create_app()) as client:
+        r = client.get("/ready")
+        assert r.status_code == 503
+        body = r.json()
+        assert body["ready"] is False
+        assert body["components"]["db"]["status"] == "ok"
+        assert body["components"]["bm25"]["status"] == "pending"
+
+        health = client.get("/health")
+        assert health.status_code == 200 and health.json()["deps"] == {"qdrant": False, "ollama": False}
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while (r := client.get("/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert r.status_code == 200
+        components = r.json()["components"]
+        assert components["bm25"]["status"] == "ok"
+        # A best-effort step that failed is reported but does not block readiness.
+        assert components["vector"] == {**components["vector"], "status": "error", "error": "qdrant unreachable"}
+
+
+def test_readiness_needs_every_required_component(monkeypatch):
+    monkeypatch.setattr(warmup_service, "_state", {})
+    warmup_service.mark_ok("db")
+    assert warmup_service.readiness()["ready"] is False
+    warmup_service._set("bm25", "error", error="boom")
+    assert warmup_service.readiness()["ready"] is False
+    warmup_service.mark_ok("bm25")
+    assert warmup_service.readiness()["ready"] is True
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from app.core.config import settings
+from app.services import rerank_service
+
+
+class FakeCrossEncoder:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(pairs)
+        time.sleep(self.delay)
+        return [float(len(set(q.split()) & set(t.split()))) for q, t in pairs]
+
+
+def _setup(monkeypatch, model, **overrides):
+    monkeypatch.setattr(settings, "RERANK_BACKEND", "st")
+    for k, v in overrides.items():
+        monkeypatch.setattr(settings, k, v)
+    monkeypatch.setattr(rerank_service, "_get_st_reranker", lambda: model)
+    monkeypatch.setattr(rerank_service, "_batcher", rerank_service._Batcher())
+    monkeypatch.setattr(rerank_service, "_scores", type(rerank_service._scores)())
+    monkeypatch.setattr(rerank_service, "_stats", dict.fromkeys(rerank_service._stats, 0))
+
+
+def test_prefilter_truncation_and_score_cache(monkeypatch):
+    model = FakeCrossEncoder()
+    _setup(monkeypatch, model, RERANK_MAX_CANDIDATES=2, RERANK_MAX_CHARS=20)
+    cands = [
+        {"chunk_id": "a", "text": "unrelated words only"},
+        {"chunk_id": "b", "text": "annual leave"},
+        {"chunk_id": "c", "text": "annual leave days policy " + "x" * 100},
+    ]
+
+    top = rerank_service.rerank("annual leave days", [dict(c) for c in cands], top_k=1)
+    assert [c["chunk_id"] for c in top] == ["c"]
+    assert len(model.calls) == 1 and len(model.calls[0]) == 2  # "a" never reached the model
+    assert all(len(t) <= 20 for _, t in model.calls[0])
+
+    again = rerank_service.rerank("Annual  leave days", [dict(c) for c in cands], top_k=2)
+    assert [c["chunk_id"] for c in again] == ["c", "b"]
+    assert len(model.calls) == 1  # served from the score cache
+
+
+def test_concurrent_requests_share_a_batch(monkeypatch):
+    model = FakeCrossEncoder(delay=0.1)
+    _setup(monkeypatch, model, RERANK_MAX_CANDIDATES=0)
+    results = {}
+
+    def ask(q):
+        results[q] = rerank_service.rerank(q, [{"chunk_id": "a", "text": "alpha beta"}], top_k=1)
+
+    first = threading.Thread(target=ask, args=("alpha",))
+    first.start()
+    time.sleep(0.03)  # the model is busy with the first request
+    others = [threading.Thread(target=ask, args=(q,)) for q in ("beta", "gamma")]
+    for t in others:
+        t.start()
+    for t in [first, *others]:
+        t.join()
+
+    assert len(results) == 3
+    assert [len(c) for c in model.calls] == [1, 2]
+
+
+def test_counters_are_exact_under_concurrency(monkeypatch):
+    model = FakeCrossEncoder()
+    _setup(monkeypatch, model, RERANK_MAX_CANDIDATES=2)
+    cands = [{"chunk_id": c, "text": f"text {c}"} for c in "abc"]
+    n_threads, n_calls = 8, 50
+
+    def ask(t):
+        for i in range(n_calls):
+            rerank_service.rerank(f"q{t} {i % 5}", [dict(c) for c in cands], top_k=1)
+
+    threads = [threading.Thread(target=ask, args=(t,)) for t in range(n_threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    stats = rerank_service.stats()
+    requests = n_threads * n_calls
+    assert stats["prefiltered"] == requests
+    assert stats["cache_hits"] + stats["cache_misses"] == 2 * requests
+    assert stats["pairs"] == stats["cache_misses"] == sum(len(c) for c in model.calls)
+    assert stats["batches"] == len(model.calls)
@@ -0,0 +1,17 @@
+from app.services import retrieve_service
+
+
+def test_lexical_stage_is_reported_before_embedding(monkeypatch):
+    calls = []
+    monkeypatch.setattr(retrieve_service, "lexical_ranks", lambda q, k: calls.append("bm25") or ["a", "b"])
+    monkeypatch.setattr(retrieve_service, "vector_ranks", lambda q, k, f=None: calls.append("vector") or ["c", "a"])
+    monkeypatch.setattr(
+        retrieve_service, "hydrate", lambda ids, limit: [{"chunk_id": cid} for cid in dict.fromkeys(ids)][:limit]
+    )
+
+    def on_stage(stage, hits):
+        calls.append((stage, [h["chunk_id"] for h in hits]))
+
+    out = retrieve_service.hybrid_search("q", topk_vector=5, topk_bm25=5, on_stage=on_stage)
+    assert calls == ["bm25", ("lexical", ["a", "b"]), "vector", ("fused", ["a", "c", "b"])]
+    assert [h["chunk_id"] for h in out] == ["a", "c", "b"]
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services.scheduler_service import BATCH, INTERACTIVE, Overloaded, Scheduler
+
+
+def test_priority_queue_and_backpressure(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "LLM_QUEUE_MAX", 2)
+    sched = Scheduler()
+    order, positions = [], []
+
+    async def job(name, priority, hold=0.02, **kw):
+        async with sched.slot(priority, **kw):
+            order.append(name)
+            await asyncio.sleep(hold)
+
+    async def main():
+        first = asyncio.create_task(job("first", BATCH, hold=0.1))
+        await asyncio.sleep(0.01)
+        batch = asyncio.create_task(job("batch", BATCH, on_position=positions.append))
+        await asyncio.sleep(0.01)
+        chat = asyncio.create_task(job("interactive", INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert sched.stats()["queued"] == 2
+        with pytest.raises(Overloaded) as exc:
+            await job("rejected", INTERACTIVE)
+        assert exc.value.status == 429 and exc.value.retry_after >= 1
+        await asyncio.gather(first, batch, chat)
+
+    asyncio.run(main())
+    assert order == ["first", "interactive", "batch"]
+    assert positions == [1, 2, 1, 0]  # the interactive request jumped ahead
+    stats = sched.stats()
+    assert stats["active"] == 0 and stats["admitted"] == 3 and stats["rejected"] == 1
+
+
+def test_wait_timeout_gives_503(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(settings, "LLM_QUEUE_TIMEOUT_SEC", 0.05)
+    sched = Scheduler()
+
+    async def main():
+        async with sched.slot(BATCH):
+            with pytest.raises(Overloaded) as exc:
+                async with sched.slot(INTERACTIVE):
+                    pass
+        assert exc.value.status == 503
+        async with sched.slot(BATCH):  # the abandoned waiter does not hold a slot
+            pass
+
+    asyncio.run(main())
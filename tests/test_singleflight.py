@@ -0,0 +1,84 @@
+import asyncio
+
+from app.core.config import settings
+from app.services import singleflight_service as sf
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"answer": 42}
+
+    async def main():
+        results = await asyncio.gather(*(sf.run(("chat", sf.normalize(q)), work) for q in ["Reset VPN?", " reset  vpn? "] * 5))
+        again = await sf.run(("chat", "reset vpn?"), work)  # key released once finished
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert len(calls) == 2 and all(r is results[0] for r in results) and again == {"answer": 42}
+
+
+def test_stream_followers_replay_and_follow():
+    async def tokens():
+        for t in ["a", "b", "c", "d"]:
+            await asyncio.sleep(0.02)
+            yield t
+
+    async def read(b, start=0):
+        return "".join([e[1] async for e in b.subscribe(start=start, frame_sec=0) if e[0] == "token"])
+
+    async def main():
+        stored = []
+        leader, first = sf.stream(("s", "q"), lambda b: tokens(), on_complete=stored.append)
+        lead = asyncio.create_task(read(leader))
+        await asyncio.sleep(0.05)  # a few tokens already emitted
+        follower, second = sf.stream(("s", "q"), lambda b: tokens())
+        out = await asyncio.gather(lead, read(follower))
+        return first, second, follower is leader, out, stored, await read(sf.resumable(leader.id), start=2)
+
+    first, second, same, out, stored, resumed = asyncio.run(main())
+    assert first and not second and same
+    assert out == ["abcd", "abcd"] and stored == ["abcd"] and resumed == "cd"
+
+
+def test_stream_survives_disconnect_within_grace(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_GRACE_SEC", 5.0)
+
+    async def tokens():
+        for t in ["x"] * 10:
+            await asyncio.sleep(0.01)
+            yield t
+
+    async def main():
+        b, _ = sf.stream(("s", "grace"), lambda _b: tokens())
+        sub = b.subscribe(frame_sec=0)
+        event = await sub.__anext__()
+        await sub.aclose()  # client went away after the first frame
+        await asyncio.sleep(0.2)
+        frames = [e async for e in b.subscribe(start=event[2]) if e[0] == "token"]
+        return event, b.done, b.error, frames
+
+    event, done, error, frames = asyncio.run(main())
+    assert done and error is None
+    assert event[1] + "".join(f[1] for f in frames) == "x" * 10 and frames[-1][2] == 10
+
+
+def test_on_complete_gets_full_answer_beyond_replay_buffer(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_BUFFER_MAX_CHARS", 8)
+
+    async def tokens():
+        for i in range(20):
+            yield f"t{i:02d} "
+
+    async def main():
+        stored = []
+        b, _ = sf.stream(("s", "long"), lambda _b: tokens(), on_complete=stored.append)
+        await b._task
+        return b, stored
+
+    b, stored = asyncio.run(main())
+    assert stored == ["".join(f"t{i:02d} " for i in range(20))]
+    assert b.base > 0  # the replay buffer itself was trimmed
@@ -0,0 +1,58 @@
+import os
+
+from app.core.config import settings
+from app.services import embed_service, retrieve_service, store_service, sync_service
+
+
+def test_sync_tracks_add_edit_touch_delete(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path / "data"))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    monkeypatch.setattr(settings, "VECTOR_BACKEND", "memory")
+    monkeypatch.setattr(retrieve_service, "_vector", None)
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    monkeypatch.setattr(embed_service, "embed_texts", fake_embed)
+    store_service.init_db()
+    root = tmp_path / "share"
+    root.mkdir()
+    f = root / "leave.txt"
+    path = str(f.resolve())
+
+    def scan() -> dict:
+        res = sync_service.sync_all([str(root)])
+        assert res["ok"] and not res["warnings"]
+        return res
+
+    f.write_text("Leave policy: 25 days. " * 40)
+    res = scan()
+    report = res["roots"][0]
+    assert report["added"] == [path] and res["changed"]
+    docs = store_service.list_documents()
+    assert len(docs) == 1
+    doc_id = docs[0].doc_id
+
+    f.write_text("Leave policy: 30 days. " * 40)
+    os.utime(f, (f.stat().st_atime, f.stat().st_mtime + 10))
+    report = scan()["roots"][0]
+    assert report["modified"] == [path] and not report["added"]
+    docs = store_service.list_documents()
+    assert [d.doc_id for d in docs] == [doc_id]  # updated in place
+    assert "30 days" in store_service.get_document(doc_id, with_text=True).raw_text
+
+    embedded.clear()
+    os.utime(f, (f.stat().st_atime, f.stat().st_mtime + 10))  # same bytes, new mtime
+    res = scan()
+    report = res["roots"][0]
+    assert report["touched"] == 1 and not report["modified"] and not res["changed"]
+    assert embedded == []
+    assert scan()["roots"][0]["unchanged"] == 1  # stat refreshed by the touch
+
+    f.unlink()
+    res = scan()
+    assert res["roots"][0]["deleted"] == [path] and res["changed"]
+    assert store_service.list_documents() == []
+    assert sync_service.status()["roots"] == {}
@@ -0,0 +1,80 @@
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.routes_ingest import router
+from app.core.config import settings
+from app.services.store_service import init_db
+
+
+def _client(tmp_path, monkeypatch) -> TestClient:
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "DB_PATH", str(tmp_path / "eka.sqlite3"))
+    init_db()
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+def _leftovers(tmp_path) -> list[str]:
+    return [f for f in os.listdir(tmp_path) if f.startswith("upload_")]
+
+
+def test_upload_over_limit_is_rejected_without_leftovers(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_MB", 1)
+    big = b"x" * (2 * 1024 * 1024)
+
+    r = client.post("/ingest/upload", files={"file": ("big.txt", big, "text/plain")})
+    assert r.status_code == 413
+
+    # Without a usable Content-Length the limit still stops the stream part-way.
+    def body():
+        boundary = b"--b0undary"
+        yield boundary + b'\r\nContent-Disposition: form-data; name="file"; filename="big.txt"\r\n\r\n'
+        for _ in range(4):
+            yield b"x" * (512 * 1024)
+        yield b"\r\n" + boundary + b"--\r\n"
+
+    r = client.post(
+        "/ingest/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b0undary"}
+    )
+    assert r.status_code == 413
+    assert _leftovers(tmp_path) == []
+
+
+def test_duplicate_of_queued_upload_points_at_the_same_job(tmp_path, monkeypatch):
+    client = _client(tmp_path, monkeypatch)
+    files = {"file": ("policy.txt", b"Employees get twenty leave days.", "text/plain")}
+
+    first = client.post("/ingest/upload?background=true", files=files)
+    second = client.post("/ingest/upload?background=true", files=files)
+    assert first.status_code == second.status_code == 202
+    assert second.json()["job_id"] == first.json()["job_id"] and second.json()["duplicate"] is True
+    assert _leftovers(tmp_path) == []
+
+
+def test_synchronous_ingest_runs_off_the_event_loop(tmp_path, monkeypatch):
+    import asyncio
+
+    from app.api import routes_ingest
+
+    client = _client(tmp_path, monkeypatch)
+    monkeypatch.setattr(settings, "INGEST_BACKGROUND", False)
+    calls = []
+
+    def fake_execute(kind, payload, progress=None):
+        try:
+            asyncio.get_running_loop()
+            calls.append((kind, "on the loop"))
+        except RuntimeError:
+            calls.append((kind, "thread"))
+        return {"ok": True, "doc_id": "d1"}
+
+    monkeypatch.setattr(routes_ingest, "execute", fake_execute)
+    assert client.post("/ingest/path", json={"path": "/tmp/a.txt"}).json()["doc_id"] == "d1"
+    assert client.post("/ingest/url", json={"url": "https://example.com"}).status_code == 200
+    r = client.post("/ingest/upload", files={"file": ("a.txt", b"hello", "text/plain")})
+    assert r.status_code == 200
+    assert calls == [("path", "thread"), ("url", "thread"), ("upload", "thread")]
@@ -0,0 +1,24 @@
+from app.adapters.vector.memory import InMemoryVectorStore
+
+
+def test_memory_store_search_filter_and_delete():
+    vec = InMemoryVectorStore()
+    vec.ensure_collection(dim=3)
+    vec.upsert(
+        ids=["a", "b", "c"],
+        vectors=[[1, 0, 0], [0.9, 0.1, 0], [0, 1, 0]],
+        payloads=[{"doc_id": "d1"}, {"doc_id": "d2"}, {"doc_id": "d1"}],
+    )
+    assert [h["chunk_id"] for h in vec.search([1, 0, 0], 2)] == ["a", "b"]
+    assert [h["chunk_id"] for h in vec.search([1, 0, 0], 3, filter={"doc_id": "d2"})] == ["b"]
+
+    vec.delete_by_doc_id("d1")
+    assert [h["chunk_id"] for h in vec.search([1, 0, 0], 3)] == ["b"]
+
+
+def test_memory_store_delete_ids():
+    vec = InMemoryVectorStore()
+    vec.ensure_collection(dim=2)
+    vec.upsert(ids=["a", "b", "c"], vectors=[[1, 0], [1, 0.1], [0, 1]], payloads=[{}, {}, {}])
+    vec.delete_ids(["a", "c", "missing"])
+    assert [h["chunk_id"] for h in vec.search([1, 0], 3)] == ["b"]
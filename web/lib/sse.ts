@@ -1,4 +1,5 @@
-export type SSEEvent = { event: string; data: string }
+// `id` is `<stream_id>:<cursor>`; send the last one as Last-Event-ID to resume a dropped stream.
+export type SSEEvent = { event: string; data: string; id?: string }
 
 // Parses SSE blocks separated by \n\n.
 export function parseSSE(buffer: string): { events: SSEEvent[]; rest: string } {
@@ -11,11 +12,14 @@ export function parseSSE(buffer: string): { events: SSEEvent[]; rest: string } {
   for (const part of parts) {
     const lines = part.split('\n')
     let event = 'message'
+    let id: string | undefined
     let dataLines: string[] = []
 
     for (const line of lines) {
       if (line.startsWith('event:')) {
         event = line.slice('event:'.length).trim()
+      } else if (line.startsWith('id:')) {
+        id = line.slice('id:'.length).trim()
       } else if (line.startsWith('data:')) {
         dataLines.push(line.slice('data:'.length).trim())
       }
@@ -23,7 +27,7 @@ export function parseSSE(buffer: string): { events: SSEEvent[]; rest: string } {
 
     const data = dataLines.join('\n')
     if (data.length > 0 || event !== 'message') {
-      events.push({ event, data })
+      events.push(id ? { event, data, id } : { event, data })
     }
   }
 